@@ -6,17 +6,80 @@
 """
 
 import logging
+from typing import Dict, List
 
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message
 
-from utils.cache import caches
+from nasa_handlers import rover_pools
+from utils.breaker import get_breaker_stats
+from utils.cache import caches, tiered_caches
+from utils.http import nasa_client
+from utils.images import image_processor
 from utils.monitoring import monitor
+from utils.pool import pool_manager
+from utils.renditions import renditions
+from utils.scheduler import scheduler
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+TELEGRAM_MESSAGE_LIMIT = 4096  # Максимальная длина текста сообщения Telegram
+
+
+def _summarize_counters(counters: Dict[str, int]) -> Dict[str, str]:
+    """
+    Сворачивает счётчики с ключом («stale_served:asteroids») в сумму по имени.
+
+    Args:
+        counters (Dict[str, int]): Счётчики monitor
+
+    Returns:
+        Dict[str, str]: Имя счётчика → значение для вывода
+    """
+    totals: Dict[str, int] = {}
+    keys: Dict[str, int] = {}
+    for name, value in counters.items():
+        base, _, key = name.partition(':')
+        totals[base] = totals.get(base, 0) + value
+        if key:
+            keys[base] = keys.get(base, 0) + 1
+    return {
+        base: f"{total} (ключей: {keys[base]})" if base in keys else str(total)
+        for base, total in totals.items()
+    }
+
+
+def _split_text(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Делит текст на части не длиннее limit, по границам строк.
+
+    Args:
+        text (str): Текст
+        limit (int): Максимальная длина части
+
+    Returns:
+        List[str]: Части текста
+    """
+    parts: List[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            # Строка длиннее лимита режется как есть
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        parts.append(current)
+    return parts
+
 
 @router.message(Command("stats"))
 async def show_stats(message: Message) -> None:
@@ -53,7 +116,74 @@ async def show_stats(message: Message) -> None:
             text += f"  • Hits: {data['hits']}\n"
             text += f"  • Misses: {data['misses']}\n"
         
-        await message.answer(text)
+        if caches:
+            text += "\n💾 Память кэшей:\n"
+            for cache_type, cache in caches.items():
+                budget = f"{cache.max_bytes / 1024 / 1024:.1f} МБ" if cache.max_bytes else "без лимита"
+                text += (
+                    f"- {cache_type}: {cache.current_bytes / 1024 / 1024:.2f} МБ / {budget}, "
+                    f"записей: {len(cache.cache)}\n"
+                )
+        
+        breakers = get_breaker_stats()
+        if breakers:
+            icons = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+            text += "\n⚡ Выключатели API:\n"
+            for name, data in breakers.items():
+                text += (
+                    f"- {icons[data['state']]} {name}: {data['state']}, "
+                    f"ошибок подряд: {data['failures']}, переходов: {data['transitions']}\n"
+                )
+        
+        quota = nasa_client.limiter.get_stats()
+        text += "\n🚦 Квота NASA API:\n"
+        text += f"  • Остаток по данным сервера: {quota['remaining'] if quota['remaining'] is not None else '—'}\n"
+        text += f"  • Выдано: {quota['acquired']}, ждали: {quota['waited']}, отклонено: {quota['rejected']}, в очереди: {quota['queued']}\n"
+        text += f"  • Ведро: {'общее (Redis)' if quota['shared'] else 'локальное'}, переходов на локальное: {quota['redis_fallbacks']}\n"
+        
+        pools = pool_manager.get_stats()
+        if pools:
+            text += "\n🔌 Пулы соединений:\n"
+            for host, data in pools.items():
+                text += f"- {host}:\n"
+                text += f"  • Переиспользовано: {data['reuse_ratio']} ({data['reused']} из {data['reused'] + data['created']})\n"
+                text += f"  • Ожидание слота: {data['queued']} раз, среднее {data['avg_wait']}, макс. {data['max_wait']}\n"
+        
+        text += "\n🔴 Пулы готовых фото:\n"
+        for rover, pool in rover_pools.items():
+            data = pool.get_stats()
+            text += f"- {rover}: готово {data['depth']} из {pool.high}{' (пополняется)' if data['refilling'] else ''}\n"
+            text += f"  • Выдано: {data['hits']}, пул пуст: {data['misses']}, ошибок: {data['failures']}\n"
+            text += f"  • Подготовка фото: последняя {data['last_refill']}, средняя {data['avg_refill']}, макс. {data['max_refill']}\n"
+        
+        images = image_processor.get_stats()
+        text += "\n🖼 Обработка изображений:\n"
+        text += f"- Процессов: {images['workers']}, в работе: {images['in_flight']}, ждут очереди: {images['waiting']}\n"
+        text += f"- Выполнено: {images['completed']}, ошибок: {images['failed']}, отклонено: {images['rejected']}\n"
+        text += f"- Среднее время: {images['avg_time']}\n"
+        stored = renditions.get_stats()
+        text += f"- Готовые на диске: {stored['files']} файлов, {stored['total_bytes'] / 1024 / 1024:.1f} из {stored['max_bytes'] / 1024 / 1024:.0f} МБ\n"
+        text += f"- Попаданий: {stored['hits']}, промахов: {stored['misses']}, вытеснено: {stored['evictions']}\n"
+        
+        jobs = scheduler.get_stats()
+        if jobs:
+            text += "\n🗓 Фоновый прогрев:\n"
+            for name, data in jobs.items():
+                text += f"- {name}:\n"
+                text += f"  • Запусков: {data['runs']}, ошибок: {data['failures']}\n"
+                text += f"  • Последний запуск: {data['last_run']} ({data['last_duration']})\n"
+                if data['last_error']:
+                    text += f"  • Последняя ошибка: {data['last_error']}\n"
+        
+        if stats['counters']:
+            # Счётчики с ключами свёрнуты: по ключам они есть в /metrics
+            text += "\n📈 Счётчики:\n"
+            for name, value in sorted(_summarize_counters(stats['counters']).items()):
+                text += f"- {name}: {value}\n"
+        
+        # Длинная статистика отправляется несколькими сообщениями
+        for part in _split_text(text):
+            await message.answer(part)
         
     except Exception as e:
         logger.error(f"Error showing stats: {e}")
@@ -69,9 +199,11 @@ async def clear_cache(message: Message) -> None:
         message (Message): Входящее сообщение
     """
     try:
-        # Очищаем все кэши
+        # Очищаем все кэши (L1 и записи в Redis)
         for cache_type, cache in caches.items():
             cache.clear()
+        for cache_type, cache in tiered_caches.items():
+            await cache.clear()
         
         await message.answer("✅ Все кэши очищены.")
         
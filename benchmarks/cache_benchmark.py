@@ -0,0 +1,173 @@
+"""
+Бенчмарк in-memory кэша TTLCache.
+
+Сравнивает текущую реализацию (min-heap + таймер событийного цикла)
+с прежней (полный обход timestamps в потоке threading.Timer) на 100 000
+записей: пропускную способность set/get и стоимость очистки устаревших
+записей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.cache_benchmark [--entries 100000]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.cache import TTLCache
+
+
+class LegacyTTLCache:
+    """
+    Прежняя реализация TTLCache (до перехода на min-heap).
+
+    Отличие от оригинала одно: таймер очистки помечен daemon, чтобы
+    процесс бенчмарка мог завершиться.
+    """
+
+    def __init__(self, ttl: int, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.cache: OrderedDict = OrderedDict()
+        self.timestamps: Dict[str, float] = {}
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0}
+        self._cleanup_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._executor.submit(self._cleanup_expired)
+
+    def _cleanup_expired(self, reschedule: bool = True) -> None:
+        try:
+            with self._cleanup_lock:
+                current_time = time.time()
+                expired_keys = [
+                    key for key, timestamp in self.timestamps.items()
+                    if current_time - timestamp > self.ttl
+                ]
+                for key in expired_keys:
+                    self._remove_item(key)
+                    self.metrics['evictions'] += 1
+                self.metrics['size'] = len(self.cache)
+        finally:
+            if reschedule:
+                timer = threading.Timer(self.ttl / 2, self._cleanup_expired)
+                timer.daemon = True
+                timer.start()
+
+    def _remove_item(self, key: str) -> None:
+        self.cache.pop(key, None)
+        self.timestamps.pop(key, None)
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self.cache:
+            self.metrics['misses'] += 1
+            return None
+        if time.time() - self.timestamps[key] > self.ttl:
+            self._remove_item(key)
+            self.metrics['evictions'] += 1
+            self.metrics['misses'] += 1
+            return None
+        self.metrics['hits'] += 1
+        value = self.cache.pop(key)
+        self.cache[key] = value
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._cleanup_lock:
+            if len(self.cache) >= self.maxsize:
+                oldest = next(iter(self.cache))
+                self._remove_item(oldest)
+                self.metrics['evictions'] += 1
+            self.cache[key] = value
+            self.timestamps[key] = time.time()
+            self.metrics['size'] = len(self.cache)
+
+
+def _throughput(operation: Callable[[str], Any], keys) -> float:
+    """Возвращает количество операций в секунду."""
+    start = time.perf_counter()
+    for key in keys:
+        operation(key)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def _expire_all_legacy(cache: LegacyTTLCache) -> float:
+    """Время одного полного прохода очистки прежней реализации."""
+    cache.ttl = 0
+    start = time.perf_counter()
+    cache._cleanup_expired(reschedule=False)
+    return time.perf_counter() - start
+
+
+def _expire_all_heap(cache: TTLCache) -> float:
+    """Время удаления всех записей через min-heap."""
+    # Сдвигаем время истечения всех записей в прошлое
+    cache._expiry_heap = [(0.0, key) for _, key in cache._expiry_heap]
+    cache.timestamps = {key: -cache.ttl for key in cache.timestamps}
+    start = time.perf_counter()
+    cache._cleanup_expired()
+    return time.perf_counter() - start
+
+
+def _expire_one_heap(cache: TTLCache) -> float:
+    """Время очистки, когда истекла ровно одна запись из n."""
+    key = next(iter(cache.cache))
+    cache.timestamps[key] = -cache.ttl
+    cache._expiry_heap.insert(0, (0.0, key))
+    start = time.perf_counter()
+    cache._cleanup_expired()
+    return time.perf_counter() - start
+
+
+def _expire_one_legacy(cache: LegacyTTLCache) -> float:
+    """Время прохода очистки прежней реализации, когда истекла одна запись."""
+    key = next(iter(cache.cache))
+    cache.timestamps[key] = time.time() - cache.ttl - 1
+    start = time.perf_counter()
+    cache._cleanup_expired(reschedule=False)
+    return time.perf_counter() - start
+
+
+async def run(entries: int) -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    keys = [f"key:{i}" for i in range(entries)]
+    value = {"payload": "x" * 64}
+
+    results = {}
+    for name, factory in (
+        ("legacy (threading.Timer)", lambda: LegacyTTLCache(ttl=3600, maxsize=entries)),
+        ("heap (event loop)", lambda: TTLCache(ttl=3600, maxsize=entries)),
+    ):
+        cache = factory()
+        set_ops = _throughput(lambda k: cache.set(k, value), keys)
+        get_ops = _throughput(cache.get, keys)
+        miss_ops = _throughput(cache.get, [f"missing:{i}" for i in range(entries)])
+        if isinstance(cache, TTLCache):
+            one = _expire_one_heap(cache)
+            full = _expire_all_heap(cache)
+            cache.close()
+        else:
+            one = _expire_one_legacy(cache)
+            full = _expire_all_legacy(cache)
+        results[name] = (set_ops, get_ops, miss_ops, one, full)
+
+    print(f"TTLCache benchmark, {entries} entries")
+    print(f"{'implementation':<26}{'set ops/s':>12}{'get ops/s':>12}{'miss ops/s':>12}"
+          f"{'expire 1 (ms)':>15}{'expire all (ms)':>17}")
+    for name, (set_ops, get_ops, miss_ops, one, full) in results.items():
+        print(f"{name:<26}{set_ops:>12,.0f}{get_ops:>12,.0f}{miss_ops:>12,.0f}"
+              f"{one * 1000:>15.3f}{full * 1000:>17.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.entries))
+
+
+if __name__ == "__main__":
+    main()
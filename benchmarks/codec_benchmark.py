@@ -0,0 +1,148 @@
+"""
+Бенчмарк сериализации значений кэша Redis.
+
+Сравнивает прежний формат (pickle) с utils.codecs (orjson/msgpack/raw
+и сжатие zstd/zlib) на типичных значениях бота: лента астероидов,
+список последних фото марсохода, JPEG-изображение, готовый ответ
+с изображением и file_id. Для каждого типа печатает размер хранимого
+значения и время кодирования/декодирования.
+
+Запуск из корня репозитория (нужен config.py):
+    python -m benchmarks.codec_benchmark [--repeat 200]
+"""
+
+import argparse
+import pickle
+import random
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Tuple
+
+from PIL import Image
+
+import keyboards
+from utils import codecs
+from utils.responses import RenderedMessage, RenderedResponse
+
+
+def _neo_feed(days: int = 7, per_day: int = 15) -> Dict[str, Any]:
+    """Синтетическая лента /neo/rest/v1/feed со структурой ответа NASA."""
+    rnd = random.Random(1)
+    objects = {}
+    for day in range(days):
+        date = f"2024-05-{day + 1:02d}"
+        objects[date] = [
+            {
+                "id": str(rnd.randint(10**6, 10**7)),
+                "neo_reference_id": str(rnd.randint(10**6, 10**7)),
+                "name": f"({2000 + rnd.randint(0, 24)} {chr(65 + i)}{chr(66 + i)}{rnd.randint(1, 99)})",
+                "nasa_jpl_url": "https://ssd.jpl.nasa.gov/tools/sbdb_lookup.html#/?sstr=3542519",
+                "absolute_magnitude_h": rnd.uniform(15, 30),
+                "estimated_diameter": {
+                    unit: {
+                        "estimated_diameter_min": rnd.uniform(1, 500),
+                        "estimated_diameter_max": rnd.uniform(500, 1500),
+                    }
+                    for unit in ("kilometers", "meters", "miles", "feet")
+                },
+                "is_potentially_hazardous_asteroid": rnd.random() < 0.1,
+                "close_approach_data": [{
+                    "close_approach_date": date,
+                    "close_approach_date_full": f"{date} 12:{i:02d}",
+                    "epoch_date_close_approach": 1714560000000 + i,
+                    "relative_velocity": {
+                        "kilometers_per_second": str(rnd.uniform(1, 30)),
+                        "kilometers_per_hour": str(rnd.uniform(3600, 108000)),
+                        "miles_per_hour": str(rnd.uniform(2000, 67000)),
+                    },
+                    "miss_distance": {
+                        "astronomical": str(rnd.uniform(0, 0.5)),
+                        "lunar": str(rnd.uniform(0, 190)),
+                        "kilometers": str(rnd.uniform(10**5, 7 * 10**7)),
+                        "miles": str(rnd.uniform(10**5, 4 * 10**7)),
+                    },
+                    "orbiting_body": "Earth",
+                }],
+                "is_sentry_object": False,
+            }
+            for i in range(per_day)
+        ]
+    return {"element_count": days * per_day, "near_earth_objects": objects}
+
+
+def _latest_photos(count: int = 200) -> List[Dict[str, Any]]:
+    """Синтетический список latest_photos марсохода."""
+    return [
+        {
+            "id": 1_200_000 + i,
+            "sol": 4100,
+            "camera": {"id": 20 + i % 5, "name": "NAVCAM", "rover_id": 5, "full_name": "Navigation Camera"},
+            "img_src": f"https://mars.nasa.gov/msl-raw-images/proj/msl/redops/ods/surface/sol/04100/opgs/edr/ncam/NLB_{i:06d}EDR_F1234567NCAM00354M_.JPG",
+            "earth_date": "2024-02-19",
+            "rover": {"id": 5, "name": "Curiosity", "landing_date": "2012-08-06", "launch_date": "2011-11-26", "status": "active"},
+        }
+        for i in range(count)
+    ]
+
+
+def _jpeg(size: Tuple[int, int] = (1280, 960)) -> bytes:
+    """JPEG со сглаженным шумом, похожий по размеру на снимок марсохода."""
+    noise = Image.effect_noise(size, 60).convert('RGB')
+    output = BytesIO()
+    noise.save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+
+def _payloads() -> Dict[str, Any]:
+    image = _jpeg()
+    return {
+        "neo_feed (7 days)": _neo_feed(),
+        "latest_photos (200)": _latest_photos(),
+        "jpeg image": image,
+        "rendered response": RenderedResponse(messages=[
+            RenderedMessage(
+                "📸 Фото с марсохода Curiosity\n📅 Дата съёмки: 2024-02-19",
+                photo=image,
+                filename="mars.jpg",
+                reply_markup=keyboards.get_back_keyboard(),
+                media_key="https://mars.nasa.gov/msl-raw-images/example.JPG",
+            )
+        ]),
+        "file_id": "AgACAgIAAxkDAAIBZ2ZabcdEFGhijklmnopQRSTuvwxyz0123456789AAQADAgADeQADNAQ",
+    }
+
+
+def _timeit(func: Callable[[], Any], repeat: int) -> float:
+    """Среднее время вызова в микросекундах."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(repeat: int) -> None:
+    """Запускает бенчмарк и печатает таблицу результатов."""
+    formats = {
+        "pickle": (lambda v: pickle.dumps(v), pickle.loads),
+        "codecs": (codecs.encode, codecs.decode),
+    }
+    compression = "zstd" if codecs.zstandard is not None else "zlib"
+    print(f"Redis value codec benchmark ({repeat} iterations, compression: {compression})")
+    print(f"{'payload':<22}{'format':<8}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+    for name, value in _payloads().items():
+        for fmt, (dumps, loads) in formats.items():
+            data = dumps(value)
+            encode_us = _timeit(lambda: dumps(value), repeat)
+            decode_us = _timeit(lambda: loads(data), repeat)
+            print(f"{name:<22}{fmt:<8}{len(data):>10,}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Бенчмарк поиска спутникового снимка Земли по датам.
+
+Сравнивает прежний последовательный перебор дат [0, 30, 60, 90, 180]
+с параллельным опросом (nasa_handlers._probe_earth_dates): ограниченная
+параллельность, отмена более старых дат и хеджирование медленных запросов.
+
+API снимков заменяет локальный aiohttp-сервер с моделью задержек:
+большинство ответов быстрые, часть — с длинным «хвостом»; для каждой
+локации самые свежие даты могут быть без снимка (404). Остальная часть
+сценария «🌍 Земля» (оптимизация и отправка) одинакова для обоих
+вариантов, поэтому измеряется только поиск снимка. Печатает p50/p95/max
+и число запросов к API (каждый тратит токен часовой квоты).
+
+--quota задаёт часовую квоту локального ведра токенов: параллельный опрос
+ограничивает число запросов остатком токенов и не хеджирует, пока ведро
+заполнено меньше чем на EARTH_HEDGE_HEADROOM.
+
+Запуск из корня репозитория (нужен config.py):
+    python -m benchmarks.earth_probe_benchmark [--locations 200] [--scale 0.05] [--quota 1000]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+from PIL import Image
+
+import nasa_handlers
+from utils import cache
+from utils.http import APIClient
+from utils.ratelimit import TokenBucket
+from utils.pool import HOST_LIMITS, pool_manager
+
+OFFSETS = [0, 30, 60, 90, 180]
+
+
+def _png() -> bytes:
+    output = BytesIO()
+    Image.new('RGB', (64, 64), (30, 90, 160)).save(output, format='PNG')
+    return output.getvalue()
+
+
+class FakeEarthAPI:
+    """
+    Модель /planetary/earth/imagery.
+
+    Для каждой локации выбирается индекс первой даты со снимком (или
+    снимков нет совсем); задержка ответа — логнормальная с редкими
+    медленными ответами.
+    """
+
+    def __init__(self, scale: float, seed: int = 7):
+        self.scale = scale
+        self.seed = seed
+        self.rnd = random.Random(seed)
+        self.image = _png()
+        self.requests = 0
+
+    def _first_available(self, location: Tuple[str, str]) -> Optional[int]:
+        # Покрытие зависит только от локации, чтобы варианты сравнивались честно
+        rnd = random.Random(f"{self.seed}:{location[0]}:{location[1]}")
+        return None if rnd.random() < 0.1 else rnd.randrange(len(OFFSETS))
+
+    def _latency(self) -> float:
+        if self.rnd.random() < 0.1:
+            return self.rnd.uniform(6.0, 12.0) * self.scale
+        return self.rnd.lognormvariate(0.0, 0.4) * self.scale
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        location = (request.query['lat'], request.query['lon'])
+        index = OFFSETS.index((date.today() - date.fromisoformat(request.query['date'])).days)
+        await asyncio.sleep(self._latency())
+        first = self._first_available(location)
+        if first is None or index < first:
+            return web.json_response({"msg": "no imagery"}, status=404)
+        return web.Response(body=self.image, content_type='image/png')
+
+
+async def legacy_probe(lat: float, lon: float) -> Tuple[Optional[date], Optional[object]]:
+    """Прежний последовательный перебор дат (до параллельного опроса)."""
+    today = date.today()
+    for try_date in (today - timedelta(days=x) for x in OFFSETS):
+        try:
+            params = {"api_key": "DEMO_KEY", "lat": lat, "lon": lon, "dim": 0.3, "date": try_date.isoformat()}
+            return try_date, await nasa_handlers.nasa_client.get_stream("/planetary/earth/imagery", params=params)
+        except Exception:
+            continue
+    return None, None
+
+
+async def parallel_probe(lat: float, lon: float) -> Tuple[Optional[date], Optional[object]]:
+    today = date.today()
+    return await nasa_handlers._probe_earth_dates(lat, lon, [today - timedelta(days=x) for x in OFFSETS])
+
+
+async def _measure(probe, locations: List[Tuple[float, float]], users: int) -> Tuple[List[float], int]:
+    semaphore = asyncio.Semaphore(users)
+    latencies = []
+    found = 0
+
+    async def one(lat: float, lon: float) -> None:
+        nonlocal found
+        async with semaphore:
+            start = time.perf_counter()
+            day, image = await probe(lat, lon)
+            latencies.append(time.perf_counter() - start)
+            if image is not None:
+                found += 1
+                image.close()
+
+    await asyncio.gather(*(one(lat, lon) for lat, lon in locations))
+    return latencies, found
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run(locations: int, users: int, scale: float, quota: Optional[int] = None) -> None:
+    """Запускает бенчмарк и печатает таблицу результатов."""
+    # Кэши без Redis: отрицательный кэш заполняется заново для каждого варианта
+    nasa_handlers.EARTH_HEDGE_DELAY = 5.0 * scale
+    results = {}
+    for name, probe in (("sequential (legacy)", legacy_probe), ("parallel + hedging", parallel_probe)):
+        cache.tiered_caches['earth_negative'] = cache.TieredCache(
+            'earth_negative', cache.TTLCache(ttl=3600, maxsize=10_000), None, 3600, 0
+        )
+        api = FakeEarthAPI(scale)
+        app = web.Application()
+        app.router.add_get('/planetary/earth/imagery', api.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        # Тот же лимит соединений, что и у настоящего api.nasa.gov
+        pool_manager.host_limits[f"127.0.0.1:{port}"] = HOST_LIMITS['api.nasa.gov']
+        limiter = TokenBucket('benchmark', quota, use_redis=False) if quota else None
+        nasa_handlers.nasa_client = APIClient(f"http://127.0.0.1:{port}", limiter=limiter)
+
+        # Разные ячейки сетки, чтобы отрицательный кэш не влиял на сравнение
+        coords = [(10 + i * 0.05, 20 + i * 0.05) for i in range(locations)]
+        latencies, found = await _measure(probe, coords, users)
+        results[name] = (latencies, found, api.requests)
+        await pool_manager.close()
+        await runner.cleanup()
+
+    print(f"Earth imagery probe benchmark: {locations} locations, {users} concurrent users, "
+          f"latency scale {scale} (1.0 = real seconds), quota {quota or 'unlimited'}/h")
+    print(f"{'variant':<22}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'found':>8}{'requests':>10}")
+    for name, (latencies, found, requests) in results.items():
+        print(f"{name:<22}{statistics.median(latencies):>9.3f}{_percentile(latencies, 95):>9.3f}"
+              f"{max(latencies):>9.3f}{found:>8}{requests:>10}")
+    cache.close_caches()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--quota", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args.locations, args.users, args.scale, args.quota))
+
+
+if __name__ == "__main__":
+    main()
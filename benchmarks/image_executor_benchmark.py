@@ -0,0 +1,88 @@
+"""
+Бенчмарк обработки изображений в цикле событий и в пуле процессов.
+
+Обрабатывает набор снимков размером с фото марсохода через
+utils.images.optimize_image: сначала в цикле событий (IMAGE_WORKERS=0,
+прежнее поведение), затем в пуле процессов с разным числом процессов.
+Параллельно работает «пульс» — задача, которая каждые 10 мс засыпает и
+измеряет, насколько позже проснулась. Это задержка, которую в тот же
+момент видят обновления других пользователей. Печатает пропускную
+способность и задержку цикла событий (p50/p99/max).
+
+Запуск из корня репозитория (нужен config.py):
+    python -m benchmarks.image_executor_benchmark [--images 40] [--concurrency 8] [--workers 2 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+from benchmarks.codec_benchmark import _jpeg
+from utils import images
+
+TICK = 0.01
+
+
+async def _heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def _measure(workers: int, corpus: List[bytes], concurrency: int):
+    images.image_processor = images.ImageProcessor(workers=workers, queue_size=concurrency)
+    if workers:
+        # Запуск процессов не входит в измерение
+        await asyncio.gather(*(images.optimize_image(corpus[0]) for _ in range(workers)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(data: bytes) -> None:
+        async with semaphore:
+            await images.optimize_image(data)
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(data) for data in corpus))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+    images.image_processor.close()
+    return len(corpus) / elapsed, lags
+
+
+async def run(count: int, concurrency: int, workers: List[int]) -> None:
+    """Запускает бенчмарк и печатает таблицу результатов."""
+    corpus = [_jpeg((1600 + i % 4 * 100, 1200)) for i in range(count)]
+    print(f"Image optimization benchmark: {count} JPEG images ~1600x1200, "
+          f"concurrency {concurrency}, {os.cpu_count()} CPUs")
+    print(f"{'variant':<22}{'images/s':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for n in [0, *workers]:
+        throughput, lags = await _measure(n, corpus, concurrency)
+        name = "event loop (legacy)" if n == 0 else f"process pool x{n}"
+        print(f"{name:<22}{throughput:>10.1f}{statistics.median(lags) * 1000:>12.1f}"
+              f"{_percentile(lags, 99) * 1000:>12.1f}{max(lags) * 1000:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+    asyncio.run(run(args.images, args.concurrency, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Бенчмарк CPU-времени оптимизации изображений.
+
+Сравнивает прежнюю оптимизацию (полное декодирование, RGB, LANCZOS и
+JPEG optimize=True для любого изображения) с utils.images: проверкой
+заголовка и пропуском подходящих JPEG, декодированием больших JPEG в
+уменьшенном масштабе (draft) и пресетами. Время измеряется
+time.process_time в одном процессе, отдельно для каждого вида снимков.
+
+Корпус — изображения из каталога фикстур (записанных с настоящих API,
+см. benchmarks.stand_in и HTTP_RECORD_DIR) или, если каталог не указан,
+синтетические снимки с размерами и форматами реальных:
+- Curiosity NAVCAM: 1024x1024, JPEG в оттенках серого
+- Curiosity MASTCAM: 1344x1200, цветной JPEG
+- Perseverance NAVCAM: 5120x3840, цветной JPEG
+- Perseverance, уменьшенные: 1280x960, цветной JPEG
+- Earth imagery: 512x512, PNG
+
+Запуск из корня репозитория (нужен config.py):
+    python -m benchmarks.image_optimize_benchmark [--fixtures DIR] [--repeat 3]
+"""
+
+import argparse
+import time
+from io import BytesIO
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image
+
+from utils.fixtures import FixtureStore
+from utils.images import PRESETS, needs_processing, optimize_image_sync
+
+CORPUS = (
+    ("curiosity navcam", (1024, 1024), 'L', 'JPEG'),
+    ("curiosity mastcam", (1344, 1200), 'RGB', 'JPEG'),
+    ("perseverance navcam", (5120, 3840), 'RGB', 'JPEG'),
+    ("perseverance scaled", (1280, 960), 'RGB', 'JPEG'),
+    ("earth imagery", (512, 512), 'RGB', 'PNG'),
+)
+
+
+def legacy_optimize(data: bytes, max_size: Tuple[int, int] = (1280, 1280)) -> bytes:
+    """Прежняя optimize_image (до проверки заголовка и draft)."""
+    img = Image.open(BytesIO(data))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+
+def current_optimize(preset: str) -> Callable[[bytes], bytes]:
+    """optimize_image без пула процессов: проверка заголовка и обработка."""
+    settings = PRESETS[preset]
+
+    def optimize(data: bytes) -> bytes:
+        if not needs_processing(data, settings):
+            return data
+        return optimize_image_sync(data, settings)
+    return optimize
+
+
+def _synthetic(size: Tuple[int, int], mode: str, fmt: str) -> bytes:
+    """Гладкая текстура с шумом: сжимается похоже на фотографию."""
+    small = (max(1, size[0] // 8), max(1, size[1] // 8))
+    bands = [Image.effect_noise(small, 80).resize(size, Image.Resampling.BICUBIC) for _ in range(3)]
+    img = Image.merge('RGB', bands)
+    grain = Image.effect_noise(size, 12).convert('RGB')
+    img = Image.blend(img, grain, 0.15).convert(mode)
+    output = BytesIO()
+    img.save(output, format=fmt, quality=90) if fmt == 'JPEG' else img.save(output, format=fmt)
+    return output.getvalue()
+
+
+def _load_corpus(fixtures: str) -> Dict[str, List[bytes]]:
+    if not fixtures:
+        return {name: [_synthetic(size, mode, fmt)] for name, size, mode, fmt in CORPUS}
+    store = FixtureStore(fixtures)
+    corpus: Dict[str, List[bytes]] = {}
+    for key, fixture in store.index.items():
+        content_type = fixture.headers.get('Content-Type', '')
+        if fixture.status == 200 and content_type.startswith('image/'):
+            group = "earth imagery" if '/planetary/earth/' in key else key.split('/', 1)[0]
+            corpus.setdefault(group, []).append(store.read_body(fixture))
+    return corpus
+
+
+def _cpu_time(func: Callable[[bytes], bytes], images: List[bytes], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        for data in images:
+            func(data)
+        best = min(best, (time.process_time() - start) / len(images))
+    return best
+
+
+def run(fixtures: str, repeat: int) -> None:
+    """Запускает бенчмарк и печатает таблицу результатов."""
+    corpus = _load_corpus(fixtures)
+    variants = {
+        "legacy": legacy_optimize,
+        "photo": current_optimize('photo'),
+        "fast": current_optimize('fast'),
+    }
+    print(f"Image optimization CPU time per image, ms (best of {repeat}); corpus: {fixtures or 'synthetic'}")
+    print(f"{'images':<22}{'count':>6}" + "".join(f"{name:>10}" for name in variants) + f"{'speedup':>9}")
+    for name, images in corpus.items():
+        times = {variant: _cpu_time(func, images, repeat) for variant, func in variants.items()}
+        speedup = times['legacy'] / times['photo'] if times['photo'] else float('inf')
+        print(f"{name:<22}{len(images):>6}" + "".join(f"{t * 1000:>10.1f}" for t in times.values())
+              + f"{speedup:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--fixtures", default="", help="каталог фикстур с записанными изображениями")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.fixtures, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
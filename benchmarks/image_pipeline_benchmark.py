@@ -0,0 +1,250 @@
+"""
+Набор бенчмарков конвейера обработки изображений (utils.images).
+
+Корпус фиксированный и воспроизводимый: изображения генерируются из
+генератора случайных чисел с заданным зерном (или загружаются из
+каталога фикстур, записанных с настоящих API). В корпусе:
+- маленькие PNG (иконки и превью, в том числе с альфа-каналом)
+- большие «сырые» JPEG марсоходов (Curiosity NAVCAM/MASTCAM, Perseverance)
+- тайлы Earth imagery (PNG)
+
+Для каждого изображения измеряются этапы decode / resize / encode
+(функции utils.images), размер результата и пиковая память процесса
+(каждое изображение обрабатывается в отдельном свежем процессе).
+Пропускная способность всего корпуса измеряется в пуле из 1, 4 и N
+процессов. Результаты печатаются и записываются в JSON, чтобы сравнивать
+прогоны между коммитами.
+
+Запуск из корня репозитория (нужен config.py):
+    python -m benchmarks.image_pipeline_benchmark [--output bench.json] [--workers 1 4 8]
+        [--seed 2024] [--repeat 3] [--fixtures DIR] [--preset photo]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, Dict, Tuple
+
+import PIL
+from PIL import Image
+
+from utils.fixtures import FixtureStore
+from utils.images import PRESETS, decode_image, encode_image, needs_processing, optimize_image_sync, resize_image
+
+# Имя, размер, режим, формат
+CORPUS = (
+    ("png icon 128 rgba", (128, 128), 'RGBA', 'PNG'),
+    ("png preview 450", (450, 450), 'RGB', 'PNG'),
+    ("curiosity navcam 1024 gray", (1024, 1024), 'L', 'JPEG'),
+    ("curiosity mastcam 1648x1200", (1648, 1200), 'RGB', 'JPEG'),
+    ("perseverance navcam 5120x3840", (5120, 3840), 'RGB', 'JPEG'),
+    ("perseverance scaled 1280x960", (1280, 960), 'RGB', 'JPEG'),
+    ("earth tile 512", (512, 512), 'RGB', 'PNG'),
+    ("earth tile 1024", (1024, 1024), 'RGB', 'PNG'),
+)
+
+
+def _generate(size: Tuple[int, int], mode: str, fmt: str, rnd: random.Random) -> bytes:
+    """Гладкая текстура с зерном из детерминированного генератора."""
+    small = (max(1, size[0] // 8), max(1, size[1] // 8))
+    img = Image.frombytes('RGB', small, rnd.randbytes(small[0] * small[1] * 3))
+    img = img.resize(size, Image.Resampling.BICUBIC)
+    grain = Image.frombytes('L', size, rnd.randbytes(size[0] * size[1])).convert('RGB')
+    img = Image.blend(img, grain, 0.12).convert(mode)
+    output = BytesIO()
+    if fmt == 'JPEG':
+        img.save(output, format=fmt, quality=92)
+    else:
+        img.save(output, format=fmt)
+    return output.getvalue()
+
+
+def load_corpus(seed: int, fixtures: str = "") -> Dict[str, bytes]:
+    """
+    Формирует корпус изображений.
+
+    Args:
+        seed (int): Зерно генератора синтетических изображений
+        fixtures (str): Каталог фикстур; если задан, берутся записанные изображения
+
+    Returns:
+        Dict[str, bytes]: Изображения по именам
+    """
+    if fixtures:
+        store = FixtureStore(fixtures)
+        return {
+            key: store.read_body(fixture)
+            for key, fixture in sorted(store.index.items())
+            if fixture.status == 200 and fixture.headers.get('Content-Type', '').startswith('image/')
+        }
+    rnd = random.Random(seed)
+    return {name: _generate(size, mode, fmt, rnd) for name, size, mode, fmt in CORPUS}
+
+
+def _peak_rss_kb() -> int:
+    """Пиковый RSS процесса в КБ."""
+    # ru_maxrss в Linux наследуется от родителя, а VmHWM сбрасывается при exec
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_image(data: bytes, preset: str, repeat: int) -> Dict[str, Any]:
+    """
+    Измеряет этапы обработки одного изображения (выполняется в свежем процессе).
+
+    Returns:
+        Dict[str, Any]: Время этапов в мс (лучшее из repeat), размеры и пиковая память
+    """
+    settings = PRESETS[preset]
+    baseline = _peak_rss_kb()
+    with Image.open(BytesIO(data)) as img:
+        source = {'format': img.format, 'mode': img.mode, 'size': list(img.size)}
+    result: Dict[str, Any] = {'source': source, 'input_bytes': len(data)}
+
+    if not needs_processing(data, settings):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            needs_processing(data, settings)
+        result.update(passthrough=True, output_bytes=len(data),
+                      header_ms=(time.perf_counter() - start) / repeat * 1000)
+    else:
+        best = {'decode_ms': float('inf'), 'resize_ms': float('inf'), 'encode_ms': float('inf')}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            img = decode_image(data, settings)
+            t1 = time.perf_counter()
+            img = resize_image(img, settings)
+            t2 = time.perf_counter()
+            output = encode_image(img, settings)
+            t3 = time.perf_counter()
+            for stage, elapsed in (('decode_ms', t1 - t0), ('resize_ms', t2 - t1), ('encode_ms', t3 - t2)):
+                best[stage] = min(best[stage], elapsed * 1000)
+        result.update(passthrough=False, output_bytes=len(output), **best,
+                      total_ms=sum(best.values()), output_size=list(img.size))
+    # Абсолютный пик включает импорт модулей; прирост — только обработку
+    result['peak_rss_mb'] = _peak_rss_kb() / 1024
+    result['peak_delta_mb'] = max(0, _peak_rss_kb() - baseline) / 1024
+    return result
+
+
+def _optimize(item: Tuple[bytes, str]) -> int:
+    data, preset = item
+    settings = PRESETS[preset]
+    return len(data if not needs_processing(data, settings) else optimize_image_sync(data, settings))
+
+
+def measure_throughput(corpus: Dict[str, bytes], preset: str, workers: int, rounds: int) -> Dict[str, Any]:
+    """Пропускная способность пула процессов на корпусе, повторённом rounds раз."""
+    jobs = [(data, preset) for _ in range(rounds) for data in corpus.values()]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        # Запуск процессов не входит в измерение
+        list(executor.map(_optimize, jobs[:workers]))
+        start = time.perf_counter()
+        output = sum(executor.map(_optimize, jobs))
+        elapsed = time.perf_counter() - start
+    source = sum(len(data) for data, _ in jobs)
+    return {
+        'workers': workers,
+        'images': len(jobs),
+        'seconds': elapsed,
+        'images_per_second': len(jobs) / elapsed,
+        'input_mb_per_second': source / elapsed / 1024 / 1024,
+        'output_bytes': output
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Запускает все измерения и возвращает результаты."""
+    corpus = load_corpus(args.seed, args.fixtures)
+    digest = hashlib.sha256(b"".join(hashlib.sha256(data).digest() for data in corpus.values())).hexdigest()
+    context = multiprocessing.get_context('spawn')
+
+    per_image = {}
+    for name, data in corpus.items():
+        # Свежий процесс на каждое изображение: пиковая память не смешивается
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            per_image[name] = executor.submit(measure_image, data, args.preset, args.repeat).result()
+
+    workers = sorted(set(args.workers or [1, 4, os.cpu_count() or 1]))
+    throughput = [measure_throughput(corpus, args.preset, n, args.rounds) for n in workers]
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'cpus': os.cpu_count(),
+            'platform': platform.platform()
+        },
+        'corpus': {'source': args.fixtures or f"synthetic seed={args.seed}", 'sha256': digest,
+                   'images': len(corpus)},
+        'preset': args.preset,
+        'repeat': args.repeat,
+        'images': per_image,
+        'throughput': throughput
+    }
+
+
+def _print(results: Dict[str, Any]) -> None:
+    print(f"Image pipeline benchmark @ {results['commit']}, preset {results['preset']}, "
+          f"corpus {results['corpus']['source']} ({results['corpus']['sha256'][:12]})")
+    print(f"{'image':<32}{'in KB':>9}{'out KB':>9}{'decode':>9}{'resize':>9}{'encode':>9}{'total':>9}{'peak MB':>9}{'+MB':>7}")
+    for name, data in results['images'].items():
+        if data['passthrough']:
+            stages = f"{'passthrough (header ' + format(data['header_ms'], '.2f') + ' ms)':>36}"
+        else:
+            stages = "".join(f"{data[stage]:>9.1f}" for stage in ('decode_ms', 'resize_ms', 'encode_ms', 'total_ms'))
+        print(f"{name[:31]:<32}{data['input_bytes'] / 1024:>9.0f}{data['output_bytes'] / 1024:>9.0f}"
+              f"{stages}{data['peak_rss_mb']:>9.1f}{data['peak_delta_mb']:>7.1f}")
+    print(f"\n{'workers':>8}{'images':>8}{'images/s':>10}{'input MB/s':>12}")
+    for row in results['throughput']:
+        print(f"{row['workers']:>8}{row['images']:>8}{row['images_per_second']:>10.1f}{row['input_mb_per_second']:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--output", default="", help="путь к JSON с результатами")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="по умолчанию 1, 4 и число CPU")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на изображение (берётся лучшее)")
+    parser.add_argument("--rounds", type=int, default=3, help="проходов по корпусу при замере пропускной способности")
+    parser.add_argument("--fixtures", default="", help="каталог фикстур с записанными изображениями")
+    parser.add_argument("--preset", default="photo", choices=sorted(PRESETS))
+    args = parser.parse_args()
+
+    results = run(args)
+    _print(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
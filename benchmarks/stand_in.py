@@ -0,0 +1,225 @@
+"""
+Локальный заменитель NASA API и Wikimedia для работы без сети.
+
+Сервер отдаёт ответы из каталога фикстур (utils.fixtures): ленту
+/neo/rest/v1/feed, /mars-photos/api/v1/rovers/{rover}/latest_photos,
+/planetary/earth/imagery и сами изображения. Запрос ищется сначала по
+точному ключу (хост, путь, параметры без api_key), затем по ключу без
+параметров — так одна запись снимка Земли подходит для любых координат.
+Исходный хост берётся из заголовка X-Forwarded-Host, который добавляет
+APIClient с UPSTREAM_OVERRIDE.
+
+Задержка, доля ошибок 503 и ответы 429 настраиваются, поэтому изменения
+utils/http.py и обработчиков можно измерять воспроизводимо.
+
+Фикстуры можно записать с настоящих API (HTTP_RECORD_DIR в config.py)
+или сгенерировать:
+    python -m benchmarks.stand_in synthesize fixtures/
+    python -m benchmarks.stand_in serve fixtures/ [--port 8081] [--latency 0.2] [--error-rate 0.05]
+
+и запустить бота с UPSTREAM_OVERRIDE=http://127.0.0.1:8081.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Optional
+
+from aiohttp import web
+from PIL import Image
+
+from benchmarks.codec_benchmark import _jpeg, _latest_photos, _neo_feed
+from data.planets import EXOPLANETS, SOLAR_SYSTEM
+from data.rovers import ROVERS
+from utils.fixtures import FixtureStore, request_key
+from utils.neo_index import FEED_WINDOW_DAYS
+
+DEFAULT_HOST = 'api.nasa.gov'
+
+
+class StandIn:
+    """
+    Обработчик всех запросов заменителя.
+
+    Attributes:
+        store (FixtureStore): Каталог фикстур
+        latency (float): Средняя задержка ответа в секундах
+        jitter (float): Разброс задержки (доля от latency)
+        error_rate (float): Доля ответов 503
+        rate_limit_rate (float): Доля ответов 429
+        quota (Optional[int]): Часовая квота; после её исчерпания — 429
+        stats (dict): Счётчики ответов по статусам
+    """
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        latency: float = 0.0,
+        jitter: float = 0.5,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        quota: Optional[int] = None,
+        seed: int = 42
+    ):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota = quota
+        self.rnd = random.Random(seed)
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.stats = {}
+
+    def _remaining(self) -> Optional[int]:
+        if self.quota is None:
+            return None
+        if time.monotonic() - self.window_start >= 3600:
+            self.window_start = time.monotonic()
+            self.used = 0
+        return max(0, self.quota - self.used)
+
+    def _respond(self, status: int, body: bytes = b'', headers: Optional[dict] = None) -> web.Response:
+        self.stats[status] = self.stats.get(status, 0) + 1
+        return web.Response(status=status, body=body, headers=headers or {})
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.latency:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self.rnd.uniform(self.latency - spread, self.latency + spread)))
+
+        headers = {}
+        remaining = self._remaining()
+        if remaining is not None:
+            headers['X-RateLimit-Limit'] = str(self.quota)
+            headers['X-RateLimit-Remaining'] = str(max(0, remaining - 1))
+        if remaining == 0 or self.rnd.random() < self.rate_limit_rate:
+            retry_after = 3600 - (time.monotonic() - self.window_start) if remaining == 0 else 1
+            headers['Retry-After'] = str(max(1, int(retry_after)))
+            return self._respond(429, b'{"error": {"code": "OVER_RATE_LIMIT"}}', headers)
+        self.used += 1
+        if self.rnd.random() < self.error_rate:
+            return self._respond(503, b'Service Unavailable', headers)
+
+        host = request.headers.get('X-Forwarded-Host', DEFAULT_HOST)
+        url = f"https://{host}{request.path_qs}"
+        fixture = self.store.lookup(request_key(url)) or self.store.lookup(request_key(f"https://{host}{request.path}"))
+        if fixture is None:
+            return self._respond(404, b'{"msg": "no fixture"}', headers)
+        return self._respond(fixture.status, self.store.read_body(fixture), {**fixture.headers, **headers})
+
+
+def create_app(stand_in: StandIn) -> web.Application:
+    """Создаёт приложение aiohttp с единственным маршрутом на все пути."""
+    app = web.Application()
+    app.router.add_route('GET', '/{tail:.*}', stand_in.handle)
+    return app
+
+
+def _png(size=(512, 512)) -> bytes:
+    output = BytesIO()
+    Image.effect_noise(size, 40).convert('RGB').save(output, format='PNG')
+    return output.getvalue()
+
+
+def synthesize(path: str, days: int = 7) -> FixtureStore:
+    """
+    Генерирует фикстуры для всех сценариев бота.
+
+    Args:
+        path (str): Каталог фикстур
+        days (int): Для скольких последних дней записать недельную ленту NEO
+
+    Returns:
+        FixtureStore: Заполненный каталог
+    """
+    store = FixtureStore(path)
+    json_headers = {'Content-Type': 'application/json'}
+    jpeg_headers = {'Content-Type': 'image/jpeg'}
+
+    today = date.today()
+    template = next(iter(_neo_feed(days=1)['near_earth_objects'].values()))
+    for offset in range(days):
+        start = today - timedelta(days=offset)
+        window = [(start + timedelta(days=i)).isoformat() for i in range(FEED_WINDOW_DAYS)]
+        body = {"element_count": len(template) * len(window), "near_earth_objects": {day: template for day in window}}
+        store.record(f"https://api.nasa.gov/neo/rest/v1/feed?start_date={window[0]}&end_date={window[-1]}", None,
+                     200, json_headers, json.dumps(body).encode())
+
+    image = _jpeg()
+    for rover in ROVERS:
+        photos = _latest_photos(count=25)
+        store.record(f"https://api.nasa.gov/mars-photos/api/v1/rovers/{rover}/latest_photos", None,
+                     200, json_headers, json.dumps({"latest_photos": photos}).encode())
+        for photo in photos:
+            store.record(photo['img_src'], None, 200, jpeg_headers, image)
+
+    store.record("https://api.nasa.gov/planetary/earth/imagery", None, 200, {'Content-Type': 'image/png'}, _png())
+
+    thumbnail = _jpeg((450, 450))
+    for planet in (*SOLAR_SYSTEM.values(), *EXOPLANETS.values()):
+        if planet.get('image'):
+            store.record(planet['image'], None, 200, jpeg_headers, thumbnail)
+    return store
+
+
+async def serve(stand_in: StandIn, host: str, port: int) -> None:
+    """Запускает заменитель до прерывания."""
+    runner = web.AppRunner(create_app(stand_in))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Stand-in API: http://{host}:{port} ({len(stand_in.store.index)} fixtures)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(f"Responses by status: {stand_in.stats}")
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    synth = commands.add_parser("synthesize", help="сгенерировать фикстуры")
+    synth.add_argument("path")
+    synth.add_argument("--days", type=int, default=7)
+
+    run = commands.add_parser("serve", help="запустить сервер")
+    run.add_argument("path")
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=8081)
+    run.add_argument("--latency", type=float, default=0.0)
+    run.add_argument("--jitter", type=float, default=0.5)
+    run.add_argument("--error-rate", type=float, default=0.0)
+    run.add_argument("--rate-limit-rate", type=float, default=0.0)
+    run.add_argument("--quota", type=int, default=None)
+    run.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == "synthesize":
+        store = synthesize(args.path, args.days)
+        print(f"Written {len(store.index)} fixtures to {args.path}")
+        return
+
+    stand_in = StandIn(
+        FixtureStore(args.path),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        quota=args.quota,
+        seed=args.seed
+    )
+    try:
+        asyncio.run(serve(stand_in, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,43 @@ LOG_FILE: Final = os.getenv("LOG_FILE", "bot.log")
 REDIS_URL: Final = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REDIS_PASSWORD: Final = os.getenv("REDIS_PASSWORD", None)
 CACHE_TTL: Final = int(os.getenv("CACHE_TTL", 3600))  # Время жизни кэша в секундах
+# Путь к JSON-файлу реестра Telegram file_id; пустое значение — хранить в Redis
+FILE_ID_CACHE_PATH: Final = os.getenv("FILE_ID_CACHE_PATH", "")
+
+# Фоновый прогрев кэшей (лента астероидов, фото марсоходов, изображения планет)
+PREFETCH_ENABLED: Final = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+
+# Отладка внешних API: перенаправить все запросы на локальный сервер
+# (python -m benchmarks.stand_in serve) и/или записывать ответы в каталог фикстур
+UPSTREAM_OVERRIDE: Final = os.getenv("UPSTREAM_OVERRIDE", "")
+HTTP_RECORD_DIR: Final = os.getenv("HTTP_RECORD_DIR", "")
+
+# Обработка изображений: число процессов (0 — в цикле событий) и длина очереди заданий
+IMAGE_WORKERS: Final = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_QUEUE_SIZE: Final = int(os.getenv("IMAGE_QUEUE_SIZE", 8))
+
+# Дисковое хранилище готовых изображений (каталог и предельный объём в байтах)
+RENDITION_CACHE_DIR: Final = os.getenv("RENDITION_CACHE_DIR", "cache/renditions")
+RENDITION_CACHE_MAX_BYTES: Final = int(os.getenv("RENDITION_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Максимальное время (в секундах) на ответ пользователю на одно обновление
+UPDATE_DEADLINE: Final = float(os.getenv("UPDATE_DEADLINE", 25))
 
 # Настройки мониторинга
 ENABLE_METRICS: Final = os.getenv("ENABLE_METRICS", "true").lower() == "true"
 METRICS_PORT: Final = int(os.getenv("METRICS_PORT", 8000))
 
+# Режим получения обновлений: "polling" или "webhook". В режиме вебхука
+# обновления принимает HTTP-сервер на METRICS_PORT (там же /metrics и /health),
+# поэтому можно запускать несколько экземпляров за балансировщиком
+BOT_MODE: Final = os.getenv("BOT_MODE", "polling").lower()
+HTTP_HOST: Final = os.getenv("HTTP_HOST", "0.0.0.0")  # Адрес HTTP-сервера
+WEBHOOK_URL: Final = os.getenv("WEBHOOK_URL", "")  # Публичный адрес, например https://bot.example.com
+WEBHOOK_PATH: Final = os.getenv("WEBHOOK_PATH", "/webhook")
+# Секрет вебхука (1-256 символов A-Z, a-z, 0-9, _ и -), одинаковый у всех экземпляров;
+# если не задан, выводится из BOT_TOKEN
+WEBHOOK_SECRET: Final = os.getenv("WEBHOOK_SECRET", "")
+
 # Токен для Telegram бота (получить у @BotFather)
 BOT_TOKEN: Final = os.getenv(
     "BOT_TOKEN",
@@ -33,6 +65,8 @@ NASA_API_KEY: Final = os.getenv(
     "NASA_API_KEY",
     "YOUR_NASA_API_KEY"  # Замените на ваш ключ API
 )
+# Часовая квота ключа NASA (1000 для личного ключа, 30 для DEMO_KEY)
+NASA_RATE_LIMIT: Final = int(os.getenv("NASA_RATE_LIMIT", 1000))
 
 # URLs для API NASA
 NEO_URL: Final = "https://api.nasa.gov/neo/rest/v1/feed"  # API для астероидов
@@ -12,7 +12,7 @@
     exoplanets_keyboard: Клавиатура для выбора экзопланеты
 """
 
-from typing import List
+from typing import List, Optional
 
 from aiogram.types import (
     ReplyKeyboardMarkup,
@@ -142,6 +142,39 @@ def get_mars_photos_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+def get_asteroids_keyboard(
+    prev_day: Optional[str],
+    next_day: Optional[str],
+    current_day: Optional[str] = None
+) -> InlineKeyboardMarkup:
+    """
+    Создает клавиатуру навигации по неделе астероидов.
+    
+    Args:
+        prev_day (Optional[str]): Предыдущая дата с данными (ISO)
+        next_day (Optional[str]): Следующая дата с данными (ISO)
+        current_day (Optional[str]): Дата для возврата к ленте дня
+        
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками дней и подборок за неделю
+    """
+    navigation = []
+    if prev_day:
+        navigation.append(InlineKeyboardButton(text=f"◀️ {prev_day[5:]}", callback_data=f"neo_day:{prev_day}"))
+    if current_day:
+        navigation.append(InlineKeyboardButton(text="📅 Сегодня", callback_data=f"neo_day:{current_day}"))
+    if next_day:
+        navigation.append(InlineKeyboardButton(text=f"{next_day[5:]} ▶️", callback_data=f"neo_day:{next_day}"))
+    
+    keyboard = [navigation] if navigation else []
+    keyboard.append([
+        InlineKeyboardButton(text="☢️ Самые опасные", callback_data="neo_top:dangerous"),
+        InlineKeyboardButton(text="🎯 Ближайшие", callback_data="neo_top:closest")
+    ])
+    keyboard.append([InlineKeyboardButton(text="« Главное меню", callback_data="main_menu")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def get_back_keyboard() -> InlineKeyboardMarkup:
     """
     Создает простую клавиатуру с кнопкой возврата в главное меню.
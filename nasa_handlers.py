@@ -17,10 +17,10 @@ import asyncio
 import logging
 import random
 
+from collections import deque
 from datetime import date, datetime, timedelta
-from io import BytesIO
-from PIL import Image
-from typing import Dict, Optional, Any
+from functools import partial
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 
 from aiogram import Router, F
 from aiogram.filters import CommandStart
@@ -28,15 +28,21 @@ from aiogram.types import (
     Message, 
     CallbackQuery,
     InlineKeyboardMarkup, 
-    InlineKeyboardButton, 
-    BufferedInputFile
+    InlineKeyboardButton
 )
 
 from config import NASA_API_KEY
 from data.rovers import ROVERS
-from utils.cache import cache_response
-from utils.http import nasa_client
-from utils.monitoring import track_performance
+from utils import deadline
+from utils.breaker import CircuitOpenError
+from utils.cache import cache_response, get_tiered_cache
+from utils.http import DownloadRejected, hedged, nasa_client
+from utils.images import ImageQueueFull, optimize_image, render_image, rendition_key
+from utils.monitoring import monitor, track_performance
+from utils.neo_index import FEED_WINDOW_DAYS, NeoIndex, NeoRecord
+from utils.ready_pool import ReadyPool
+from utils.renditions import renditions
+from utils.responses import RenderedMessage, RenderedResponse
 import keyboards
 
 
@@ -46,29 +52,14 @@ router = Router()
 # Константы
 MAX_IMAGE_SIZE = (1280, 1280)  # Максимальный размер изображения
 CACHE_TIME = 3600  # Время кэширования в секундах
-
-async def optimize_image(image_data: bytes, max_size: tuple = (1280, 1280)) -> bytes:
-    """Оптимизирует размер изображения для отправки в Telegram."""
-    try:
-        with BytesIO(image_data) as img_file:
-            img = Image.open(img_file)
-            
-            # Конвертируем в RGB если нужно
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Уменьшаем размер если нужно
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Сохраняем оптимизированное изображение
-            output = BytesIO()
-            img.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            return output.getvalue()
-    except Exception as e:
-        logger.error(f"Ошибка при оптимизации изображения: {e}")
-        return image_data
+EARTH_GRID_PRECISION = 2  # Знаков после запятой в ячейке негативного кэша (~1 км)
+EARTH_MISSING_STATUSES = (400, 404)  # Ответы API «снимка за эту дату нет»
+EARTH_PROBE_CONCURRENCY = 3  # Одновременных запросов снимков за разные даты
+EARTH_HEDGE_DELAY = 5.0  # Через сколько секунд дублировать медленный запрос
+EARTH_HEDGE_HEADROOM = 0.5  # Хеджировать, только пока в ведре квоты не меньше этой доли
+PHOTO_RENDER_BUDGET = 4.0  # Меньше этого остатка бюджета фото отправляется ссылкой
+ACTIVE_ROVERS = ('curiosity', 'perseverance')  # Марсоходы, которые ещё присылают фото
+RECENT_POOL_PHOTOS = 20  # Сколько последних фото пула не повторять
 
 @router.message(CommandStart())
 async def cmd_start(message: Message) -> None:
@@ -87,42 +78,22 @@ async def cmd_start(message: Message) -> None:
 
 @router.message(F.text == "☄️ Астероиды")
 @track_performance()
-@cache_response(cache_type='asteroids')
 async def get_asteroids(message: Message) -> None:
     """Обработчик команды получения информации об астероидах."""
     logger.info("Обработчик астероидов вызван")
     try:
-        today = date.today().isoformat()
-        params = {
-            "api_key": NASA_API_KEY,
-            "start_date": today,
-            "end_date": today
-        }
-        
-        data = await nasa_client.get("/neo/rest/v1/feed", params=params)
-        logger.debug(f"Получены данные об астероидах: {data}")
-        
-        asteroids = data.get('near_earth_objects', {}).get(today, [])
+        response = await render_asteroids(date.today().isoformat())
         
-        if not asteroids:
+        if response is None:
             await message.answer("На сегодня нет данных об астероидах. Попробуйте позже.")
             return
         
-        # Сортируем по близости подлета к Земле
-        asteroids.sort(
-            key=lambda x: float(x['close_approach_data'][0]['miss_distance']['kilometers'])
-        )
-        
-        logger.debug(f"Отсортированные астероиды: {asteroids[:5]}")
-        
         # Отправляем информацию последовательно, чтобы избежать ошибок с порядком сообщений
-        for ast in asteroids[:5]:
-            try:
-                await send_asteroid_info(message, ast)
-                await asyncio.sleep(0.5)  # Небольшая задержка между сообщениями
-            except Exception as e:
-                logger.error(f"Ошибка при отправке информации об астероиде {ast.get('name', 'Unknown')}: {e}")
+        await response.send(message)
         
+    except deadline.DeadlineExceeded:
+        # Ответ «попробуйте позже» отправит и засчитает DeadlineMiddleware
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении данных об астероидах: {e}")
         await message.answer(
@@ -130,43 +101,158 @@ async def get_asteroids(message: Message) -> None:
             "Попробуйте позже."
         )
 
-async def send_asteroid_info(message: Message, ast: Dict[str, Any]) -> None:
-    """Отправляет информацию об одном астероиде."""
+@router.callback_query(F.data.startswith("neo_"))
+async def navigate_asteroids(callback: CallbackQuery) -> None:
+    """Обработчик навигации по неделе астероидов: другой день или подборка за неделю."""
     try:
-        logger.info(f"Отправка информации об астероиде: {ast['name']}")
-        avg_size = (
-            ast['estimated_diameter']['meters']['estimated_diameter_min'] +
-            ast['estimated_diameter']['meters']['estimated_diameter_max']
-        ) / 2
+        await callback.answer()
+        action, value = callback.data.split(":", 1)
+        if action == "neo_day":
+            response = await render_asteroids(value)
+        else:
+            response = await render_asteroid_top(value)
         
-        text = (
-            f"☄️ Астероид: {ast['name']}\n\n"
-            f"📏 Размер: {ast['estimated_diameter']['meters']['estimated_diameter_min']:.1f}"
-            f"-{ast['estimated_diameter']['meters']['estimated_diameter_max']:.1f} м\n"
-            f"⚠️ Опасен: {'Да ☢️' if ast['is_potentially_hazardous_asteroid'] else 'Нет ✅'}\n"
-            f"🔺 Макс. сближение: {float(ast['close_approach_data'][0]['miss_distance']['kilometers']):.0f} км\n"
-            f"🚀 Скорость: {float(ast['close_approach_data'][0]['relative_velocity']['kilometers_per_hour']):.0f} км/ч\n"
-            f"⏰ Время сближения: {ast['close_approach_data'][0]['close_approach_date_full']}"
+        if response is None:
+            await callback.message.answer("За эту дату нет данных об астероидах.")
+            return
+        await response.send(callback.message)
+        
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при навигации по астероидам: {e}")
+        await callback.message.answer(
+            "Извините, произошла ошибка при получении данных об астероидах. "
+            "Попробуйте позже."
         )
+
+@cache_response(cache_type='asteroids')
+async def fetch_neo_week(start: str) -> Optional[Dict[str, Any]]:
+    """
+    Получает ленту астероидов за неделю одним запросом.
+    
+    Args:
+        start (str): Первая дата окна в формате ISO
         
-        logger.info(f"Текст сообщения: {text}")
+    Returns:
+        Optional[Dict[str, Any]]: Ответ /neo/rest/v1/feed или None, если данных нет
+    """
+    end = date.fromisoformat(start) + timedelta(days=FEED_WINDOW_DAYS - 1)
+    params = {
+        "api_key": NASA_API_KEY,
+        "start_date": start,
+        "end_date": end.isoformat()
+    }
+    # Лента хранится в кэше 'asteroids', отдельная копия тела не нужна
+    data = await nasa_client.get("/neo/rest/v1/feed", params=params, store_body=False)
+    return data if data.get('near_earth_objects') else None
+
+# Индексы недельных лент по первой дате окна
+_neo_indexes: Dict[str, NeoIndex] = {}
+
+async def get_neo_index(day: str) -> Optional[NeoIndex]:
+    """
+    Возвращает индекс недели, в которую входит дата.
+    
+    Даты ближайшей недели берутся из ленты, начинающейся сегодня, — её же
+    прогревает планировщик (prefetch._asteroid_week). Для других дат ищется
+    уже построенный индекс, покрывающий дату, иначе берётся лента за неделю
+    с этой даты. Лента живёт в кэше 'asteroids', индекс перестраивается
+    только когда кэш вернул другой ответ (например, после фонового
+    обновления).
+    
+    Args:
+        day (str): Дата в формате ISO
         
-        # Отправляем только текстовое сообщение, без изображения
-        await message.answer(
-            text,
-            parse_mode="HTML"
-        )
-        logger.info("Сообщение успешно отправлено")
+    Returns:
+        Optional[NeoIndex]: Индекс или None, если данных нет
+    """
+    today = date.today()
+    if today.isoformat() <= day <= (today + timedelta(days=FEED_WINDOW_DAYS - 1)).isoformat():
+        start = today.isoformat()
+    else:
+        start = next((s for s, index in _neo_indexes.items() if index.covers(day)), day)
+    feed = await fetch_neo_week(start)
+    if feed is None:
+        return None
+    index = _neo_indexes.get(start)
+    if index is None or index.source is not feed:
+        index = NeoIndex(feed)
+        _neo_indexes[start] = index
+        monitor.increment('neo_index_builds')
+        # Окна, закончившиеся до сегодняшнего дня, больше не нужны
+        for old in [s for s, old_index in _neo_indexes.items()
+                    if old_index.days and old_index.days[-1] < today.isoformat()]:
+            del _neo_indexes[old]
+    return index
 
-    except Exception as e:
-        logger.error(f"Ошибка при отправке информации об астероиде: {e}")
-        await message.answer(
-            f"Информация об астероиде {ast['name']}:\n{text}"
-        )
+async def render_asteroids(day: str) -> Optional[RenderedResponse]:
+    """
+    Готовит сообщения о пяти ближайших к Земле астероидах за указанную дату.
+    
+    К последнему сообщению прикрепляется клавиатура навигации по неделе.
+    
+    Args:
+        day (str): Дата в формате ISO
+        
+    Returns:
+        Optional[RenderedResponse]: Готовый ответ или None, если данных нет
+    """
+    index = await get_neo_index(day)
+    asteroids = index.for_day(day) if index else []
+    if not asteroids:
+        return None
+    
+    prev_day, next_day = index.neighbours(day)
+    return _render_records(asteroids, keyboards.get_asteroids_keyboard(prev_day, next_day))
+
+async def render_asteroid_top(kind: str) -> Optional[RenderedResponse]:
+    """
+    Готовит подборку за текущую неделю: самые опасные или ближайшие сближения.
+    
+    Args:
+        kind (str): "dangerous" или "closest"
+        
+    Returns:
+        Optional[RenderedResponse]: Готовый ответ или None, если данных нет
+    """
+    today = date.today().isoformat()
+    index = await get_neo_index(today)
+    if index is None:
+        return None
+    
+    if kind == "dangerous":
+        title, asteroids = "☢️ Самые опасные астероиды недели", index.most_dangerous()
+    else:
+        title, asteroids = "🎯 Ближайшие сближения недели", index.closest()
+    if not asteroids:
+        return None
+    
+    response = _render_records(asteroids, keyboards.get_asteroids_keyboard(None, None, today))
+    response.messages.insert(0, RenderedMessage(title))
+    return response
+
+def _render_records(asteroids: List[NeoRecord], reply_markup: InlineKeyboardMarkup) -> RenderedResponse:
+    messages = [RenderedMessage(format_asteroid_info(ast), parse_mode="HTML") for ast in asteroids]
+    messages[-1].reply_markup = reply_markup
+    return RenderedResponse(
+        messages=messages,
+        delay=0.5  # Небольшая задержка между сообщениями
+    )
+
+def format_asteroid_info(ast: NeoRecord) -> str:
+    """Формирует текст с информацией об одном астероиде."""
+    return (
+        f"☄️ Астероид: {ast.name}\n\n"
+        f"📏 Размер: {ast.diameter_min_m:.1f}-{ast.diameter_max_m:.1f} м\n"
+        f"⚠️ Опасен: {'Да ☢️' if ast.hazardous else 'Нет ✅'}\n"
+        f"🔺 Макс. сближение: {ast.miss_km:.0f} км\n"
+        f"🚀 Скорость: {ast.velocity_kmh:.0f} км/ч\n"
+        f"⏰ Время сближения: {ast.approach_time}"
+    )
 
 @router.message(F.text == "🔴 Марс")
 @track_performance()
-@cache_response(cache_type='mars_photos')
 async def get_mars_photos(message: Message) -> None:
     """Обработчик команды получения фотографий с Марса."""
     logger.info("Обработчик Марса вызван")
@@ -174,7 +260,7 @@ async def get_mars_photos(message: Message) -> None:
         # Создаем клавиатуру для выбора марсохода
         buttons = []
         for rover_id, rover_info in ROVERS.items():
-            if rover_id in ['curiosity', 'perseverance']:  # Только активные марсоходы
+            if rover_id in ACTIVE_ROVERS:  # Только активные марсоходы
                 buttons.append([InlineKeyboardButton(
                     text=f"🤖 {rover_info['name']}",
                     callback_data=f"get_rover_photo:{rover_id}"
@@ -189,6 +275,8 @@ async def get_mars_photos(message: Message) -> None:
             parse_mode="Markdown"
         )
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при подготовке выбора марсохода: {e}")
         await message.answer("Извините, произошла ошибка. Попробуйте позже.")
@@ -200,45 +288,28 @@ async def get_rover_photo(callback: CallbackQuery) -> None:
         await callback.answer()
         _, rover = callback.data.split(":")
         
-        # Пробуем получить последние фото
-        url = f"mars-photos/api/v1/rovers/{rover}/latest_photos"
-        data = await nasa_client.get(url, params={"api_key": NASA_API_KEY})
+        # Готовое фото из пула отправляется сразу
+        pool = rover_pools.get(rover)
+        response = pool.pop() if pool else None
         
-        if not data.get('latest_photos'):
-            await callback.message.answer(
-                f"К сожалению, для марсохода {ROVERS[rover]['name']} "
-                f"не удалось получить последние фотографии. Попробуйте позже."
-            )
-            return
-
-        # Выбираем случайное фото из последних
-        photo = random.choice(data['latest_photos'])
-        image_data = await nasa_client.get_bytes(photo['img_src'])
-        optimized_image = await optimize_image(image_data)
-
-        caption = (
-            f"📸 Фото с марсохода {photo['rover']['name']}\n"
-            f"📅 Дата съёмки: {photo['earth_date']}\n"
-            f"🎥 Камера: {photo['camera']['full_name']}\n"
-            f"📍 Сол: {photo.get('sol', 'N/A')}"
-        )
-
-        # Добавляем кнопку для получения нового фото
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="🔄 Ещё фото",
-                    callback_data=f"get_rover_photo:{rover}"
+        if response is None:
+            # Пул пуст — готовим фото сейчас
+            photos = await fetch_latest_photos(rover)
+            
+            if not photos:
+                await callback.message.answer(
+                    f"К сожалению, для марсохода {ROVERS[rover]['name']} "
+                    f"не удалось получить последние фотографии. Попробуйте позже."
                 )
-            ]
-        ])
+                return
 
-        await callback.message.answer_photo(
-            photo=BufferedInputFile(optimized_image, "mars.jpg"),
-            caption=caption,
-            reply_markup=keyboard
-        )
+            # Выбираем случайное фото из последних
+            response = await render_rover_photo(rover, random.choice(photos))
+        
+        await response.send(callback.message)
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении фото с Марса: {e}")
         await callback.message.answer(
@@ -246,6 +317,102 @@ async def get_rover_photo(callback: CallbackQuery) -> None:
             "Попробуйте позже."
         )
 
+@cache_response(cache_type='mars_photos')
+async def fetch_latest_photos(rover: str) -> Optional[list]:
+    """
+    Получает список последних фотографий марсохода.
+    
+    Args:
+        rover (str): Идентификатор марсохода
+        
+    Returns:
+        Optional[list]: Список фотографий или None, если фотографий нет
+    """
+    url = f"mars-photos/api/v1/rovers/{rover}/latest_photos"
+    # Список хранится в кэше 'mars_photos', отдельная копия тела не нужна
+    data = await nasa_client.get(url, params={"api_key": NASA_API_KEY}, store_body=False)
+    return data.get('latest_photos') or None
+
+async def _produce_rover_photo(rover: str) -> Optional[RenderedResponse]:
+    """
+    Готовит фото для пула марсохода: случайное из последних, ещё не бывшее в пуле.
+    
+    Args:
+        rover (str): Идентификатор марсохода
+        
+    Returns:
+        Optional[RenderedResponse]: Готовый ответ или None, если фотографий нет
+    """
+    photos = await fetch_latest_photos(rover)
+    if not photos:
+        return None
+    recent = _recent_pool_photos[rover]
+    fresh = [photo for photo in photos if photo['id'] not in recent] or photos
+    photo = random.choice(fresh)
+    recent.append(photo['id'])
+    return await render_rover_photo(rover, photo)
+
+# Пулы готовых фото по марсоходам: «🔄 Ещё фото» только забирает готовый ответ
+_recent_pool_photos = {rover: deque(maxlen=RECENT_POOL_PHOTOS) for rover in ACTIVE_ROVERS}
+rover_pools = {
+    rover: ReadyPool(f"mars:{rover}", partial(_produce_rover_photo, rover))
+    for rover in ACTIVE_ROVERS
+}
+
+@cache_response(cache_type='mars_photo_renders', key=lambda rover, photo: (rover, photo['id']))
+async def render_rover_photo(rover: str, photo: Dict[str, Any]) -> RenderedResponse:
+    """
+    Загружает и оптимизирует фотографию марсохода, готовит подпись и клавиатуру.
+    
+    Args:
+        rover (str): Идентификатор марсохода
+        photo (Dict[str, Any]): Описание фотографии из ответа API
+        
+    Returns:
+        RenderedResponse: Готовый ответ с фотографией
+    """
+    async def load() -> BinaryIO:
+        deadline.check(PHOTO_RENDER_BUDGET)
+        return await nasa_client.get_stream(photo['img_src'])
+    
+    try:
+        # Готовое фото с диска не скачивается и не обрабатывается повторно
+        rendition = await render_image(photo['img_src'], load)
+        cacheable = True
+    except (deadline.DeadlineExceeded, ImageQueueFull) as e:
+        # Не успеваем скачать и сжать фото — Telegram загрузит его по ссылке сам
+        logger.warning(f"Отправляем фото {photo['id']} ссылкой: {e}")
+        rendition = None
+        cacheable = False
+
+    caption = (
+        f"📸 Фото с марсохода {photo['rover']['name']}\n"
+        f"📅 Дата съёмки: {photo['earth_date']}\n"
+        f"🎥 Камера: {photo['camera']['full_name']}\n"
+        f"📍 Сол: {photo.get('sol', 'N/A')}"
+    )
+
+    # Добавляем кнопку для получения нового фото
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="🔄 Ещё фото",
+                callback_data=f"get_rover_photo:{rover}"
+            )
+        ]
+    ])
+
+    return RenderedResponse(messages=[
+        RenderedMessage(
+            caption,
+            photo=photo['img_src'],
+            filename="mars.jpg",
+            reply_markup=keyboard,
+            media_key=photo['img_src'],
+            rendition=rendition
+        )
+    ], cacheable=cacheable)
+
 
 
 @router.message(F.text == "ℹ️ Помощь")
@@ -275,7 +442,6 @@ async def get_earth_image(message: Message) -> None:
     )
 
 @router.message(F.text.regexp(r'^-?\d+\.?\d*,-?\d+\.?\d*$'))
-@cache_response(cache_type='earth_imagery')
 async def process_coordinates(message: Message) -> None:
     """Обработчик получения координат для спутникового снимка."""
     try:
@@ -291,66 +457,36 @@ async def process_coordinates(message: Message) -> None:
             )
             return
         
-        # Пробуем получить более новый снимок сначала
-        today = date.today()
-        dates_to_try = [
-            today - timedelta(days=x) for x in [0, 30, 60, 90, 180]
-        ]
-        
-        image_data = None
-        used_date = None
-        
-        for try_date in dates_to_try:
-            try:
-                params = {
-                    "api_key": NASA_API_KEY,
-                    "lat": lat,
-                    "lon": lon,
-                    "dim": 0.3,
-                    "date": try_date.isoformat()
-                }
-                
-                image_data = await nasa_client.get_bytes("/planetary/earth/imagery", params=params)
-                if image_data:
-                    used_date = try_date
-                    break
-            except Exception as e:
-                logger.warning(f"Не удалось получить снимок за {try_date}: {e}")
-                continue
+        response = await render_earth_image(lat, lon)
         
-        if not image_data:
+        if response is None:
             await loading_message.edit_text(
                 "❌ К сожалению, не удалось найти спутниковые снимки для этих координат. "
                 "Попробуйте другие координаты или повторите запрос позже."
             )
             return
-            
-        # Оптимизируем изображение
-        optimized_image = await optimize_image(image_data)
         
         # Удаляем сообщение о загрузке
         await loading_message.delete()
         
-        # Формируем подпись
-        caption = (
-            f"🌍 Спутниковый снимок локации:\n"
-            f"📍 Широта: {lat:.4f}°\n"
-            f"📍 Долгота: {lon:.4f}°\n"
-            f"📅 Дата снимка: {used_date.strftime('%d.%m.%Y')}"
-        )
-        
         # Отправляем фото
-        await message.answer_photo(
-            photo=BufferedInputFile(optimized_image, "earth.jpg"),
-            caption=caption,
-            reply_markup=keyboards.get_back_keyboard()
-        )
+        try:
+            await response.send(message)
+        except FileNotFoundError as e:
+            # Готовый снимок вытеснен с диска — готовим ответ заново и обновляем кэш
+            logger.warning(f"Снимок Земли из кэша недоступен, готовим заново: {e}")
+            response = await render_earth_image.prefetch(lat, lon)
+            if response is None:
+                raise
+            await response.send(message)
             
     except ValueError:
         await message.answer(
             "⚠️ Неверный формат координат. Пожалуйста, используйте формат: широта,долгота\n"
             "Например: 55.7558, 37.6173 (Москва)"
         )
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении снимка Земли: {e}")
         await message.answer(
@@ -358,6 +494,198 @@ async def process_coordinates(message: Message) -> None:
             "Попробуйте позже."
         )
 
+def _earth_missing_key(lat: float, lon: float, day: date) -> str:
+    """
+    Ключ негативного кэша снимков Земли.
+    
+    Координаты округляются до ячейки сетки, чтобы соседние запросы
+    пользователей использовали одни и те же записи.
+    
+    Args:
+        lat (float): Широта
+        lon (float): Долгота
+        day (date): Дата снимка
+        
+    Returns:
+        str: Ключ вида "55.76:37.62:2024-05-01"
+    """
+    return f"{round(lat, EARTH_GRID_PRECISION)}:{round(lon, EARTH_GRID_PRECISION)}:{day.isoformat()}"
+
+async def _probe_earth_date(
+    lat: float,
+    lon: float,
+    day: date,
+    hedge_delay: Optional[float] = None
+) -> Optional[BinaryIO]:
+    """
+    Запрашивает снимок за одну дату (с хеджированием медленного запроса,
+    если задан hedge_delay).
+    
+    Пустые ответы и ответы «снимка нет» записываются в негативный кэш.
+    
+    Returns:
+        Optional[BinaryIO]: Буфер со снимком или None, если снимка нет
+    """
+    missing_key = _earth_missing_key(lat, lon, day)
+    params = {
+        "api_key": NASA_API_KEY,
+        "lat": lat,
+        "lon": lon,
+        "dim": 0.3,
+        "date": day.isoformat()
+    }
+    
+    async def request() -> BinaryIO:
+        return await nasa_client.get_stream("/planetary/earth/imagery", params=params)
+    
+    try:
+        if hedge_delay is None:
+            return await request()
+        return await hedged(request, hedge_delay)
+    except (CircuitOpenError, deadline.DeadlineExceeded):
+        # API снимков недоступно или время вышло — это не «снимка нет», а ошибка для пользователя
+        raise
+    except DownloadRejected as e:
+        # Пустой ответ или не изображение — снимка за эту дату нет
+        await get_tiered_cache('earth_negative').set(missing_key, True)
+        logger.warning(f"Не удалось получить снимок за {day}: {e}")
+    except aiohttp.ClientResponseError as e:
+        if e.status in EARTH_MISSING_STATUSES:
+            await get_tiered_cache('earth_negative').set(missing_key, True)
+        logger.warning(f"Не удалось получить снимок за {day}: {e}")
+    except Exception as e:
+        logger.warning(f"Не удалось получить снимок за {day}: {e}")
+    return None
+
+async def _earth_probe_budget() -> Tuple[int, Optional[float]]:
+    """
+    Параллельность опроса дат и задержка хеджирования по остатку квоты NASA.
+    
+    Каждый запрос (и каждый дубль) тратит токен часовой квоты, поэтому
+    одновременно запускается не больше запросов, чем осталось токенов, а
+    хеджирование включается, только пока ведро заполнено хотя бы на
+    EARTH_HEDGE_HEADROOM.
+    
+    Returns:
+        Tuple[int, Optional[float]]: Число одновременных запросов и задержка
+            дубля (None — без хеджирования)
+    """
+    limiter = nasa_client.limiter
+    if limiter is None:
+        return EARTH_PROBE_CONCURRENCY, EARTH_HEDGE_DELAY
+    level = await limiter.level()
+    concurrency = max(1, min(EARTH_PROBE_CONCURRENCY, int(level)))
+    if level < limiter.capacity * EARTH_HEDGE_HEADROOM:
+        monitor.increment('earth_hedges_suppressed')
+        return concurrency, None
+    return concurrency, EARTH_HEDGE_DELAY
+
+async def _probe_earth_dates(
+    lat: float,
+    lon: float,
+    dates_to_try: List[date]
+) -> Tuple[Optional[date], Optional[BinaryIO]]:
+    """
+    Параллельно опрашивает даты и возвращает самый свежий найденный снимок.
+    
+    Одновременно выполняется не больше EARTH_PROBE_CONCURRENCY запросов
+    (и не больше, чем осталось токенов квоты), более свежие даты стартуют
+    первыми. Даты из негативного кэша
+    пропускаются. Как только снимок найден для даты, все более свежие
+    даты которой уже ответили «нет», запросы за более старые даты
+    отменяются.
+    
+    Args:
+        lat (float): Широта
+        lon (float): Долгота
+        dates_to_try (List[date]): Даты в порядке предпочтения
+        
+    Returns:
+        Tuple[Optional[date], Optional[BinaryIO]]: Дата и буфер снимка
+            или (None, None), если снимков нет
+    """
+    missing = get_tiered_cache('earth_negative')
+    known_missing = await asyncio.gather(
+        *(missing.get(_earth_missing_key(lat, lon, day)) for day in dates_to_try)
+    )
+    candidates = [day for day, skip in zip(dates_to_try, known_missing) if not skip]
+    monitor.increment('earth_probes_skipped', len(dates_to_try) - len(candidates))
+    
+    concurrency, hedge_delay = await _earth_probe_budget()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def probe(day: date) -> Optional[BinaryIO]:
+        async with semaphore:
+            return await _probe_earth_date(lat, lon, day, hedge_delay)
+    
+    tasks = [asyncio.create_task(probe(day)) for day in candidates]
+    winner = None
+    try:
+        # Ждём даты по порядку: снимок за более старую дату, пришедший
+        # раньше, дожидается ответа за более свежие
+        for day, task in zip(candidates, tasks):
+            image = await task
+            if image is not None:
+                winner = task
+                return day, image
+        return None, None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif (task is not winner and not task.cancelled()
+                  and task.exception() is None and task.result() is not None):
+                task.result().close()
+
+@cache_response(cache_type='earth_imagery', key=lambda lat, lon: (round(lat, 4), round(lon, 4)))
+async def render_earth_image(lat: float, lon: float) -> Optional[RenderedResponse]:
+    """
+    Находит самый свежий спутниковый снимок для координат и готовит ответ.
+    
+    Args:
+        lat (float): Широта
+        lon (float): Долгота
+        
+    Returns:
+        Optional[RenderedResponse]: Готовый ответ или None, если снимков нет
+    """
+    # Даты в порядке предпочтения: более новый снимок лучше
+    today = date.today()
+    dates_to_try = [
+        today - timedelta(days=x) for x in [0, 30, 60, 90, 180]
+    ]
+    
+    used_date, image_data = await _probe_earth_dates(lat, lon, dates_to_try)
+    
+    if image_data is None:
+        return None
+        
+    # Оптимизированный снимок сохраняется в хранилище renditions: ответ в
+    # кэше хранит только ключ, а файл отправляется с диска без копирования
+    source = f"earth:{lat}:{lon}:{used_date.isoformat()}"
+    optimized_image = await optimize_image(image_data, preset='satellite', source=source)
+    rendition = rendition_key(source, 'satellite')
+    stored = await asyncio.to_thread(renditions.contains, rendition)
+    
+    # Формируем подпись
+    caption = (
+        f"🌍 Спутниковый снимок локации:\n"
+        f"📍 Широта: {lat:.4f}°\n"
+        f"📍 Долгота: {lon:.4f}°\n"
+        f"📅 Дата снимка: {used_date.strftime('%d.%m.%Y')}"
+    )
+    
+    # Если сохранить файл не удалось, байты отправляются напрямую, без кэширования
+    return RenderedResponse(messages=[
+        RenderedMessage(
+            caption,
+            photo=None if stored else optimized_image,
+            filename="earth.jpg",
+            reply_markup=keyboards.get_back_keyboard(),
+            rendition=rendition if stored else None
+        )
+    ], cacheable=stored)
+
 @router.callback_query(F.data == "main_menu")
 async def return_to_main_menu(callback: CallbackQuery) -> None:
     """Обработчик команды возврата в главное меню."""
@@ -2,15 +2,20 @@
 Модуль обработчиков команд для работы с информацией о планетах.
 """
 
-import aiohttp
+import asyncio
 import logging
 import keyboards
 
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.types import Message, CallbackQuery
 from data.planets import SOLAR_SYSTEM, EXOPLANETS
+from utils import deadline
 from utils.cache import cache_response
+from utils.http import nasa_client
+from utils.images import render_image, rendition_key
 from utils.monitoring import track_performance
+from utils.renditions import renditions
+from utils.responses import RenderedMessage, RenderedResponse
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -50,10 +55,16 @@ async def planet_info(callback: CallbackQuery):
                    f"📝 {planet['description']}")
             
             try:
-                await callback.message.answer_photo(
+                # Повторные показы идут по file_id (реестр проверяется до загрузки),
+                # иначе отправляется готовое изображение с диска (его прогревает
+                # планировщик) или Telegram получает ссылку
+                rendition = rendition_key(planet['image'], 'photo')
+                await RenderedMessage(
+                    info,
                     photo=planet['image'],
-                    caption=info
-                )
+                    media_key=planet['image'],
+                    rendition=rendition if await asyncio.to_thread(renditions.contains, rendition) else None
+                ).send(callback.message)
             except Exception as e:
                 logger.error(f"Ошибка при отправке фото планеты {planet_id}: {str(e)}")
                 await callback.message.answer(info)
@@ -68,50 +79,83 @@ async def planet_info(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("exo_"))
 @track_performance()
-@cache_response(cache_type='exoplanet_info')
 async def show_exoplanet_info(callback: CallbackQuery):
     """Показывает информацию о выбранной экзопланете."""
     try:
         await callback.answer()
         exo_id = callback.data.replace("exo_", "").lower()
         if exo_id in EXOPLANETS:
-            planet = EXOPLANETS[exo_id]
-            description = (f"{planet['name']}\n\n"
-                f"🌍 Тип: {planet['type']}\n"
-                f"📏 Масса: {planet['mass']}\n"
-                f"🌟 Звезда: {planet['star']}\n"
-                f"📅 Год: {planet['year']}\n"
-                f"📍 Расстояние: {planet['distance']}\n"
-                f"🌫️ Атмосфера: {planet['atmosphere']}\n"
-                f"🌐 Индекс схожести с Землей (ESI): {planet['esi']}\n\n"
-                f"📝 {planet['description']}")
-
-            try:
-                # Загружаем изображение напрямую через aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(planet['image']) as response:
-                        if response.status == 200:
-                            image_data = await response.read()
-                            await callback.message.answer_photo(
-                                photo=BufferedInputFile(image_data, f"{exo_id}.jpg"),
-                                caption=description,
-                                reply_markup=keyboards.get_back_keyboard()
-                            )
-                        else:
-                            logger.error(f"Ошибка при загрузке изображения {planet['image']}: {response.status}")
-                            await callback.message.answer(
-                                text=f"{description}\n\n⚠️ Изображение временно недоступно",
-                                reply_markup=keyboards.get_back_keyboard()
-                            )
-            except Exception as img_error:
-                logger.error(f"Ошибка при загрузке изображения экзопланеты: {img_error}")
-                await callback.message.answer(
-                    text=f"{description}\n\n⚠️ Изображение временно недоступно",
-                    reply_markup=keyboards.get_back_keyboard()
-                )
+            response = await render_exoplanet_info(exo_id)
+            await response.send(callback.message)
         else:
             await callback.message.answer("❌ Информация об этой экзопланете недоступна.")
             
+    except deadline.DeadlineExceeded:
+        # Ответ «попробуйте позже» отправит и засчитает DeadlineMiddleware
+        raise
     except Exception as e:
         logger.error(f"Ошибка при отображении информации об экзопланете: {e}")
         await callback.message.answer("❌ Произошла ошибка. Попробуйте позже.")
+
+@cache_response(cache_type='exoplanet_info')
+async def render_exoplanet_info(exo_id: str) -> RenderedResponse:
+    """
+    Готовит описание экзопланеты вместе с изображением.
+    
+    Ответ без изображения (если его не удалось загрузить) не кэшируется.
+    
+    Args:
+        exo_id (str): Идентификатор экзопланеты из EXOPLANETS
+        
+    Returns:
+        RenderedResponse: Готовый ответ
+    """
+    planet = EXOPLANETS[exo_id]
+    description = (f"{planet['name']}\n\n"
+        f"🌍 Тип: {planet['type']}\n"
+        f"📏 Масса: {planet['mass']}\n"
+        f"🌟 Звезда: {planet['star']}\n"
+        f"📅 Год: {planet['year']}\n"
+        f"📍 Расстояние: {planet['distance']}\n"
+        f"🌫️ Атмосфера: {planet['atmosphere']}\n"
+        f"🌐 Индекс схожести с Землей (ESI): {planet['esi']}\n\n"
+        f"📝 {planet['description']}")
+
+    try:
+        rendition = await render_image(planet['image'], lambda: fetch_image(planet['image']))
+        return RenderedResponse(messages=[
+            RenderedMessage(
+                description,
+                photo=planet['image'],
+                filename=f"{exo_id}.jpg",
+                reply_markup=keyboards.get_back_keyboard(),
+                media_key=planet['image'],
+                rendition=rendition
+            )
+        ])
+    except Exception as img_error:
+        logger.error(f"Ошибка при загрузке изображения экзопланеты: {img_error}")
+
+    return RenderedResponse(
+        messages=[
+            RenderedMessage(
+                f"{description}\n\n⚠️ Изображение временно недоступно",
+                reply_markup=keyboards.get_back_keyboard()
+            )
+        ],
+        cacheable=False
+    )
+
+@cache_response(cache_type='images')
+async def fetch_image(url: str) -> bytes:
+    """
+    Загружает изображение планеты или экзопланеты.
+    
+    Args:
+        url (str): Адрес изображения
+        
+    Returns:
+        bytes: Содержимое изображения
+    """
+    # Изображение хранится в кэше 'images', отдельная копия тела не нужна
+    return await nasa_client.get_bytes(url, store_body=False)
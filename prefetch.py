@@ -0,0 +1,96 @@
+"""
+Задачи фонового прогрева кэшей.
+
+Регистрирует в планировщике задачи, поддерживающие в кэше данные,
+которые чаще всего запрашивают пользователи:
+- ленту астероидов на неделю, начиная с сегодняшнего дня
+- последние фотографии каждого марсохода из data.rovers.ROVERS
+- пулы готовых фото активных марсоходов (nasa_handlers.rover_pools)
+- изображения планет и экзопланет из data.planets
+"""
+
+from datetime import date
+
+from data.planets import EXOPLANETS, SOLAR_SYSTEM
+from data.rovers import ROVERS
+from nasa_handlers import fetch_latest_photos, fetch_neo_week, rover_pools
+from planet_handlers import fetch_image, render_exoplanet_info
+from utils.images import render_image
+from utils.scheduler import PrefetchJob, PrefetchScheduler
+
+
+def _asteroid_week():
+    """Корутина прогрева недельной ленты астероидов."""
+    yield fetch_neo_week.prefetch(date.today().isoformat())
+
+
+def _rover_photos():
+    """Корутины прогрева последних фотографий марсоходов."""
+    for rover in ROVERS:
+        yield fetch_latest_photos.prefetch(rover)
+
+
+def _rover_photo_pools():
+    """Корутины пополнения пулов готовых фото (в том числе после устаревания)."""
+    for pool in rover_pools.values():
+        yield pool.fill()
+
+
+def _planet_images():
+    """Корутины прогрева изображений планет и карточек экзопланет."""
+    for planet in SOLAR_SYSTEM.values():
+        yield _planet_image(planet['image'])
+    for exo_id in EXOPLANETS:
+        yield _exoplanet_info(exo_id)
+
+
+async def _planet_image(url: str) -> None:
+    """Готовит изображение планеты в хранилище renditions (его отправляет planet_info)."""
+    await render_image(url, lambda: fetch_image(url))
+
+
+async def _exoplanet_info(exo_id: str) -> None:
+    """Прогревает карточку экзопланеты; ответ без изображения считается ошибкой."""
+    response = await render_exoplanet_info.prefetch(exo_id)
+    if not response.cacheable:
+        raise RuntimeError(f"изображение экзопланеты {exo_id} недоступно")
+
+
+def register_prefetch_jobs(scheduler: PrefetchScheduler) -> None:
+    """
+    Регистрирует задачи прогрева в планировщике.
+
+    Интервалы выбраны меньше времени жизни соответствующих кэшей
+    (см. utils/cache_config.CACHE_SETTINGS).
+
+    Args:
+        scheduler (PrefetchScheduler): Планировщик
+    """
+    scheduler.add_job(PrefetchJob(
+        name='asteroids',
+        units=_asteroid_week,
+        interval=3600,
+        jitter=0.1,
+        concurrency=1
+    ))
+    scheduler.add_job(PrefetchJob(
+        name='mars_latest_photos',
+        units=_rover_photos,
+        interval=3 * 3600,
+        jitter=0.1,
+        concurrency=1
+    ))
+    scheduler.add_job(PrefetchJob(
+        name='mars_photo_pools',
+        units=_rover_photo_pools,
+        interval=15 * 60,
+        jitter=0.1,
+        concurrency=1
+    ))
+    scheduler.add_job(PrefetchJob(
+        name='planet_images',
+        units=_planet_images,
+        interval=24 * 3600,
+        jitter=0.2,
+        concurrency=3
+    ))
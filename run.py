@@ -1,16 +1,29 @@
 """Main bot module."""
 import admin_handlers
 import asyncio
+import hashlib
 import logging
 import nasa_handlers
 import planet_handlers
+import prefetch
 import quiz_handlers
+import signal
 import sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from config import BOT_TOKEN, LOG_LEVEL, LOG_FORMAT, LOG_FILE
+from config import (
+    BOT_MODE, BOT_TOKEN, HTTP_HOST, LOG_LEVEL, LOG_FORMAT, LOG_FILE, METRICS_PORT,
+    PREFETCH_ENABLED, UPDATE_DEADLINE, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_URL
+)
+from utils.cache import close_caches
+from utils.deadline import DeadlineMiddleware
+from utils.images import image_processor
+from utils.pool import pool_manager
+from utils.renditions import renditions
+from utils.scheduler import scheduler
+from utils.server import BotServer
 
 logger = logging.getLogger(__name__)
 
@@ -40,26 +53,88 @@ def setup_logging():
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp = Dispatcher()
 
+# Ответ на каждое обновление — не дольше UPDATE_DEADLINE секунд
+dp.update.outer_middleware(DeadlineMiddleware(UPDATE_DEADLINE))
+
 # Регистрация роутеров с обработчиками
 dp.include_router(nasa_handlers.router)
 dp.include_router(planet_handlers.router)
 dp.include_router(quiz_handlers.router)
 dp.include_router(admin_handlers.router)  # Административные команды
 
+# Префиксы callback_data, обработчики которых отвечают на нажатие пустым
+# callback.answer(): в режиме вебхука на них отвечает сам ответ вебхука.
+# Обработчики с текстом или всплывающим уведомлением сюда не добавляются
+INLINE_CALLBACK_ANSWERS = (
+    "neo_", "get_rover_photo", "main_menu", "quiz_", "answer_", "planet_", "exo_"
+)
+
+def webhook_secret() -> str:
+    """Секрет вебхука: из конфигурации или производный от токена (одинаков у всех экземпляров)."""
+    return WEBHOOK_SECRET or hashlib.sha256(BOT_TOKEN.encode('utf-8')).hexdigest()
+
+async def wait_for_stop() -> None:
+    """Ждёт SIGINT/SIGTERM (в режиме вебхука сигналы не обрабатывает start_polling)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: остановка по KeyboardInterrupt
+            pass
+    await stop.wait()
+
 async def main() -> None:
     """Start and run the bot."""
-    logger.info("Starting bot...")
+    logger.info("Starting bot in %s mode...", BOT_MODE)
+    server = BotServer(HTTP_HOST, METRICS_PORT, BOT_MODE)
     
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
+        if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+            raise ValueError("Для BOT_MODE=webhook нужно задать WEBHOOK_URL")
+        
         logger.info("Bot %s started successfully", (await bot.get_me()).username)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        
+        # Каталог готовых изображений просматривается в потоке, а не при первой отправке
+        await renditions.scan()
+        
+        # Фоновый прогрев данных NASA рядом с приёмом обновлений
+        if PREFETCH_ENABLED:
+            prefetch.register_prefetch_jobs(scheduler)
+            scheduler.start()
+        
+        if BOT_MODE == 'webhook':
+            # Обновления принимает HTTP-сервер; вебхук не удаляется при остановке,
+            # чтобы не отключить другие экземпляры за балансировщиком
+            secret = webhook_secret()
+            server.add_webhook(dp, bot, WEBHOOK_PATH, secret, inline_answers=INLINE_CALLBACK_ANSWERS)
+            await server.start()
+            await bot.set_webhook(
+                WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+                secret_token=secret,
+                allowed_updates=dp.resolve_used_update_types()
+            )
+            server.ready = True
+            await wait_for_stop()
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            # /health и /ready нужны healthcheck контейнера и без метрик
+            await server.start()
+            server.ready = True
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
         
     except Exception as e:
         logger.error("Critical bot error: %s", e, exc_info=True)
         raise
         
     finally:
+        await server.stop()
+        await scheduler.stop()
+        await asyncio.gather(*(pool.stop() for pool in nasa_handlers.rover_pools.values()))
+        close_caches()
+        await pool_manager.close()
+        image_processor.close()
         await bot.session.close()
         logger.info("Bot stopped")
 
@@ -0,0 +1,157 @@
+"""
+Модуль автоматических выключателей (circuit breaker) для внешних API.
+
+Для каждого семейства эндпоинтов (лента NEO, фото марсоходов, снимки Земли,
+Wikimedia) ведётся свой выключатель. После серии ошибок подряд он
+размыкается, и запросы к этому семейству сразу отклоняются с
+CircuitOpenError вместо долгого ожидания таймаутов. Через reset_timeout
+выключатель пропускает один пробный запрос (полуразомкнутое состояние):
+успех замыкает его, ошибка снова размыкает.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from utils.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_THRESHOLD = 5  # Ошибок подряд до размыкания
+RESET_TIMEOUT = 30.0  # Секунд до пробного запроса
+
+# Семейства эндпоинтов: имя и фрагмент "хост/путь", по которому оно узнаётся.
+# Остальные адреса получают выключатель по имени хоста.
+ENDPOINT_FAMILIES = (
+    ('neo', 'api.nasa.gov/neo/'),
+    ('mars_photos', 'api.nasa.gov/mars-photos/'),
+    ('earth', 'api.nasa.gov/planetary/earth/'),
+    ('wikimedia', 'wikimedia.org'),
+)
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонён: выключатель эндпоинта разомкнут."""
+
+
+class CircuitBreaker:
+    """
+    Выключатель одного семейства эндпоинтов.
+
+    Attributes:
+        name (str): Имя семейства
+        state (str): Состояние: closed, open или half_open
+        failures (int): Ошибок подряд
+        transitions (int): Количество смен состояния
+        opened_at (float): Момент размыкания (time.monotonic)
+        _trial_started (Optional[float]): Начало пробного запроса в half_open
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.transitions = 0
+        self.opened_at = 0.0
+        self._trial_started: Optional[float] = None
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Выключатель {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.transitions += 1
+        monitor.increment(f"breaker_transitions:{self.name}:{state}")
+
+    def allow(self) -> bool:
+        """
+        Проверяет, можно ли сейчас отправить запрос.
+
+        В полуразомкнутом состоянии пропускается один пробный запрос;
+        если его результат не был записан (например, запрос отменили),
+        через reset_timeout пропускается следующий.
+
+        Returns:
+            bool: True, если запрос можно отправлять
+        """
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self._transition(HALF_OPEN)
+        if self._trial_started is None or now - self._trial_started > self.reset_timeout:
+            self._trial_started = now
+            return True
+        return False
+
+    def check(self) -> None:
+        """
+        Отклоняет запрос, если выключатель разомкнут.
+
+        Raises:
+            CircuitOpenError: Если запрос отправлять нельзя
+        """
+        if not self.allow():
+            monitor.increment(f"breaker_rejected:{self.name}")
+            raise CircuitOpenError(f"{self.name} временно недоступен")
+
+    def record_success(self) -> None:
+        """Записывает успешный ответ."""
+        self.failures = 0
+        self._trial_started = None
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """Записывает ошибку (сетевая ошибка, таймаут или ответ 5xx)."""
+        self.failures += 1
+        self._trial_started = None
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+
+# Выключатели по именам семейств
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    """
+    Возвращает выключатель семейства эндпоинтов для абсолютного URL.
+
+    Args:
+        url (str): Адрес запроса
+
+    Returns:
+        CircuitBreaker: Выключатель семейства (создаётся при первом обращении)
+    """
+    parsed = urlparse(url)
+    target = f"{parsed.netloc}{parsed.path}"
+    name = next((family for family, marker in ENDPOINT_FAMILIES if marker in target), parsed.netloc)
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name)
+    return breakers[name]
+
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Возвращает состояние выключателей для /stats.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Состояние, ошибки подряд и число переходов
+    """
+    return {
+        name: {
+            'state': breaker.state,
+            'failures': breaker.failures,
+            'transitions': breaker.transitions
+        }
+        for name, breaker in breakers.items()
+    }
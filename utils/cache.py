@@ -1,155 +1,321 @@
 """
 Модуль для кэширования данных API запросов.
 
-Использует оптимизированный in-memory кэш с временем жизни для хранения
-результатов запросов к API NASA. Поддерживает мониторинг попаданий/промахов
-и автоматическую очистку устаревших данных.
+Использует двухуровневый кэш для хранения результатов запросов к API NASA:
+L1 — оптимизированный in-memory кэш с временем жизни внутри процесса,
+L2 — общий Redis кэш, переживающий перезапуски и разделяемый репликами.
+Поддерживает мониторинг попаданий/промахов по уровням и автоматическую
+очистку устаревших данных.
 """
 
+import sys
 import time
+import heapq
 import logging
-from typing import Any, Dict, Optional, Union, List, Tuple
+from typing import Any, Awaitable, Callable, Dict, Optional, Union, List, Tuple
 from functools import wraps
 from collections import OrderedDict
 import asyncio
-import threading
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+from datetime import date, datetime
 
-from .cache_config import CACHE_SETTINGS, DEFAULT_CACHE_TTL, DEFAULT_CACHE_SIZE
+from .cache_config import CACHE_SETTINGS, DEFAULT_CACHE_TTL, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_BYTES
+from .deadline import deadline_scope
+from .ratelimit import Priority, request_priority
+from .singleflight import SingleFlight
 
 
 logger = logging.getLogger(__name__)
 
 
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Оценивает объём значения в памяти в байтах.
+    
+    Учитывает основное содержимое (байты изображений, строки, вложенные
+    коллекции и поля объектов), а не точный размер Python-объектов.
+    
+    Args:
+        value (Any): Значение
+        
+    Returns:
+        int: Оценка объёма в байтах
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if value is None or isinstance(value, (int, float, bool)):
+        return 8
+    if _depth > 16:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return 64 + sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+            for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return 56 + 8 * len(value) + sum(estimate_size(v, _depth + 1) for v in value)
+    fields = getattr(value, '__dict__', None)
+    if fields is not None:
+        return 64 + sum(estimate_size(v, _depth + 1) for v in fields.values())
+    return sys.getsizeof(value)
+
+
 class TTLCache:
     """
     Оптимизированный in-memory кэш с TTL и мониторингом.
     
+    Устаревание записей обслуживается min-heap по времени истечения:
+    удаление одной записи стоит O(log n). Очистку запускает таймер
+    событийного цикла (loop.call_later), взводимый на ближайшее истечение,
+    без отдельных потоков. Вне событийного цикла устаревшие записи
+    удаляются лениво при get/set.
+    
+    При stale_ttl > 0 запись после истечения ttl ещё stale_ttl секунд
+    хранится как устаревшая: get её не возвращает, а lookup возвращает
+    с пометкой «не свежая» (режим stale-while-revalidate).
+    
+    Помимо количества элементов (maxsize) размер кэша может ограничиваться
+    суммарным объёмом в байтах (max_bytes): при превышении бюджета
+    вытесняются самые давно использованные записи. Объём записи оценивает
+    функция sizeof (по умолчанию estimate_size); без бюджета объём
+    не оценивается.
+    
     Attributes:
         ttl (int): Время жизни элементов в секундах
+        stale_ttl (int): Сколько секунд после ttl запись хранится как устаревшая
         maxsize (int): Максимальный размер кэша
+        max_bytes (Optional[int]): Бюджет кэша в байтах (None — без ограничения)
+        current_bytes (int): Оценка текущего объёма кэша в байтах
         cache (OrderedDict): Хранилище кэшированных данных
-        timestamps (Dict): Хранилище временных меток
+        timestamps (Dict): Время записи элементов (time.monotonic)
         metrics (Dict): Метрики использования кэша
-        _cleanup_lock (threading.Lock): Блокировка для очистки кэша
-        _executor (ThreadPoolExecutor): Пул потоков для фоновых задач
+        _sizes (Dict): Оценка объёма каждой записи в байтах
+        _expiry_heap (List): Куча (время истечения, ключ) с ленивым удалением
+        _timer (Optional[asyncio.TimerHandle]): Таймер следующей очистки
     """
     
-    def __init__(self, ttl: int = DEFAULT_CACHE_TTL, maxsize: int = DEFAULT_CACHE_SIZE):
+    # Минимальный интервал между срабатываниями таймера: истечения,
+    # попавшие в одно окно, обрабатываются одной пачкой
+    CLEANUP_GRANULARITY = 1.0
+    
+    def __init__(
+        self,
+        ttl: int = DEFAULT_CACHE_TTL,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        stale_ttl: int = 0,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
         self.ttl = ttl
+        self.stale_ttl = stale_ttl
         self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or estimate_size
+        self.current_bytes = 0
         self.cache: OrderedDict = OrderedDict()
         self.timestamps: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
         self.metrics = {
             'hits': 0,
             'misses': 0,
             'evictions': 0,
-            'size': 0
+            'stale_hits': 0,
+            'rejected': 0,
+            'size': 0,
+            'bytes': 0
         }
-        self._cleanup_lock = threading.Lock()
-        self._executor = ThreadPoolExecutor(max_workers=1)
-        self._schedule_cleanup()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        
+    @property
+    def lifetime(self) -> float:
+        """Полное время хранения записи, включая период устаревания."""
+        return self.ttl + self.stale_ttl
         
     def _schedule_cleanup(self) -> None:
-        """Планирует периодическую очистку кэша."""
-        self._executor.submit(self._cleanup_expired)
+        """Взводит таймер событийного цикла на ближайшее истечение."""
+        if self._timer is not None or not self._expiry_heap:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне событийного цикла очистка выполняется лениво в get/set
+            return
+        delay = max(self._expiry_heap[0][0] - time.monotonic(), self.CLEANUP_GRANULARITY)
+        self._timer = loop.call_later(delay, self._on_timer)
+        
+    def _on_timer(self) -> None:
+        """Обработчик таймера: удаляет устаревшие записи и взводит таймер заново."""
+        self._timer = None
+        self._cleanup_expired()
+        self._schedule_cleanup()
+        
+    def _cleanup_expired(self) -> int:
+        """
+        Удаляет устаревшие элементы из кэша.
         
-    def _cleanup_expired(self) -> None:
-        """Очищает устаревшие элементы из кэша."""
+        Returns:
+            int: Количество удалённых элементов
+        """
+        removed = 0
         try:
-            with self._cleanup_lock:
-                current_time = time.time()
-                expired_keys = [
-                    key for key, timestamp in self.timestamps.items()
-                    if current_time - timestamp > self.ttl
-                ]
-                
-                for key in expired_keys:
+            now = time.monotonic()
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                expires_at, key = heapq.heappop(heap)
+                # Запись в куче могла устареть: ключ перезаписан или удалён
+                timestamp = self.timestamps.get(key)
+                if timestamp is not None and timestamp + self.lifetime == expires_at:
                     self._remove_item(key)
                     self.metrics['evictions'] += 1
-                
-                self.metrics['size'] = len(self.cache)
-                
-                # Логируем статистику кэша
-                if expired_keys:
-                    logger.info(
-                        f"Cache cleanup: removed {len(expired_keys)} items. "
-                        f"Current size: {self.metrics['size']}"
-                    )
+                    removed += 1
+            
+            self.metrics['size'] = len(self.cache)
+            
+            if removed:
+                logger.info(
+                    f"Cache cleanup: removed {removed} items. "
+                    f"Current size: {self.metrics['size']}"
+                )
         except Exception as e:
             logger.error(f"Error during cache cleanup: {e}")
-        finally:
-            # Планируем следующую очистку через TTL/2
-            threading.Timer(self.ttl / 2, self._cleanup_expired).start()
+        return removed
+        
+    def _compact_heap(self) -> None:
+        """Перестраивает кучу, отбрасывая неактуальные записи."""
+        self._expiry_heap = [
+            (timestamp + self.lifetime, key) for key, timestamp in self.timestamps.items()
+        ]
+        heapq.heapify(self._expiry_heap)
             
     def _remove_item(self, key: str) -> None:
         """Удаляет элемент из кэша."""
         self.cache.pop(key, None)
         self.timestamps.pop(key, None)
+        self.current_bytes -= self._sizes.pop(key, 0)
+        self.metrics['bytes'] = self.current_bytes
         
-    def get(self, key: str) -> Optional[Any]:
-        """
-        Получает значение из кэша если оно не устарело.
-        
-        Args:
-            key (str): Ключ кэша
-            
-        Returns:
-            Optional[Any]: Значение из кэша или None
-        """
+    def _lookup(self, key: str, allow_stale: bool) -> Tuple[Optional[Any], bool]:
+        """Ищет запись и определяет, свежая ли она."""
         try:
             if key not in self.cache:
                 self.metrics['misses'] += 1
-                return None
+                return None, False
                 
-            if time.time() - self.timestamps[key] > self.ttl:
+            age = time.monotonic() - self.timestamps[key]
+            if age > self.lifetime:
                 self._remove_item(key)
                 self.metrics['evictions'] += 1
                 self.metrics['misses'] += 1
-                return None
+                return None, False
+                
+            fresh = age <= self.ttl
+            if not fresh and not allow_stale:
+                self.metrics['misses'] += 1
+                return None, False
                 
-            self.metrics['hits'] += 1
+            self.metrics['hits' if fresh else 'stale_hits'] += 1
             
             # Обновляем позицию элемента (LRU)
-            value = self.cache.pop(key)
-            self.cache[key] = value
-            return value
+            self.cache.move_to_end(key)
+            return self.cache[key], fresh
             
         except Exception as e:
             logger.error(f"Error getting item from cache: {e}")
-            return None
+            return None, False
+        
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Получает значение из кэша если оно не устарело.
+        
+        Args:
+            key (str): Ключ кэша
+            
+        Returns:
+            Optional[Any]: Значение из кэша или None
+        """
+        return self._lookup(key, allow_stale=False)[0]
+        
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Получает значение из кэша, включая устаревшее в пределах stale_ttl.
+        
+        Args:
+            key (str): Ключ кэша
+            
+        Returns:
+            Tuple[Optional[Any], bool]: Значение (или None) и признак свежести
+        """
+        return self._lookup(key, allow_stale=True)
         
-    def set(self, key: str, value: Any) -> None:
+    def set(self, key: str, value: Any, age: float = 0.0) -> None:
         """
         Сохраняет значение в кэш.
         
         Args:
             key (str): Ключ кэша
             value (Any): Значение для сохранения
+            age (float): Возраст значения в секундах (для записей из L2)
         """
         try:
-            with self._cleanup_lock:
-                if len(self.cache) >= self.maxsize:
-                    # Удаляем самый старый элемент (LRU)
-                    oldest = next(iter(self.cache))
-                    self._remove_item(oldest)
-                    self.metrics['evictions'] += 1
-                    
-                self.cache[key] = value
-                self.timestamps[key] = time.time()
-                self.metrics['size'] = len(self.cache)
+            now = time.monotonic()
+            if self._expiry_heap and self._expiry_heap[0][0] <= now:
+                self._cleanup_expired()
+            
+            size = self.sizeof(value) if self.max_bytes is not None else 0
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Запись больше всего бюджета: не вытесняем ради неё весь кэш
+                self._remove_item(key)
+                self.metrics['rejected'] += 1
+                logger.debug(f"Cache: запись {key} ({size} B) больше бюджета {self.max_bytes} B")
+                return
+            
+            if key in self.cache:
+                self._remove_item(key)
+            while self.cache and (
+                len(self.cache) >= self.maxsize
+                or (self.max_bytes is not None and self.current_bytes + size > self.max_bytes)
+            ):
+                # Удаляем самый давно использованный элемент (LRU)
+                oldest = next(iter(self.cache))
+                self._remove_item(oldest)
+                self.metrics['evictions'] += 1
+                
+            timestamp = now - age
+            self.cache[key] = value
+            self.timestamps[key] = timestamp
+            self._sizes[key] = size
+            self.current_bytes += size
+            self.metrics['bytes'] = self.current_bytes
+            heapq.heappush(self._expiry_heap, (timestamp + self.lifetime, key))
+            self.metrics['size'] = len(self.cache)
+            
+            # Перестраиваем кучу, если в ней накопилось много неактуальных записей
+            if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+                self._compact_heap()
+            if self._timer is None:
+                self._schedule_cleanup()
                 
         except Exception as e:
             logger.error(f"Error setting item in cache: {e}")
             
     def clear(self) -> None:
         """Очищает кэш."""
-        with self._cleanup_lock:
-            self.cache.clear()
-            self.timestamps.clear()
-            self.metrics['size'] = 0
-            self.metrics['evictions'] += len(self.cache)
+        self.metrics['evictions'] += len(self.cache)
+        self.cache.clear()
+        self.timestamps.clear()
+        self._sizes.clear()
+        self._expiry_heap.clear()
+        self.current_bytes = 0
+        self.metrics['size'] = 0
+        self.metrics['bytes'] = 0
+        
+    def close(self) -> None:
+        """Отменяет таймер очистки (при остановке бота)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
             
     def get_metrics(self) -> Dict[str, int]:
         """
@@ -165,8 +331,167 @@ class TTLCache:
         }
 
 
+class TieredCache:
+    """
+    Двухуровневый кэш: L1 (TTLCache в процессе) перед L2 (RedisCache).
+    
+    Чтение идёт сквозь уровни (read-through): промах L1 проверяет L2,
+    а попадание в L2 заполняет L1. Запись идёт в оба уровня (write-through).
+    RedisCache хранит значение вместе со временем записи, поэтому возраст
+    записи известен любому процессу.
+    
+    Attributes:
+        name (str): Тип кэша, используется в метриках и в ключах Redis
+        l1 (TTLCache): Локальный кэш процесса
+        l2 (Optional[RedisCache]): Общий Redis кэш или None
+        ttl (int): Время, в течение которого запись считается свежей
+        stale_ttl (int): Сколько секунд после ttl запись можно отдавать устаревшей
+        _refreshing (Dict[str, asyncio.Task]): Фоновые обновления по ключам
+    """
+    
+    KEY_PREFIX = "nasa_bot:cache"
+    
+    def __init__(
+        self,
+        name: str,
+        l1: TTLCache,
+        l2: Optional[Any] = None,
+        ttl: int = DEFAULT_CACHE_TTL,
+        stale_ttl: int = 0
+    ):
+        self.name = name
+        self.l1 = l1
+        self.l2 = l2
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        
+    def _l2_key(self, key: str) -> str:
+        """Формирует ключ Redis для записи кэша."""
+        return f"{self.KEY_PREFIX}:{self.name}:{key}"
+        
+    async def _l2_lookup(self, key: str) -> Tuple[Optional[Any], float]:
+        """Читает запись из L2; возвращает значение и его возраст в секундах."""
+        return await self.l2.get_entry(self._l2_key(key))
+        
+    async def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Получает значение из L1, при промахе — из L2 с заполнением L1.
+        
+        Возвращает и устаревшие записи в пределах stale_ttl.
+        
+        Args:
+            key (str): Ключ кэша
+            
+        Returns:
+            Tuple[Optional[Any], bool]: Значение (или None) и признак свежести
+        """
+        from utils.monitoring import monitor
+        
+        value, fresh = self.l1.lookup(key)
+        if value is not None:
+            monitor.record_cache_hit(self.name, tier='l1')
+            return value, fresh
+        monitor.record_cache_miss(self.name, tier='l1')
+        
+        if self.l2 is None:
+            return None, False
+            
+        value, age = await self._l2_lookup(key)
+        if value is None or age > self.ttl + self.stale_ttl:
+            monitor.record_cache_miss(self.name, tier='l2')
+            return None, False
+            
+        monitor.record_cache_hit(self.name, tier='l2')
+        self.l1.set(key, value, age=age)
+        return value, age <= self.ttl
+        
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Получает свежее значение из L1, при промахе — из L2 с заполнением L1.
+        
+        Args:
+            key (str): Ключ кэша
+            
+        Returns:
+            Optional[Any]: Значение из кэша или None
+        """
+        value, fresh = await self.lookup(key)
+        return value if fresh else None
+        
+    async def set(self, key: str, value: Any) -> None:
+        """
+        Сохраняет значение в оба уровня кэша.
+        
+        Args:
+            key (str): Ключ кэша
+            value (Any): Значение для сохранения
+        """
+        self.l1.set(key, value)
+        if self.l2 is not None:
+            await self.l2.set(self._l2_key(key), value, ttl=self.ttl + self.stale_ttl)
+            
+    def refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Запускает фоновое обновление записи, если оно ещё не идёт.
+        
+        Перед вызовом loader проверяется L2: запись могла уже обновить
+        другая реплика. При ошибке обновления устаревшая запись остаётся
+        и продолжает отдаваться до истечения stale_ttl.
+        
+        Args:
+            key (str): Ключ кэша
+            loader (Callable): Фабрика корутины, получающей свежее значение
+        """
+        if key in self._refreshing:
+            return
+        task = asyncio.ensure_future(self._refresh(key, loader))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+        
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        """Получает свежее значение и сохраняет его в оба уровня."""
+        from utils.monitoring import monitor
+        
+        # Пользователь уже получил устаревшую запись, обновление — фоновое
+        # и не ограничено дедлайном его обновления
+        request_priority.set(Priority.PREFETCH)
+        try:
+            with deadline_scope(None):
+                if self.l2 is not None:
+                    value, age = await self._l2_lookup(key)
+                    if value is not None and age <= self.ttl:
+                        self.l1.set(key, value, age=age)
+                        return
+                        
+                value = await loader()
+                if value is None or not getattr(value, 'cacheable', True):
+                    raise ValueError("загрузчик не вернул пригодный для кэша результат")
+                await self.set(key, value)
+            monitor.increment(f"stale_refreshes:{self.name}")
+        except Exception as e:
+            monitor.increment(f"stale_refresh_failures:{self.name}")
+            logger.warning(f"Не удалось обновить запись кэша {self.name}:{key}, отдаём устаревшую: {e}")
+            
+    async def clear(self) -> None:
+        """Очищает оба уровня кэша."""
+        self.l1.clear()
+        if self.l2 is not None:
+            await self.l2.delete_prefix(f"{self.KEY_PREFIX}:{self.name}:")
+
+
 # Создаем кэши для разных типов данных
 caches = {}
+tiered_caches = {}
+
+def _get_settings(cache_type: str) -> Dict[str, Any]:
+    """Возвращает настройки кэша для указанного типа."""
+    return CACHE_SETTINGS.get(cache_type, {
+        'ttl': DEFAULT_CACHE_TTL,
+        'max_size': DEFAULT_CACHE_SIZE,
+        'max_bytes': DEFAULT_CACHE_BYTES,
+        'stale_ttl': 0
+    })
 
 def get_cache_for_type(cache_type: str) -> TTLCache:
     """
@@ -179,47 +504,144 @@ def get_cache_for_type(cache_type: str) -> TTLCache:
         TTLCache: Экземпляр кэша для указанного типа
     """
     if cache_type not in caches:
-        settings = CACHE_SETTINGS.get(cache_type, {
-            'ttl': DEFAULT_CACHE_TTL,
-            'max_size': DEFAULT_CACHE_SIZE
-        })
+        settings = _get_settings(cache_type)
         caches[cache_type] = TTLCache(
             ttl=settings['ttl'],
-            maxsize=settings['max_size']
+            maxsize=settings['max_size'],
+            stale_ttl=settings.get('stale_ttl', 0),
+            max_bytes=settings.get('max_bytes', DEFAULT_CACHE_BYTES)
         )
     return caches[cache_type]
 
-def cache_response(cache_type: str = None):
+def close_caches() -> None:
+    """Останавливает таймеры очистки всех кэшей."""
+    for cache in caches.values():
+        cache.close()
+
+def get_tiered_cache(cache_type: str) -> TieredCache:
+    """
+    Получает или создает двухуровневый кэш для определенного типа данных.
+    
+    L1 совпадает с кэшем из get_cache_for_type, L2 — общий redis_cache.
+    
+    Args:
+        cache_type (str): Тип кэша из cache_config.CACHE_SETTINGS
+        
+    Returns:
+        TieredCache: Экземпляр двухуровневого кэша
+    """
+    if cache_type not in tiered_caches:
+        from utils.redis_cache import redis_cache
+        
+        settings = _get_settings(cache_type)
+        tiered_caches[cache_type] = TieredCache(
+            name=cache_type,
+            l1=get_cache_for_type(cache_type),
+            l2=redis_cache,
+            ttl=settings['ttl'],
+            stale_ttl=settings.get('stale_ttl', 0)
+        )
+    return tiered_caches[cache_type]
+
+_KEY_TYPES = (str, int, float, bool, type(None), date)
+
+def make_cache_key(prefix: str, *args, **kwargs) -> Optional[str]:
+    """
+    Формирует ключ кэша из смысловых аргументов вызова.
+    
+    Ключ строится только из простых значений (строк, чисел, дат). Для
+    объектов вроде Message или CallbackQuery ключ не строится, потому что
+    их строковое представление уникально для каждого обновления.
+    
+    Args:
+        prefix (str): Префикс ключа, обычно имя функции
+        *args: Позиционные аргументы вызова
+        **kwargs: Именованные аргументы вызова
+        
+    Returns:
+        Optional[str]: Ключ кэша или None, если аргументы не подходят
+    """
+    values = list(args) + [kwargs[name] for name in sorted(kwargs)]
+    if not all(isinstance(value, _KEY_TYPES) for value in values):
+        return None
+    parts = [str(value) for value in args]
+    parts += [f"{name}={kwargs[name]}" for name in sorted(kwargs)]
+    return ":".join([prefix, *parts])
+
+def cache_response(cache_type: str = None, key: Optional[Callable[..., Any]] = None):
     """
     Декоратор для кэширования ответов API с мониторингом.
     
+    Результат ищется сначала в L1, затем в Redis (L2); новые
+    результаты записываются в оба уровня. Результаты None и объекты
+    с атрибутом cacheable=False не кэшируются.
+    
+    Если для типа кэша задан stale_ttl, устаревшая запись отдаётся сразу,
+    а обновление запускается в фоне (stale-while-revalidate).
+    
+    Одновременные промахи по одному ключу объединяются: функция
+    выполняется один раз, остальные вызывающие ждут её результат.
+    
+    У обёрнутой функции есть метод prefetch(*args, **kwargs): он всегда
+    вызывает функцию и перезаписывает кэш (для фонового прогрева).
+    
     Args:
         cache_type (str): Тип кэша из cache_config.CACHE_SETTINGS
+        key (Callable, optional): Функция, получающая аргументы вызова и
+            возвращающая смысловую часть ключа (например, дату, id объекта
+            или кортеж координат).
+            По умолчанию ключ строится из простых аргументов (make_cache_key)
     """
     def decorator(func):
+        flight = SingleFlight(cache_type or func.__name__)
+        
+        def build_key(args, kwargs) -> Optional[str]:
+            if key is not None:
+                semantic = key(*args, **kwargs)
+                if not isinstance(semantic, tuple):
+                    semantic = (semantic,)
+                return make_cache_key(func.__name__, *semantic)
+            return make_cache_key(func.__name__, *args, **kwargs)
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            from utils.monitoring import monitor
+            cache_key = build_key(args, kwargs)
+            
+            if cache_key is None:
+                logger.debug(f"{func.__name__}: аргументы не подходят для ключа кэша, кэш пропущен")
+                return await func(*args, **kwargs)
             
             # Определяем тип кэша или используем имя функции
-            cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            cache = get_cache_for_type(cache_type or func.__name__)
+            cache = get_tiered_cache(cache_type or func.__name__)
             
-            # Проверяем кэш
-            cached_result = cache.get(cache_key)
+            # Проверяем кэш (L1, затем L2)
+            cached_result, fresh = await cache.lookup(cache_key)
             if cached_result is not None:
-                monitor.record_cache_hit(cache_type or func.__name__)
+                if not fresh:
+                    from utils.monitoring import monitor
+                    
+                    monitor.increment(f"stale_served:{cache.name}")
+                    cache.refresh(cache_key, lambda: func(*args, **kwargs))
                 return cached_result
             
-            # Кэш-мисс
-            monitor.record_cache_miss(cache_type or func.__name__)
+            async def load():
+                # Получаем новые данные и кэшируем их в оба уровня
+                result = await func(*args, **kwargs)
+                if result is not None and getattr(result, 'cacheable', True):
+                    await cache.set(cache_key, result)
+                return result
             
-            # Получаем новые данные
+            # Одновременные промахи по ключу ждут один вызов
+            return await flight.do(cache_key, load)
+        
+        async def prefetch(*args, **kwargs):
+            """Получает свежий результат и записывает его в кэш."""
             result = await func(*args, **kwargs)
-            
-            # Кэшируем результат
-            cache.set(cache_key, result)
-            
+            cache_key = build_key(args, kwargs)
+            if cache_key is not None and result is not None and getattr(result, 'cacheable', True):
+                await get_tiered_cache(cache_type or func.__name__).set(cache_key, result)
             return result
+        
+        wrapper.prefetch = prefetch
         return wrapper
     return decorator
@@ -5,19 +5,55 @@
 # Настройки кэширования по умолчанию
 DEFAULT_CACHE_TTL = 3600  # 1 час
 DEFAULT_CACHE_SIZE = 100  # Максимальное количество элементов
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024  # Бюджет памяти кэша: 16 МБ
 
-# Настройки кэширования для разных типов данных
+MB = 1024 * 1024
+
+# Настройки кэширования для разных типов данных.
+# stale_ttl — сколько секунд после истечения ttl запись ещё отдаётся
+# пользователю (устаревшей), пока в фоне выполняется обновление;
+# max_bytes — бюджет памяти кэша (записи вытесняются по LRU при превышении)
 CACHE_SETTINGS = {
     'asteroids': {
-        'ttl': 12 * 3600,  # Обновляем каждые 12 часов
-        'max_size': 50     # Данные по астероидам
+        'ttl': 3 * 3600,        # Свежими считаем 3 часа
+        'stale_ttl': 12 * 3600, # Ещё 12 часов отдаём, обновляя в фоне
+        'max_size': 50,         # Недельные ленты астероидов
+        'max_bytes': 4 * MB
     },
     'mars_photos': {
-        'ttl': 7 * 24 * 3600,  # Неделя
-        'max_size': 200    # Фотографии с Марса меняются редко
+        'ttl': 6 * 3600,            # Списки latest_photos
+        'stale_ttl': 7 * 24 * 3600, # Фотографии с Марса меняются редко
+        'max_size': 200,
+        'max_bytes': 8 * MB
     },
     'earth_imagery': {
         'ttl': 30 * 24 * 3600,  # Месяц
-        'max_size': 100    # Спутниковые снимки
+        'max_size': 100,   # Ответы со спутниковыми снимками (сами снимки — в renditions)
+        'max_bytes': 2 * MB
+    },
+    'earth_negative': {
+        'ttl': 6 * 3600,   # Даты без снимков для ячейки координат
+        'max_size': 5000,  # Записи крошечные: ключ и флаг
+        'max_bytes': 1 * MB
+    },
+    'mars_photo_renders': {
+        'ttl': 7 * 24 * 3600,  # Неделя
+        'max_size': 50,    # Готовые (оптимизированные) фото с Марса
+        'max_bytes': 48 * MB
+    },
+    'images': {
+        'ttl': 7 * 24 * 3600,  # Неделя
+        'max_size': 30,    # Изображения планет и экзопланет
+        'max_bytes': 16 * MB
+    },
+    'http_validators': {
+        'ttl': 30 * 24 * 3600,  # Последние успешные ответы: тело и ETag/Last-Modified
+        'max_size': 500,
+        'max_bytes': 32 * MB
+    },
+    'exoplanet_info': {
+        'ttl': 7 * 24 * 3600,  # Неделя
+        'max_size': 20,    # Описания экзопланет с изображениями
+        'max_bytes': 16 * MB
     }
 }
@@ -0,0 +1,222 @@
+"""
+Модуль сериализации значений кэша для Redis.
+
+Вместо pickle значения кодируются компактными и переносимыми форматами:
+- байты (изображения) хранятся как есть
+- JSON-совместимые данные (ответы NASA API) — через orjson
+- структуры с байтами и зарегистрированные типы — через msgpack
+
+Крупные JSON значения сжимаются zstd (если установлен пакет zstandard)
+или zlib. msgpack используется для значений с изображениями, которые уже
+сжаты, поэтому повторно не сжимается. Каждое значение предваряется
+заголовком с версией формата, кодеком, флагами сжатия и временем записи.
+"""
+
+import struct
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+import msgpack
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - запасной вариант без orjson
+    orjson = None
+    import json
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd необязателен
+    zstandard = None
+
+
+FORMAT_VERSION = 1
+
+# Идентификаторы кодеков
+RAW = 0
+JSON = 1
+MSGPACK = 2
+
+# Флаги сжатия
+ZLIB = 0x10
+ZSTD = 0x20
+# В JSON есть зарегистрированные типы, которые нужно восстановить
+TYPED = 0x40
+
+# Порог размера (в байтах), начиная с которого значение сжимается
+COMPRESS_THRESHOLD = 1024
+
+# Заголовок: версия формата, кодек|флаги сжатия, время записи (unix time)
+_HEADER = struct.Struct('>BBd')
+
+_TYPE_KEY = '__type__'
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+class CodecError(ValueError):
+    """Ошибка декодирования значения кэша."""
+
+
+# Зарегистрированные типы: имя -> (класс, to_dict, from_dict)
+_types_by_name: Dict[str, Tuple[Type, Callable[[Any], Dict], Callable[[Dict], Any]]] = {}
+_names_by_type: Dict[Type, str] = {}
+
+
+def register_type(
+    cls: Type,
+    name: str,
+    to_dict: Callable[[Any], Dict[str, Any]],
+    from_dict: Callable[[Dict[str, Any]], Any]
+) -> None:
+    """
+    Регистрирует пользовательский тип для сериализации.
+
+    Args:
+        cls (Type): Класс значения
+        name (str): Устойчивое имя типа в сохранённых данных
+        to_dict (Callable): Преобразование объекта в словарь
+        from_dict (Callable): Восстановление объекта из словаря
+    """
+    _types_by_name[name] = (cls, to_dict, from_dict)
+    _names_by_type[cls] = name
+
+
+class _Encoder:
+    """Хук default для orjson/msgpack, запоминающий, были ли типы."""
+
+    def __init__(self):
+        self.typed = False
+
+    def __call__(self, obj: Any) -> Any:
+        name = _names_by_type.get(type(obj))
+        if name is None:
+            raise TypeError(f"Type is not serializable: {type(obj).__name__}")
+        self.typed = True
+        return {_TYPE_KEY: name, **_types_by_name[name][1](obj)}
+
+
+def _revive(data: Dict[str, Any]) -> Any:
+    """Восстанавливает зарегистрированный тип из словаря с меткой типа."""
+    name = data.get(_TYPE_KEY)
+    if name is None:
+        return data
+    entry = _types_by_name.get(name)
+    if entry is None:
+        raise CodecError(f"Неизвестный тип в кэше: {name}")
+    fields = {k: v for k, v in data.items() if k != _TYPE_KEY}
+    return entry[2](fields)
+
+
+def _revive_tree(value: Any) -> Any:
+    """Рекурсивно восстанавливает типы после JSON (у orjson нет object_hook)."""
+    if isinstance(value, dict):
+        return _revive({k: _revive_tree(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_revive_tree(v) for v in value]
+    return value
+
+
+def _json_dumps(value: Any, default: Callable[[Any], Any]) -> bytes:
+    if orjson is not None:
+        # Без этого флага orjson сам превращает dataclass в словарь без метки типа
+        return orjson.dumps(value, default=default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _compress(body: bytes) -> Tuple[bytes, int]:
+    """Сжимает тело значения, если это даёт выигрыш; возвращает тело и флаг."""
+    if len(body) < COMPRESS_THRESHOLD:
+        return body, 0
+    if zstandard is not None:
+        compressed, flag = _zstd_compressor.compress(body), ZSTD
+    else:
+        compressed, flag = zlib.compress(body, 6), ZLIB
+    if len(compressed) >= len(body):
+        return body, 0
+    return compressed, flag
+
+
+def _decompress(body: bytes, flags: int) -> bytes:
+    if flags & ZSTD:
+        if zstandard is None:
+            raise CodecError("Значение сжато zstd, но пакет zstandard не установлен")
+        return _zstd_decompressor.decompress(body)
+    if flags & ZLIB:
+        return zlib.decompress(body)
+    return body
+
+
+def encode(value: Any, stored_at: Optional[float] = None) -> bytes:
+    """
+    Кодирует значение для хранения в Redis.
+
+    Args:
+        value (Any): Значение (bytes, JSON-совместимые данные или
+            зарегистрированный тип)
+        stored_at (float, optional): Время записи; по умолчанию текущее
+
+    Returns:
+        bytes: Закодированное значение с заголовком
+    """
+    stored_at = time.time() if stored_at is None else stored_at
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # Изображения уже сжаты (JPEG/PNG), повторное сжатие не помогает
+        return _HEADER.pack(FORMAT_VERSION, RAW, stored_at) + bytes(value)
+
+    encoder = _Encoder()
+    try:
+        body = _json_dumps(value, encoder)
+    except TypeError:
+        # Внутри есть байты (изображение) — msgpack хранит их без base64
+        body = msgpack.packb(value, default=_Encoder(), use_bin_type=True)
+        return _HEADER.pack(FORMAT_VERSION, MSGPACK, stored_at) + body
+
+    body, flags = _compress(body)
+    if encoder.typed:
+        flags |= TYPED
+    return _HEADER.pack(FORMAT_VERSION, JSON | flags, stored_at) + body
+
+
+def decode(data: bytes) -> Tuple[Any, float]:
+    """
+    Декодирует значение, сохранённое функцией encode.
+
+    Args:
+        data (bytes): Данные из Redis
+
+    Returns:
+        Tuple[Any, float]: Значение и время его записи
+
+    Raises:
+        CodecError: Если данные записаны в другом формате
+    """
+    if len(data) < _HEADER.size:
+        raise CodecError("Слишком короткое значение")
+    version, codec_flags, stored_at = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise CodecError(f"Неподдерживаемая версия формата: {version}")
+
+    codec = codec_flags & 0x0F
+    body = memoryview(data)[_HEADER.size:]
+    if codec == RAW:
+        return bytes(body), stored_at
+
+    body = _decompress(bytes(body), codec_flags & 0xF0)
+    if codec == JSON:
+        value = _json_loads(body)
+        if codec_flags & TYPED:
+            value = _revive_tree(value)
+        return value, stored_at
+    if codec == MSGPACK:
+        return msgpack.unpackb(body, object_hook=_revive, raw=False), stored_at
+    raise CodecError(f"Неизвестный кодек: {codec}")
@@ -0,0 +1,143 @@
+"""
+Модуль бюджета времени на обработку обновления Telegram.
+
+Каждое обновление получает дедлайн (UPDATE_DEADLINE секунд), который
+хранится в contextvar и доступен всему пути запроса: повторы APIClient
+не начинаются, если бюджета на них не осталось, таймауты HTTP-запросов
+не выходят за дедлайн, а обработчики могут выбрать упрощённый ответ.
+Middleware DeadlineMiddleware гарантирует, что пользователь получит
+ответ не позже дедлайна.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Момент time.monotonic(), к которому нужно ответить; None — без ограничения
+_deadline: ContextVar[Optional[float]] = ContextVar('deadline', default=None)
+
+DEGRADED_TEXT = "⏳ Сервисы NASA сейчас отвечают слишком долго. Попробуйте, пожалуйста, ещё раз чуть позже."
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени обновления исчерпан."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Задаёт дедлайн для кода внутри блока.
+
+    Вложенный блок не может продлить внешний дедлайн. None снимает
+    ограничение (для фоновых задач, унаследовавших контекст обновления).
+
+    Args:
+        seconds (Optional[float]): Бюджет в секундах от текущего момента
+    """
+    if seconds is None:
+        token = _deadline.set(None)
+    else:
+        target = time.monotonic() + seconds
+        current = _deadline.get()
+        token = _deadline.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Возвращает текущий дедлайн (time.monotonic) или None."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Возвращает остаток бюджета в секундах или None, если ограничения нет."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    """Проверяет, истёк ли бюджет."""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(needed: float = 0.0) -> None:
+    """
+    Проверяет, что на операцию осталось не меньше needed секунд.
+
+    Args:
+        needed (float): Минимально необходимый остаток бюджета
+
+    Raises:
+        DeadlineExceeded: Если бюджета не хватает
+    """
+    left = remaining()
+    if left is not None and left <= needed:
+        raise DeadlineExceeded(f"осталось {max(0.0, left):.1f} сек, нужно {needed:.1f}")
+
+
+def bounded(timeout: float) -> float:
+    """
+    Ограничивает таймаут операции остатком бюджета.
+
+    Args:
+        timeout (float): Собственный таймаут операции
+
+    Returns:
+        float: Таймаут, не выходящий за дедлайн
+    """
+    left = remaining()
+    return timeout if left is None else max(0.0, min(timeout, left))
+
+
+class DeadlineMiddleware(BaseMiddleware):
+    """
+    Outer-middleware обновлений: задаёт дедлайн и не даёт обработке
+    выйти за него.
+
+    Если обработчик не уложился, он отменяется, а пользователю
+    отправляется DEGRADED_TEXT.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        with deadline_scope(self.seconds):
+            try:
+                async with asyncio.timeout(self.seconds):
+                    return await handler(event, data)
+            except (TimeoutError, DeadlineExceeded):
+                monitor.increment('deadline_exceeded')
+                logger.warning(f"Обновление не уложилось в {self.seconds} сек")
+                await self._apologize(event)
+
+    @staticmethod
+    async def _apologize(event: TelegramObject) -> None:
+        """Сообщает пользователю, что ответ не успел подготовиться."""
+        if not isinstance(event, Update):
+            return
+        try:
+            if event.message:
+                await event.message.answer(DEGRADED_TEXT)
+            elif event.callback_query and event.callback_query.message:
+                await event.callback_query.message.answer(DEGRADED_TEXT)
+        except Exception as e:
+            logger.warning(f"Не удалось отправить сообщение о таймауте: {e}")
@@ -0,0 +1,175 @@
+"""
+Модуль для хранения Telegram file_id отправленных изображений.
+
+После первой загрузки изображения Telegram возвращает file_id, по которому
+тот же файл можно отправить повторно без загрузки байтов. Реестр хранит
+соответствие «источник изображения → file_id» в памяти и в постоянном
+хранилище (Redis или JSON-файл на диске), поэтому переживает перезапуски.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import FILE_ID_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Время жизни записей в Redis: file_id в Telegram не устаревают,
+# но неиспользуемые записи не должны копиться бесконечно
+FILE_ID_TTL = 90 * 24 * 3600
+
+# Сколько записей держать в памяти (и в JSON-файле); давно не
+# использованные вытесняются первыми
+FILE_ID_MEMORY_SIZE = 5000
+
+
+def content_key(data: bytes) -> str:
+    """
+    Формирует ключ реестра по содержимому изображения.
+
+    Args:
+        data (bytes): Байты изображения
+
+    Returns:
+        str: Ключ вида sha256:<hex>
+    """
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+class FileIdRegistry:
+    """
+    Реестр file_id с постоянным хранением.
+
+    Attributes:
+        path (Optional[str]): Путь к JSON-файлу; если не задан, используется Redis
+        max_size (int): Максимум записей в памяти; в режиме файла — и в файле
+        _memory (OrderedDict[str, str]): Локальная копия реестра в порядке использования
+        _loaded (bool): Загружен ли реестр с диска
+        _lock (asyncio.Lock): Блокировка записи файла
+    """
+
+    KEY_PREFIX = "nasa_bot:file_id"
+
+    def __init__(self, path: Optional[str] = None, max_size: int = FILE_ID_MEMORY_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def _load_file(self) -> None:
+        """Загружает реестр из JSON-файла (один раз)."""
+        if self._loaded or not self.path:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._memory.update(json.load(f))
+            self._trim()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Не удалось загрузить реестр file_id из {self.path}: {e}")
+
+    def _remember(self, key: str, file_id: str) -> None:
+        """Записывает file_id в память, вытесняя давно не использованные записи."""
+        self._memory[key] = file_id
+        self._memory.move_to_end(key)
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    async def _persist(self) -> None:
+        """Сохраняет копию реестра в JSON-файл."""
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write_file, dict(self._memory))
+            except Exception as e:
+                logger.error(f"Не удалось сохранить реестр file_id в {self.path}: {e}")
+
+    def _write_file(self, snapshot: Dict[str, str]) -> None:
+        """Атомарно записывает реестр в JSON-файл."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает file_id для источника изображения.
+
+        Args:
+            key (str): URL источника или content_key изображения
+
+        Returns:
+            Optional[str]: file_id или None
+        """
+        from utils.monitoring import monitor
+
+        self._load_file()
+        file_id = self._memory.get(key)
+        if file_id is not None:
+            self._memory.move_to_end(key)
+        elif not self.path:
+            from utils.redis_cache import redis_cache
+
+            file_id = await redis_cache.get(f"{self.KEY_PREFIX}:{key}")
+            if file_id is not None:
+                self._remember(key, file_id)
+
+        if file_id is None:
+            monitor.record_cache_miss('file_ids')
+        else:
+            monitor.record_cache_hit('file_ids')
+        return file_id
+
+    async def set(self, key: str, file_id: str) -> None:
+        """
+        Запоминает file_id для источника изображения.
+
+        Args:
+            key (str): URL источника или content_key изображения
+            file_id (str): file_id, полученный от Telegram
+        """
+        self._load_file()
+        self._remember(key, file_id)
+        if not self.path:
+            from utils.redis_cache import redis_cache
+
+            await redis_cache.set(f"{self.KEY_PREFIX}:{key}", file_id, ttl=FILE_ID_TTL)
+            return
+
+        await self._persist()
+
+    async def forget(self, key: str) -> None:
+        """
+        Удаляет недействительный file_id из реестра.
+
+        Args:
+            key (str): URL источника или content_key изображения
+        """
+        self._load_file()
+        removed = self._memory.pop(key, None)
+        if not self.path:
+            from utils.redis_cache import redis_cache
+
+            await redis_cache.delete(f"{self.KEY_PREFIX}:{key}")
+            return
+
+        # Иначе недействительный file_id вернётся из файла после перезапуска
+        if removed is not None:
+            await self._persist()
+
+
+# Глобальный реестр file_id
+file_ids = FileIdRegistry(FILE_ID_CACHE_PATH or None)
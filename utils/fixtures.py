@@ -0,0 +1,129 @@
+"""
+Модуль хранилища записанных HTTP-ответов (фикстур).
+
+Формат каталога фикстур:
+- index.json — словарь «ключ запроса -> статус, заголовки, файл тела»
+- bodies/<sha256>.bin — тела ответов
+
+Ключ запроса — хост, путь и отсортированные параметры без секретов
+(api_key), поэтому одна запись подходит для любого ключа NASA.
+Фикстуры записывает APIClient в режиме записи (HTTP_RECORD_DIR),
+а отдаёт локальный сервер benchmarks.stand_in.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Параметры, которые не попадают в ключ и не сохраняются
+SECRET_PARAMS = frozenset({'api_key'})
+
+# Заголовки ответа, которые сохраняются вместе с телом
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+@dataclass
+class Fixture:
+    """
+    Записанный ответ.
+
+    Attributes:
+        status (int): HTTP-статус
+        headers (Dict[str, str]): Сохранённые заголовки (RECORDED_HEADERS)
+        body (str): Имя файла тела в каталоге bodies/
+    """
+
+    status: int
+    headers: Dict[str, str]
+    body: str
+
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Формирует ключ запроса для фикстур.
+
+    Args:
+        url (str): Абсолютный адрес запроса (параметры могут быть в нём)
+        params (Mapping, optional): Параметры запроса
+
+    Returns:
+        str: Ключ вида "api.nasa.gov/neo/rest/v1/feed?start_date=..."
+    """
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    query.update({str(k): str(v) for k, v in (params or {}).items()})
+    items = sorted((k, v) for k, v in query.items() if k not in SECRET_PARAMS)
+    key = f"{parsed.netloc}{parsed.path}"
+    return f"{key}?{urlencode(items)}" if items else key
+
+
+class FixtureStore:
+    """
+    Каталог фикстур на диске.
+
+    Attributes:
+        path (str): Каталог фикстур
+        index (Dict[str, Fixture]): Записи по ключам запросов
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Dict[str, Fixture] = {}
+        index_path = os.path.join(path, 'index.json')
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                self.index = {key: Fixture(**entry) for key, entry in json.load(f).items()}
+
+    def record(self, url: str, params: Optional[Mapping[str, Any]], status: int, headers: Mapping[str, str], body: bytes) -> None:
+        """
+        Сохраняет ответ в каталог фикстур.
+
+        Args:
+            url (str): Абсолютный адрес запроса
+            params (Mapping, optional): Параметры запроса
+            status (int): HTTP-статус
+            headers (Mapping[str, str]): Заголовки ответа
+            body (bytes): Тело ответа
+        """
+        name = f"{hashlib.sha256(body).hexdigest()}.bin"
+        body_path = os.path.join(self.path, 'bodies', name)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        if not os.path.exists(body_path):
+            self._write_atomic(body_path, body)
+        self.index[request_key(url, params)] = Fixture(
+            status=status,
+            headers={header: headers[header] for header in RECORDED_HEADERS if header in headers},
+            body=name
+        )
+        data = json.dumps({key: asdict(entry) for key, entry in sorted(self.index.items())}, ensure_ascii=False, indent=1)
+        self._write_atomic(os.path.join(self.path, 'index.json'), data.encode('utf-8'))
+        logger.debug(f"Записана фикстура {request_key(url, params)} ({status}, {len(body)} байт)")
+
+    def lookup(self, key: str) -> Optional[Fixture]:
+        """Возвращает фикстуру по ключу запроса или None."""
+        return self.index.get(key)
+
+    def read_body(self, fixture: Fixture) -> bytes:
+        """Читает тело фикстуры."""
+        with open(os.path.join(self.path, 'bodies', fixture.body), 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
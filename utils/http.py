@@ -3,92 +3,410 @@ HTTP-клиент для работы с API.
 """
 
 import aiohttp
+import hashlib
+import json
 import logging
 import asyncio
-from typing import Optional, Dict, Any, AsyncGenerator
-from contextlib import asynccontextmanager
+import random
+import tempfile
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
 from aiohttp import ClientTimeout
 
+from config import HTTP_RECORD_DIR, NASA_RATE_LIMIT, UPSTREAM_OVERRIDE
+from utils import deadline
+from utils.breaker import CircuitOpenError, breaker_for
+from utils.cache import get_tiered_cache
+from utils.fixtures import FixtureStore
+from utils.monitoring import monitor
+from utils.pool import pool_manager
+from utils.ratelimit import RateLimitExceeded, TokenBucket
+from utils.singleflight import SingleFlight, make_key
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Сколько раз повторять запрос после ответа 429
+MAX_RATE_LIMIT_RETRIES = 2
+
+# Повторы при сетевых ошибках: экспоненциальная задержка с разбросом
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+MIN_ATTEMPT_TIME = 2.0  # Меньше этого бюджета новая попытка не начинается
+
+# Потоковая загрузка изображений (get_stream)
+MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024  # Жёсткий предел размера тела
+SPOOL_MEMORY_SIZE = 512 * 1024  # Больше — буфер уходит во временный файл
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_CONTENT_TYPES = ('image/',)
+
+
+class DownloadRejected(aiohttp.ClientError):
+    """Тело ответа отклонено: пустое, слишком большое или не того типа."""
+
+
+async def hedged(factory: Callable[[], Awaitable[T]], delay: float) -> T:
+    """
+    Выполняет запрос и, если он не завершился за delay секунд, запускает
+    дублирующий; возвращается первый успешный результат, второй запрос
+    отменяется. Если успели оба, лишний результат закрывается (close()),
+    чтобы не оставлять открытых буферов.
+    
+    Args:
+        factory (Callable): Фабрика корутины запроса
+        delay (float): Задержка перед дублирующим запросом в секундах
+        
+    Returns:
+        T: Результат первого успешного запроса
+    """
+    started = [asyncio.ensure_future(factory())]
+    tasks = set(started)
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            monitor.increment('hedged_requests')
+            started.append(asyncio.ensure_future(factory()))
+            tasks.add(started[-1])
+        while True:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    return task.result()
+            if not tasks:
+                # Все запросы завершились ошибкой — пробрасываем последнюю
+                return task.result()
+    finally:
+        for task in started:
+            if not task.done():
+                task.cancel()
+            elif (task is not winner and not task.cancelled() and task.exception() is None
+                  and hasattr(task.result(), 'close')):
+                task.result().close()
+
+def _conditional_headers(stored: Dict[str, Any]) -> Dict[str, str]:
+    """Заголовки условного запроса по сохранённым валидаторам."""
+    headers = {}
+    if stored.get('etag'):
+        headers['If-None-Match'] = stored['etag']
+    if stored.get('last_modified'):
+        headers['If-Modified-Since'] = stored['last_modified']
+    return headers
+
 class APIClient:
-    """Асинхронный клиент для API."""
-    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None):
+    """
+    Асинхронный клиент для API; соединения берутся из общего pool_manager.
+    
+    upstream перенаправляет все запросы (включая абсолютные адреса
+    изображений) на один сервер, например benchmarks.stand_in; исходный
+    хост передаётся в заголовке X-Forwarded-Host. recorder сохраняет
+    полученные ответы в формате фикстур utils.fixtures.
+    """
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        limiter: Optional[TokenBucket] = None,
+        upstream: Optional[str] = None,
+        recorder: Optional[FixtureStore] = None
+    ):
         self.base_url = base_url
         self.headers = headers or {}
-        self.session: Optional[aiohttp.ClientSession] = None
-        self._lock = asyncio.Lock()
+        self.limiter = limiter
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.recorder = recorder
+        self._host = urlparse(base_url).netloc
         self.timeout = ClientTimeout(total=30)
+        self._flight = SingleFlight(urlparse(base_url).netloc or base_url)
+
+    def _absolute(self, url: str) -> str:
+        if url.startswith(('http://', 'https://')):
+            return url
+        return f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
 
-    async def init(self) -> None:
-        if not self.session:
-            async with self._lock:
-                if not self.session:
-                    conn = aiohttp.TCPConnector(limit=100, force_close=False, enable_cleanup_closed=True, ssl=False)
-                    self.session = aiohttp.ClientSession(connector=conn, headers=self.headers, timeout=self.timeout)
-
-    async def close(self) -> None:
-        if self.session:
-            await self.session.close()
-            self.session = None
-
-    @asynccontextmanager
-    async def get_session(self) -> AsyncGenerator[aiohttp.ClientSession, None]:
-        if not self.session:
-            await self.init()
-        assert self.session is not None
+    def _route(self, full_url: str) -> Tuple[str, Dict[str, str]]:
+        """Адрес, на который реально уходит запрос, и дополнительные заголовки."""
+        if not self.upstream:
+            return full_url, {}
+        parsed = urlparse(full_url)
+        target = f"{self.upstream}{parsed.path}" + (f"?{parsed.query}" if parsed.query else "")
+        return target, {'X-Forwarded-Host': parsed.netloc}
+
+    def _record(self, full_url: str, kwargs: Dict[str, Any], response: aiohttp.ClientResponse, body: bytes) -> None:
+        """Сохраняет ответ в фикстуры, если включён режим записи."""
+        if self.recorder is None:
+            return
         try:
-            yield self.session
-        except Exception:
-            await self.close()
-            raise
+            self.recorder.record(full_url, kwargs.get('params'), response.status, response.headers, body)
+        except OSError as e:
+            logger.warning(f"Не удалось записать фикстуру {full_url}: {e}")
+
+    def _request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавляет к параметрам запроса заголовки и таймаут (не дальше дедлайна)."""
+        kwargs.setdefault('timeout', ClientTimeout(total=deadline.bounded(self.timeout.total)))
+        if self.headers:
+            kwargs['headers'] = {**self.headers, **kwargs.get('headers', {})}
+        return kwargs
 
-    async def get(self, url: str, **kwargs) -> Any:
-        if not url.startswith('http'):
-            full_url = f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
-        else:
-            full_url = url
-        max_retries = 3
-        retry_delay = 1
-        for attempt in range(max_retries):
+    def _flight_key(self, kind: str, url: str, kwargs: Dict[str, Any]) -> Optional[tuple]:
+        """Ключ для объединения запросов; None, если запрос объединять нельзя."""
+        if set(kwargs) - {'params'}:
+            return None
+        return (kind, *make_key(url, kwargs.get('params')))
+
+    async def get(self, url: str, *, store_body: bool = True, **kwargs) -> Any:
+        """
+        GET-запрос с разбором JSON; одинаковые одновременные запросы объединяются.
+        
+        store_body=False — результат и так хранит кэш вызывающего, тело
+        не сохраняется для ревалидации и ответа при разомкнутом выключателе.
+        """
+        key = self._flight_key('json', url, kwargs)
+        if key is None:
+            return await self._get(url, store_body, **kwargs)
+        return await self._flight.do(key, lambda: self._get(url, store_body, **kwargs))
+
+    async def get_bytes(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        store_body: bool = True
+    ) -> bytes:
+        """GET-запрос, возвращающий тело ответа; одинаковые одновременные запросы объединяются."""
+        key = self._flight_key('bytes', url, {'params': params})
+        return await self._flight.do(key, lambda: self._get_bytes(url, params, store_body))
+
+    async def get_stream(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_size: int = MAX_DOWNLOAD_SIZE,
+        content_types: Tuple[str, ...] = IMAGE_CONTENT_TYPES
+    ) -> BinaryIO:
+        """
+        Скачивает тело ответа частями в буфер, который до SPOOL_MEMORY_SIZE
+        хранится в памяти, а дальше — во временном файле.
+        
+        Загрузка прерывается сразу, если Content-Type не подходит или
+        Content-Length (а при его отсутствии — фактический размер)
+        больше max_size. Одновременные запросы не объединяются: каждый
+        вызывающий получает собственный буфер.
+        
+        Args:
+            url (str): Адрес (относительный или абсолютный)
+            params (Dict[str, Any], optional): Параметры запроса
+            max_size (int): Максимальный размер тела в байтах
+            content_types (Tuple[str, ...]): Допустимые префиксы Content-Type;
+                пустой кортеж — без проверки
+            
+        Returns:
+            BinaryIO: Буфер с телом ответа, позиция в начале; закрывает вызывающий
+            
+        Raises:
+            DownloadRejected: Если ответ пустой, слишком большой или не того типа
+        """
+        response = await self._open(url, {'params': params})
+        async with response:
+            response.raise_for_status()
+            if content_types and not response.content_type.startswith(content_types):
+                raise DownloadRejected(f"{url}: неожиданный Content-Type {response.content_type}")
+            if response.content_length is not None and response.content_length > max_size:
+                raise DownloadRejected(f"{url}: размер {response.content_length} больше {max_size}")
+            
+            buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE)
+            try:
+                size = 0
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise DownloadRejected(f"{url}: тело больше {max_size} байт")
+                    buffer.write(chunk)
+                if size == 0:
+                    raise DownloadRejected(f"{url}: пустой ответ")
+            except asyncio.TimeoutError as e:
+                buffer.close()
+                if deadline.expired():
+                    raise deadline.DeadlineExceeded(f"{url}: бюджет исчерпан") from e
+                raise
+            except BaseException:
+                buffer.close()
+                raise
+            monitor.increment('streamed_bytes', size)
+            if self.recorder is not None:
+                buffer.seek(0)
+                self._record(self._absolute(url), {'params': params}, response, buffer.read())
+            buffer.seek(0)
+            return buffer
+
+    async def _send(
+        self,
+        url: str,
+        kwargs: Dict[str, Any],
+        decode: Callable[[bytes], Any],
+        store_body: bool = True
+    ) -> Any:
+        """
+        Выполняет запрос с условной ревалидацией и читает тело целиком.
+        
+        Ответ с ETag/Last-Modified сохраняется вместе с телом (если
+        store_body). Валидаторы отправляются в If-None-Match/If-Modified-Since,
+        и на ответ 304 отдаётся сохранённое тело. Оно же отдаётся, если
+        выключатель эндпоинта разомкнут.
+        """
+        validators = get_tiered_cache('http_validators')
+        validators_key = self._validators_key(self._absolute(url), kwargs) if store_body else None
+        stored = await validators.get(validators_key) if validators_key else None
+        headers = _conditional_headers(stored) if stored else None
+        try:
+            response = await self._open(url, kwargs, headers)
+        except CircuitOpenError:
+            if stored is None:
+                raise
+            # Эндпоинт недоступен — отдаём последний успешный ответ
+            monitor.increment(f"breaker_fallbacks:{breaker_for(self._absolute(url)).name}")
+            return decode(stored['body'])
+        async with response:
+            if response.status == 304 and stored:
+                monitor.increment('http_not_modified')
+                monitor.increment('http_bytes_saved', len(stored['body']))
+                return decode(stored['body'])
+            response.raise_for_status()
+            body = await response.read()
+            self._record(self._absolute(url), kwargs, response, body)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if validators_key and (etag or last_modified):
+                await validators.set(validators_key, {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'body': body
+                })
+            return decode(body)
+
+    async def _open(
+        self,
+        url: str,
+        kwargs: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> aiohttp.ClientResponse:
+        """
+        Отправляет запрос через выключатель эндпоинта и ограничитель
+        частоты и возвращает ответ с непрочитанным телом (вызывающий
+        закрывает его через async with).
+        
+        Сетевые ошибки, таймауты и ответы 5xx засчитываются выключателю
+        как ошибки; при разомкнутом выключателе сразу поднимается
+        CircuitOpenError.
+        
+        Ответ 429 не ждётся на месте: Retry-After передаётся ограничителю,
+        и повторный запрос встаёт в общую очередь за токеном (или сразу
+        отклоняется, если не успевает к дедлайну). Повторов после 429
+        не больше MAX_RATE_LIMIT_RETRIES.
+        """
+        full_url = self._absolute(url)
+        limited = self.limiter is not None and pool_manager.host_of(full_url) == self._host
+        breaker = breaker_for(full_url)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            deadline.check()
+            breaker.check()
+            if limited:
+                await self.limiter.acquire(deadline=deadline.get_deadline())
+            target, route_headers = self._route(full_url)
+            session = pool_manager.session_for(target)
+            request_kwargs = self._request_kwargs(dict(kwargs))
+            if headers or route_headers:
+                request_kwargs['headers'] = {**request_kwargs.get('headers', {}), **(headers or {}), **route_headers}
             try:
-                async with self.get_session() as session:
-                    async with session.get(full_url, **kwargs) as response:
-                        if response.status == 429:
-                            retry_after = int(response.headers.get('Retry-After', 60))
-                            logger.warning(f"429. Ждём {retry_after} сек")
-                            await asyncio.sleep(retry_after)
-                            return await self.get(url, **kwargs)
-                        response.raise_for_status()
-                        return await response.json()
+                response = await session.get(target, **request_kwargs)
+            except asyncio.TimeoutError as e:
+                if deadline.expired():
+                    # Таймаут сокращён бюджетом обновления — эндпоинт не виноват
+                    raise deadline.DeadlineExceeded(f"{url}: бюджет исчерпан") from e
+                breaker.record_failure()
+                raise
+            except aiohttp.ClientError:
+                breaker.record_failure()
+                raise
+            if response.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if limited:
+                await self._observe(response)
+            # Записываются только устойчивые ошибки (например, «снимка нет»),
+            # а не временные 429 и 5xx
+            if self.recorder is not None and 400 <= response.status < 500 and response.status != 429:
+                self._record(full_url, kwargs, response, await response.read())
+            if response.status == 429 and limited and attempt < MAX_RATE_LIMIT_RETRIES:
+                response.release()
+                logger.warning(f"429 для {url}, повтор через ограничитель")
+                continue
+            return response
+
+    @staticmethod
+    def _validators_key(full_url: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Ключ сохранённых валидаторов ответа.
+        
+        Параметры запроса содержат api_key, поэтому в ключ попадает
+        только их хэш. Запросы с нестандартными аргументами не ревалидируются.
+        """
+        if set(kwargs) - {'params'}:
+            return None
+        return hashlib.sha256(repr(make_key(full_url, kwargs.get('params'))).encode()).hexdigest()
+
+    async def _observe(self, response: aiohttp.ClientResponse) -> None:
+        """Передаёт ограничителю остаток квоты из заголовков ответа."""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        retry_after = 0.0
+        if response.status == 429:
+            retry_after = float(response.headers.get('Retry-After', 60))
+            remaining = remaining or 0
+        if remaining is not None:
+            await self.limiter.observe(int(remaining), retry_after)
+
+    async def _get(self, url: str, store_body: bool = True, **kwargs) -> Any:
+        """
+        GET с разбором JSON и повторами при сетевых ошибках.
+        
+        Задержка между попытками растёт экспоненциально со случайным
+        разбросом (full jitter). Повтор не начинается, если до дедлайна
+        обновления не хватает времени на паузу и ещё одну попытку.
+        """
+        for attempt in range(MAX_RETRIES):
+            try:
+                return await self._send(url, kwargs, json.loads, store_body)
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                if attempt == max_retries - 1:
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                left = deadline.remaining()
+                if attempt == MAX_RETRIES - 1 or (left is not None and left < delay + MIN_ATTEMPT_TIME):
                     logger.error(f"Ошибка запроса {url}: {e}", exc_info=True)
                     raise
-                await asyncio.sleep(retry_delay * (attempt + 1))
-                await self.close()
+                await asyncio.sleep(delay)
 
-    async def get_bytes(self, url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
-        await self.init()
-        if not url.startswith(('http://', 'https://')):
-            url = f"{self.base_url}{url}"
+    async def _get_bytes(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        store_body: bool = True
+    ) -> bytes:
         try:
-            async with self.session.get(url, params=params) as response:
-                if response.status == 429:
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"429. Ждём {retry_after} сек")
-                    await asyncio.sleep(retry_after)
-                    return await self.get_bytes(url, params)
-                response.raise_for_status()
-                return await response.read()
+            return await self._send(url, {'params': params}, bytes, store_body)
         except aiohttp.ClientError as e:
             logger.error(f"Ошибка get_bytes {url}: {e}", exc_info=True)
             raise
+        except (CircuitOpenError, RateLimitExceeded, deadline.DeadlineExceeded):
+            raise
         except Exception as e:
             logger.error(f"Неожиданная ошибка get_bytes {url}: {e}", exc_info=True)
             raise
 
-nasa_client = APIClient("https://api.nasa.gov")
-
-async def cleanup():
-    await nasa_client.close()
+nasa_client = APIClient(
+    "https://api.nasa.gov",
+    limiter=TokenBucket('api.nasa.gov', NASA_RATE_LIMIT),
+    upstream=UPSTREAM_OVERRIDE or None,
+    recorder=FixtureStore(HTTP_RECORD_DIR) if HTTP_RECORD_DIR else None
+)
@@ -0,0 +1,344 @@
+"""
+Модуль обработки изображений вне цикла событий.
+
+Декодирование Pillow, уменьшение с LANCZOS и кодирование JPEG с
+optimize=True занимают сотни миллисекунд на снимок марсохода. Если делать
+это в цикле событий, на это время замирают обновления всех пользователей.
+Поэтому задания выполняются в отдельном пуле процессов (IMAGE_WORKERS),
+а очередь заданий ограничена (IMAGE_QUEUE_SIZE): при перегрузке новые
+задания ждут свободного места не дольше бюджета обновления и затем
+отклоняются с ImageQueueFull.
+
+Лишняя работа не выполняется: JPEG, уже подходящий по размеру, отдаётся
+без перекодирования (заголовок читается без декодирования), а большие
+JPEG декодируются сразу в уменьшенном масштабе (draft, масштабирование
+DCT). Качество и фильтр уменьшения задаются пресетами PRESETS. Готовые
+изображения сохраняются в дисковом хранилище utils.renditions.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+from config import IMAGE_QUEUE_SIZE, IMAGE_WORKERS
+from utils import deadline
+from utils.monitoring import monitor
+from utils.renditions import renditions
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_SIZE = (1280, 1280)  # Максимальный размер изображения для Telegram
+QUEUE_TIMEOUT = 10.0  # Сколько ждать места в очереди, если дедлайна нет
+PASSTHROUGH_MODES = ('RGB', 'L')  # Режимы JPEG, которые Telegram принимает как есть
+
+
+class ImageQueueFull(Exception):
+    """Очередь обработки изображений переполнена."""
+
+
+@dataclass(frozen=True)
+class ImagePreset:
+    """
+    Параметры оптимизации изображения.
+
+    Attributes:
+        max_size (Tuple[int, int]): Максимальные ширина и высота
+        quality (int): Качество JPEG
+        resample (Image.Resampling): Фильтр уменьшения
+        optimize (bool): Дополнительный проход оптимизации таблиц Хаффмана
+    """
+
+    max_size: Tuple[int, int] = MAX_IMAGE_SIZE
+    quality: int = 85
+    resample: Image.Resampling = Image.Resampling.LANCZOS
+    optimize: bool = True
+
+
+PRESETS = {
+    'photo': ImagePreset(),  # Фото марсоходов
+    'satellite': ImagePreset(quality=90),  # Снимки Земли: мелкие детали важнее размера
+    'fast': ImagePreset(quality=80, resample=Image.Resampling.BILINEAR, optimize=False),  # При перегрузке
+}
+
+
+def rendition_key(source: Union[str, bytes], preset: str) -> str:
+    """Ключ готового изображения в хранилище renditions для источника и пресета."""
+    settings = PRESETS[preset]
+    variant = (f"{settings.max_size[0]}x{settings.max_size[1]}:q{settings.quality}:"
+               f"{settings.resample.name}:{int(settings.optimize)}")
+    return renditions.key(source, variant)
+
+
+def needs_processing(data: bytes, preset: ImagePreset) -> bool:
+    """
+    Проверяет по заголовку, нужно ли перекодировать изображение.
+
+    Изображение не декодируется: Image.open читает только заголовок.
+
+    Args:
+        data (bytes): Исходное изображение
+        preset (ImagePreset): Пресет оптимизации
+
+    Returns:
+        bool: False, если это JPEG в допустимом режиме и размере
+    """
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return not (
+                img.format == 'JPEG'
+                and img.mode in PASSTHROUGH_MODES
+                and img.width <= preset.max_size[0]
+                and img.height <= preset.max_size[1]
+            )
+    except Exception:
+        # Нераспознанный заголовок — пусть ошибку покажет полная обработка
+        return True
+
+
+def decode_image(data: bytes, preset: ImagePreset) -> Image.Image:
+    """
+    Декодирует изображение в RGB; большие JPEG — сразу в уменьшенном масштабе.
+
+    Args:
+        data (bytes): Исходное изображение
+        preset (ImagePreset): Пресет оптимизации
+
+    Returns:
+        Image.Image: Декодированное изображение в режиме RGB
+    """
+    img = Image.open(BytesIO(data))
+    scale = min(preset.max_size[0] / img.width, preset.max_size[1] / img.height)
+    if img.format == 'JPEG' and scale < 1:
+        # Декодируем сразу в масштабе 1/2, 1/4 или 1/8, не меньше итогового размера
+        img.draft('RGB', (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+
+    # Конвертируем в RGB если нужно
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.load()
+    return img
+
+
+def resize_image(img: Image.Image, preset: ImagePreset) -> Image.Image:
+    """Уменьшает изображение до max_size пресета, если нужно."""
+    if img.size[0] > preset.max_size[0] or img.size[1] > preset.max_size[1]:
+        img.thumbnail(preset.max_size, preset.resample)
+    return img
+
+
+def encode_image(img: Image.Image, preset: ImagePreset) -> bytes:
+    """Кодирует изображение в JPEG с параметрами пресета."""
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=preset.quality, optimize=preset.optimize)
+    return output.getvalue()
+
+
+def optimize_image_sync(data: bytes, preset: ImagePreset = PRESETS['photo']) -> bytes:
+    """
+    Уменьшает изображение и перекодирует его в JPEG.
+
+    Выполняется в процессе пула, поэтому принимает и возвращает байты.
+
+    Args:
+        data (bytes): Исходное изображение
+        preset (ImagePreset): Пресет оптимизации
+
+    Returns:
+        bytes: Оптимизированный JPEG
+    """
+    return encode_image(resize_image(decode_image(data, preset), preset), preset)
+
+
+class ImageProcessor:
+    """
+    Пул процессов для обработки изображений с ограниченной очередью.
+
+    Attributes:
+        workers (int): Число процессов; 0 — обработка в цикле событий
+            (прежнее поведение, для отладки и сравнения)
+        queue_size (int): Сколько заданий может ждать свободного процесса
+        in_flight (int): Принятых заданий (выполняются или ждут процесса)
+        waiting (int): Заданий, ждущих места в очереди
+        stats (Dict[str, Any]): Счётчики выполненных, ошибочных и отклонённых заданий
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS, queue_size: int = IMAGE_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max(1, workers + queue_size))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'busy_time': 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерний процесс не наследует цикл событий и соединения родителя
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def _admit(self) -> None:
+        """Ждёт места в очереди не дольше бюджета обновления."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=deadline.bounded(QUEUE_TIMEOUT))
+        except asyncio.TimeoutError:
+            self.stats['rejected'] += 1
+            monitor.increment('image_queue_rejected')
+            raise ImageQueueFull(f"в очереди обработки изображений {self.in_flight} заданий") from None
+        finally:
+            self.waiting -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет функцию в пуле процессов.
+
+        Args:
+            func (Callable): Функция уровня модуля (передаётся в процесс по имени)
+            *args: Аргументы функции (должны сериализоваться pickle)
+
+        Returns:
+            Any: Результат функции
+
+        Raises:
+            ImageQueueFull: Если место в очереди не освободилось вовремя
+        """
+        if self.workers <= 0:
+            return func(*args)
+
+        await self._admit()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            self.stats['completed'] += 1
+            return result
+        except BrokenProcessPool:
+            # Процесс пула упал (например, из-за нехватки памяти) — пересоздаём пул
+            # Освобождаем поток управления и уцелевшие процессы старого пула
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self._executor is executor:
+                logger.error("Пул обработки изображений сломан, создаём новый")
+                self._executor = None
+            self.stats['failed'] += 1
+            raise
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.stats['busy_time'] += time.perf_counter() - start
+            self.in_flight -= 1
+            self._slots.release()
+
+    def close(self) -> None:
+        """Останавливает процессы пула."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику пула для /stats."""
+        done = self.stats['completed'] + self.stats['failed']
+        return {
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'completed': self.stats['completed'],
+            'failed': self.stats['failed'],
+            'rejected': self.stats['rejected'],
+            'avg_time': f"{self.stats['busy_time'] / done:.3f}s" if done else "0.000s"
+        }
+
+
+# Глобальный пул обработки изображений
+image_processor = ImageProcessor()
+
+
+async def optimize_image(
+    image_data: Union[bytes, BinaryIO],
+    preset: str = 'photo',
+    source: Optional[str] = None
+) -> bytes:
+    """
+    Оптимизирует размер изображения для отправки в Telegram.
+
+    Принимает байты или файловый объект (например, буфер из
+    nasa_client.get_stream); файловый объект закрывается после чтения.
+    Подходящий JPEG возвращается как есть. Если изображение не удалось
+    обработать, возвращаются исходные байты.
+
+    Args:
+        image_data (Union[bytes, BinaryIO]): Исходное изображение
+        preset (str): Имя пресета из PRESETS
+        source (str, optional): Идентификатор источника; если задан, результат
+            берётся из хранилища renditions и сохраняется в него
+
+    Raises:
+        ImageQueueFull: Если очередь обработки переполнена
+    """
+    key = rendition_key(source, preset) if source else None
+    # Чтение и запись файлов хранилища не блокируют цикл событий
+    stored = await asyncio.to_thread(renditions.read, key) if key else None
+    if stored is not None:
+        if not isinstance(image_data, bytes):
+            image_data.close()
+        return stored
+
+    if isinstance(image_data, bytes):
+        data = image_data
+    else:
+        with image_data:
+            data = image_data.read()
+
+    settings = PRESETS[preset]
+    if not needs_processing(data, settings):
+        monitor.increment('image_passthrough')
+        result = data
+    else:
+        try:
+            result = await image_processor.run(optimize_image_sync, data, settings)
+        except ImageQueueFull:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при оптимизации изображения: {e}")
+            return data
+
+    if key:
+        await asyncio.to_thread(renditions.put, key, result)
+    return result
+
+
+async def render_image(
+    source: str,
+    load: Callable[[], Awaitable[Union[bytes, BinaryIO]]],
+    preset: str = 'photo'
+) -> str:
+    """
+    Готовит изображение в хранилище renditions, не загружая его повторно.
+
+    Args:
+        source (str): URL или другой идентификатор источника
+        load (Callable): Корутина-фабрика, загружающая исходное изображение;
+            вызывается только если готового изображения ещё нет
+        preset (str): Имя пресета из PRESETS
+
+    Returns:
+        str: Ключ готового изображения (для RenderedMessage.rendition)
+    """
+    key = rendition_key(source, preset)
+    if not await asyncio.to_thread(renditions.contains, key):
+        await optimize_image(await load(), preset, source=source)
+    return key
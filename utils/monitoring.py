@@ -23,12 +23,16 @@ class PerformanceMonitor:
         _metrics (Dict): Хранилище метрик
         _api_timings (Dict): Статистика времени ответа API
         _cache_stats (Dict): Статистика использования кэша
+        _counters (Dict): Именованные счётчики событий
+        _gauges (Dict): Текущие значения (глубина очередей, последние длительности)
     """
     
     def __init__(self):
         self._metrics = defaultdict(int)
         self._api_timings = defaultdict(list)
         self._cache_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._counters = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
         self._last_reset = datetime.now()
     
     def record_api_call(self, endpoint: str, duration: float) -> None:
@@ -36,13 +40,34 @@ class PerformanceMonitor:
         self._api_timings[endpoint].append(duration)
         self._metrics['total_api_calls'] += 1
     
-    def record_cache_hit(self, cache_type: str) -> None:
-        """Записывает попадание в кэш."""
-        self._cache_stats[cache_type]['hits'] += 1
+    def record_cache_hit(self, cache_type: str, tier: Optional[str] = None) -> None:
+        """Записывает попадание в кэш (опционально с указанием уровня l1/l2)."""
+        self._cache_stats[self._cache_key(cache_type, tier)]['hits'] += 1
         
-    def record_cache_miss(self, cache_type: str) -> None:
-        """Записывает промах кэша."""
-        self._cache_stats[cache_type]['misses'] += 1
+    def record_cache_miss(self, cache_type: str, tier: Optional[str] = None) -> None:
+        """Записывает промах кэша (опционально с указанием уровня l1/l2)."""
+        self._cache_stats[self._cache_key(cache_type, tier)]['misses'] += 1
+    
+    @staticmethod
+    def _cache_key(cache_type: str, tier: Optional[str]) -> str:
+        """Формирует имя счётчика кэша с учётом уровня."""
+        return f"{cache_type}:{tier}" if tier else cache_type
+    
+    def increment(self, name: str, value: int = 1) -> None:
+        """Увеличивает именованный счётчик."""
+        self._counters[name] += value
+    
+    def get_counters(self) -> Dict[str, int]:
+        """Возвращает значения именованных счётчиков."""
+        return dict(self._counters)
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Устанавливает текущее значение именованного показателя."""
+        self._gauges[name] = value
+    
+    def get_gauges(self) -> Dict[str, float]:
+        """Возвращает текущие значения показателей."""
+        return dict(self._gauges)
     
     def get_api_stats(self) -> Dict[str, Any]:
         """Возвращает статистику API запросов."""
@@ -81,7 +106,9 @@ class PerformanceMonitor:
             'uptime': str(uptime).split('.')[0],
             'total_api_calls': self._metrics['total_api_calls'],
             'api_stats': self.get_api_stats(),
-            'cache_stats': self.get_cache_stats()
+            'cache_stats': self.get_cache_stats(),
+            'counters': self.get_counters(),
+            'gauges': self.get_gauges()
         }
     
     def reset(self) -> None:
@@ -89,6 +116,8 @@ class PerformanceMonitor:
         self._metrics.clear()
         self._api_timings.clear()
         self._cache_stats.clear()
+        self._counters.clear()
+        self._gauges.clear()
         self._last_reset = datetime.now()
 
 
@@ -0,0 +1,129 @@
+"""
+Модуль индекса околоземных астероидов.
+
+Лента /neo/rest/v1/feed за неделю запрашивается одним вызовом, а затем
+разбирается в NeoIndex: строки с расстоянием и размером переводятся в
+числа один раз, записи раскладываются по датам и заранее сортируются по
+расстоянию сближения и по опасности. Навигация по дням и подборки
+«самые опасные за неделю» и «ближайшее сближение» отвечаются из индекса
+без обращения к API.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Максимальное окно ленты NASA за один запрос (в днях)
+FEED_WINDOW_DAYS = 7
+
+
+@dataclass
+class NeoRecord:
+    """
+    Сближение астероида с Землёй.
+
+    Attributes:
+        id (str): Идентификатор объекта NASA
+        name (str): Название астероида
+        day (str): Дата сближения (ISO)
+        hazardous (bool): Потенциально опасный объект
+        miss_km (float): Минимальное расстояние до Земли в километрах
+        diameter_min_m (float): Оценка диаметра снизу в метрах
+        diameter_max_m (float): Оценка диаметра сверху в метрах
+        velocity_kmh (float): Относительная скорость в км/ч
+        approach_time (str): Дата и время сближения
+    """
+
+    id: str
+    name: str
+    day: str
+    hazardous: bool
+    miss_km: float
+    diameter_min_m: float
+    diameter_max_m: float
+    velocity_kmh: float
+    approach_time: str
+
+    @classmethod
+    def from_feed(cls, day: str, ast: Dict[str, Any]) -> 'NeoRecord':
+        """Разбирает объект из ленты NASA."""
+        approach = ast['close_approach_data'][0]
+        diameter = ast['estimated_diameter']['meters']
+        return cls(
+            id=str(ast.get('id', '')),
+            name=ast['name'],
+            day=day,
+            hazardous=bool(ast['is_potentially_hazardous_asteroid']),
+            miss_km=float(approach['miss_distance']['kilometers']),
+            diameter_min_m=float(diameter['estimated_diameter_min']),
+            diameter_max_m=float(diameter['estimated_diameter_max']),
+            velocity_kmh=float(approach['relative_velocity']['kilometers_per_hour']),
+            approach_time=approach.get('close_approach_date_full') or day
+        )
+
+    @property
+    def danger_key(self) -> Tuple[bool, float, float]:
+        """Ключ сортировки по опасности: опасные, крупные и близкие — первыми."""
+        return (not self.hazardous, -self.diameter_max_m, self.miss_km)
+
+
+class NeoIndex:
+    """
+    Индекс ленты астероидов за окно дат.
+
+    Attributes:
+        source (Dict[str, Any]): Исходный ответ API, из которого построен индекс
+        days (List[str]): Даты окна с данными, по возрастанию
+        by_date (Dict[str, List[NeoRecord]]): Сближения по датам, ближайшие первыми
+        by_miss (List[NeoRecord]): Все сближения окна, ближайшие первыми
+        by_danger (List[NeoRecord]): Все сближения окна, самые опасные первыми
+    """
+
+    def __init__(self, feed: Dict[str, Any]):
+        self.source = feed
+        self.by_date: Dict[str, List[NeoRecord]] = {}
+        for day, objects in (feed.get('near_earth_objects') or {}).items():
+            records = []
+            for ast in objects:
+                try:
+                    records.append(NeoRecord.from_feed(day, ast))
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    logger.warning(f"Пропущен объект ленты NEO за {day}: {e}")
+            records.sort(key=lambda record: record.miss_km)
+            self.by_date[day] = records
+        self.days = sorted(self.by_date)
+        every = [record for records in self.by_date.values() for record in records]
+        self.by_miss = sorted(every, key=lambda record: record.miss_km)
+        self.by_danger = sorted(every, key=lambda record: record.danger_key)
+
+    def covers(self, day: str) -> bool:
+        """Проверяет, входит ли дата в окно индекса."""
+        return day in self.by_date
+
+    def for_day(self, day: str, limit: int = 5) -> List[NeoRecord]:
+        """Ближайшие сближения за дату."""
+        return self.by_date.get(day, [])[:limit]
+
+    def closest(self, limit: int = 5) -> List[NeoRecord]:
+        """Ближайшие сближения за всё окно."""
+        return self.by_miss[:limit]
+
+    def most_dangerous(self, limit: int = 5) -> List[NeoRecord]:
+        """Самые опасные объекты окна: сначала потенциально опасные, затем по размеру."""
+        return self.by_danger[:limit]
+
+    def neighbours(self, day: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Соседние даты окна для навигации.
+
+        Args:
+            day (str): Текущая дата (ISO)
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: Предыдущая и следующая даты или None
+        """
+        earlier = [d for d in self.days if d < day]
+        later = [d for d in self.days if d > day]
+        return (earlier[-1] if earlier else None, later[0] if later else None)
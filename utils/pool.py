@@ -0,0 +1,165 @@
+"""
+Модуль общего пула HTTP-соединений.
+
+Все исходящие запросы (NASA API, загрузка изображений с Wikimedia и любые
+будущие источники) идут через одну на процесс сессию aiohttp для каждого
+хоста. Соединения переиспользуются (keep-alive), результаты DNS кэшируются,
+а число одновременных соединений ограничивается отдельно для каждого хоста.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Ограничения числа соединений на хост; для остальных — DEFAULT_HOST_LIMIT
+HOST_LIMITS = {
+    'api.nasa.gov': 20,
+    'mars.nasa.gov': 10,
+    'upload.wikimedia.org': 8,
+}
+DEFAULT_HOST_LIMIT = 10
+KEEPALIVE_TIMEOUT = 60  # Сколько секунд держать простаивающее соединение
+DNS_CACHE_TTL = 300  # Время жизни записей DNS-кэша в секундах
+
+
+@dataclass
+class PoolStats:
+    """
+    Статистика пула соединений одного хоста.
+
+    Attributes:
+        created (int): Открыто новых соединений
+        reused (int): Запросов, получивших соединение из keep-alive пула
+        queued (int): Запросов, ждавших свободного слота пула
+        wait_time (float): Суммарное время ожидания слота в секундах
+        max_wait (float): Максимальное время ожидания слота в секундах
+    """
+
+    created: int = 0
+    reused: int = 0
+    queued: int = 0
+    wait_time: float = 0.0
+    max_wait: float = 0.0
+
+
+class ConnectionPoolManager:
+    """
+    Менеджер сессий aiohttp, по одной на хост.
+
+    Attributes:
+        sessions (Dict[str, aiohttp.ClientSession]): Сессии по хостам
+        stats (Dict[str, PoolStats]): Статистика пулов по хостам
+    """
+
+    def __init__(
+        self,
+        host_limits: Optional[Dict[str, int]] = None,
+        default_limit: int = DEFAULT_HOST_LIMIT,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = DNS_CACHE_TTL
+    ):
+        self.host_limits = host_limits if host_limits is not None else HOST_LIMITS
+        self.default_limit = default_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.stats: Dict[str, PoolStats] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Возвращает хост (с портом, если он указан) из URL."""
+        return urlparse(url).netloc
+
+    def _trace_config(self, stats: PoolStats) -> aiohttp.TraceConfig:
+        """Собирает статистику переиспользования и ожидания соединений."""
+        trace = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, ctx, params) -> None:
+            ctx.queued_at = time.monotonic()
+
+        async def on_queued_end(session, ctx, params) -> None:
+            waited = time.monotonic() - ctx.queued_at
+            stats.queued += 1
+            stats.wait_time += waited
+            stats.max_wait = max(stats.max_wait, waited)
+
+        async def on_create_end(session, ctx, params) -> None:
+            stats.created += 1
+
+        async def on_reuse(session, ctx, params) -> None:
+            stats.reused += 1
+
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def session_for(self, url: str) -> aiohttp.ClientSession:
+        """
+        Возвращает общую сессию для хоста URL, создавая её при необходимости.
+
+        Args:
+            url (str): Абсолютный URL запроса
+
+        Returns:
+            aiohttp.ClientSession: Сессия с пулом соединений этого хоста
+        """
+        host = self.host_of(url)
+        session = self.sessions.get(host)
+        if session is None or session.closed:
+            stats = self.stats.setdefault(host, PoolStats())
+            connector = aiohttp.TCPConnector(
+                limit=self.host_limits.get(host, self.default_limit),
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                enable_cleanup_closed=True
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._trace_config(stats)]
+            )
+            self.sessions[host] = session
+            logger.info(f"Создан пул соединений для {host}")
+        return session
+
+    async def close(self) -> None:
+        """Закрывает все сессии и их соединения."""
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику пулов для /stats.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Доля переиспользованных соединений
+                и время ожидания слота по хостам
+        """
+        result = {}
+        for host, stats in self.stats.items():
+            acquired = stats.created + stats.reused
+            reuse = stats.reused / acquired * 100 if acquired else 0.0
+            avg_wait = stats.wait_time / stats.queued if stats.queued else 0.0
+            result[host] = {
+                'reuse_ratio': f"{reuse:.1f}%",
+                'created': stats.created,
+                'reused': stats.reused,
+                'queued': stats.queued,
+                'avg_wait': f"{avg_wait * 1000:.1f}ms",
+                'max_wait': f"{stats.max_wait * 1000:.1f}ms"
+            }
+        return result
+
+
+# Глобальный менеджер пулов соединений
+pool_manager = ConnectionPoolManager()
@@ -0,0 +1,283 @@
+"""
+Модуль ограничения частоты запросов к NASA API.
+
+Квота ключа NASA считается часовой. Ограничитель — «ведро токенов»
+ёмкостью в часовую квоту, которое пополняется равномерно. Состояние ведра
+хранится в Redis, поэтому квоту делят все процессы бота с одним ключом;
+если Redis недоступен, на REDIS_RETRY_INTERVAL секунд используется
+локальное ведро, после чего ограничитель снова пробует общее.
+
+Запросы имеют приоритет: интерактивные (ответ пользователю) обслуживаются
+раньше фонового прогрева, а прогреву недоступен резерв токенов. Если
+дождаться токена до дедлайна вызывающего нельзя, запрос сразу отклоняется
+с RateLimitExceeded.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Классы приоритета запросов (меньше — важнее)."""
+
+    INTERACTIVE = 0
+    PREFETCH = 1
+
+
+# Приоритет запросов текущей задачи; фоновые задачи выставляют PREFETCH
+request_priority: ContextVar[Priority] = ContextVar('request_priority', default=Priority.INTERACTIVE)
+
+# Сколько секунд запрос готов ждать токен, если дедлайн не передан явно
+DEFAULT_MAX_WAIT = {
+    Priority.INTERACTIVE: 10.0,
+    Priority.PREFETCH: 15 * 60.0,
+}
+
+# Доля ёмкости, недоступная фоновому прогреву
+PREFETCH_RESERVE = 0.2
+
+# Через сколько секунд после ошибки Redis снова пробовать общее ведро
+REDIS_RETRY_INTERVAL = 30.0
+
+# Атомарное взятие токена: пополняет ведро и либо списывает токен, либо
+# возвращает время ожидания. ARGV: ёмкость, скорость, время, резерв, TTL
+_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local ts = tonumber(redis.call('HGET', KEYS[1], 'ts'))
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+else
+    wait = (reserve + 1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[5]))
+return tostring(wait)
+"""
+
+# Ограничение ведра сверху по данным сервера. ARGV: уровень, время, TTL
+_OBSERVE_SCRIPT = """
+local level = tonumber(ARGV[1])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens == nil or level < tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(level), 'ts', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+end
+return 1
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Токен не может быть получен до дедлайна вызывающего."""
+
+
+class TokenBucket:
+    """
+    Ведро токенов, общее для процессов через Redis.
+
+    Attributes:
+        name (str): Имя ведра (часть ключа Redis)
+        capacity (float): Ёмкость ведра (часовая квота)
+        rate (float): Пополнение в токенах в секунду
+        tokens (float): Уровень локального ведра
+        _waiters (List[Tuple[int, int]]): Очередь ожидающих (приоритет, номер)
+        _use_redis (bool): Использовать ли Redis для хранения состояния
+        _redis_retry_at (float): Момент time.monotonic(), до которого после
+            ошибки Redis используется локальное ведро
+    """
+
+    KEY_PREFIX = "nasa_bot:ratelimit"
+
+    def __init__(self, name: str, per_hour: int, use_redis: bool = True):
+        self.name = name
+        self.capacity = float(per_hour)
+        self.rate = per_hour / 3600.0
+        self.tokens = self.capacity
+        self._updated = time.time()
+        self._use_redis = use_redis
+        self._redis_retry_at = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._turn = asyncio.Condition()
+        self.stats = {'acquired': 0, 'waited': 0, 'rejected': 0, 'remaining': None, 'redis_fallbacks': 0}
+
+    @property
+    def key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.name}"
+
+    def _reserve(self, priority: Priority) -> float:
+        return self.capacity * PREFETCH_RESERVE if priority >= Priority.PREFETCH else 0.0
+
+    async def _redis(self):
+        """Клиент Redis или None, если общее ведро недоступно."""
+        if not self._use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        from utils.redis_cache import redis_cache
+
+        await redis_cache.init()
+        return redis_cache.redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        """Переходит на локальное ведро до следующей попытки через REDIS_RETRY_INTERVAL."""
+        from utils.monitoring import monitor
+
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        self.stats['redis_fallbacks'] += 1
+        monitor.increment(f"ratelimit_redis_fallbacks:{self.name}")
+        logger.warning(
+            f"Ограничитель {self.name}: Redis недоступен, локальное ведро на "
+            f"{REDIS_RETRY_INTERVAL:.0f} сек: {error}"
+        )
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take_local(self, reserve: float, now: float) -> float:
+        self._refill(now)
+        if self.tokens - 1 >= reserve:
+            self.tokens -= 1
+            return 0.0
+        return (reserve + 1 - self.tokens) / self.rate
+
+    async def _take(self, priority: Priority) -> float:
+        """Пытается взять токен; возвращает 0 или время ожидания в секундах."""
+        reserve = self._reserve(priority)
+        now = time.time()
+        try:
+            client = await self._redis()
+            if client is not None:
+                wait = await client.eval(
+                    _ACQUIRE_SCRIPT, 1, self.key,
+                    self.capacity, self.rate, now, reserve, 2 * 3600
+                )
+                return float(wait)
+        except Exception as e:
+            self._redis_failed(e)
+        return self._take_local(reserve, now)
+
+    async def observe(self, remaining: Optional[int], retry_after: float = 0.0) -> None:
+        """
+        Подстраивает ведро под ответ сервера.
+
+        Уровень ведра не может быть выше X-RateLimit-Remaining; после 429
+        он уходит в минус так, чтобы следующий токен появился не раньше
+        Retry-After.
+
+        Args:
+            remaining (Optional[int]): Значение X-RateLimit-Remaining
+            retry_after (float): Значение Retry-After в секундах
+        """
+        if remaining is None:
+            return
+        self.stats['remaining'] = remaining
+        level = remaining - retry_after * self.rate
+        now = time.time()
+        try:
+            client = await self._redis()
+            if client is not None:
+                await client.eval(_OBSERVE_SCRIPT, 1, self.key, level, now, 2 * 3600)
+                return
+        except Exception as e:
+            self._redis_failed(e)
+        self._refill(now)
+        self.tokens = min(self.tokens, level)
+
+    async def level(self) -> float:
+        """
+        Возвращает текущий уровень ведра, не списывая токен.
+
+        Returns:
+            float: Число доступных токенов (с учётом пополнения)
+        """
+        now = time.time()
+        try:
+            client = await self._redis()
+            if client is not None:
+                tokens, ts = await client.hmget(self.key, 'tokens', 'ts')
+                if tokens is None or ts is None:
+                    return self.capacity
+                return min(self.capacity, float(tokens) + max(0.0, now - float(ts)) * self.rate)
+        except Exception as e:
+            self._redis_failed(e)
+        self._refill(now)
+        return self.tokens
+
+    def _leave(self, entry: Tuple[int, int]) -> None:
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    async def acquire(self, priority: Optional[Priority] = None, deadline: Optional[float] = None) -> None:
+        """
+        Ждёт токен в порядке приоритета.
+
+        Args:
+            priority (Priority, optional): Приоритет; по умолчанию из request_priority
+            deadline (float, optional): Момент time.monotonic(), после которого
+                ответ уже не нужен
+
+        Raises:
+            RateLimitExceeded: Если токен не успеть получить до дедлайна
+        """
+        from utils.monitoring import monitor
+
+        priority = request_priority.get() if priority is None else priority
+        if deadline is None:
+            deadline = time.monotonic() + DEFAULT_MAX_WAIT[priority]
+        entry = (int(priority), next(self._seq))
+        heapq.heappush(self._waiters, entry)
+        waited = False
+        try:
+            while True:
+                # Токен берёт только первый в очереди: интерактивные запросы
+                # обгоняют ожидающий прогрев
+                async with self._turn:
+                    await asyncio.wait_for(
+                        self._turn.wait_for(lambda: self._waiters[0] == entry),
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                wait = await self._take(priority)
+                if wait <= 0:
+                    self.stats['acquired'] += 1
+                    return
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitExceeded(
+                        f"квота {self.name} исчерпана, токен через {wait:.1f} сек"
+                    )
+                if not waited:
+                    waited = True
+                    self.stats['waited'] += 1
+                await asyncio.sleep(wait)
+        except (RateLimitExceeded, asyncio.TimeoutError):
+            self.stats['rejected'] += 1
+            monitor.increment(f"ratelimit_rejected:{priority.name.lower()}")
+            raise RateLimitExceeded(f"квота {self.name}: запрос не успевает к дедлайну") from None
+        finally:
+            self._leave(entry)
+            async with self._turn:
+                self._turn.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику ограничителя для /stats."""
+        return {
+            **self.stats,
+            'queued': len(self._waiters),
+            'shared': self._use_redis and time.monotonic() >= self._redis_retry_at
+        }
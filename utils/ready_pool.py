@@ -0,0 +1,151 @@
+"""
+Модуль пулов готовых ответов.
+
+Пул держит несколько заранее подготовленных ответов (например, фото
+марсохода, уже оптимизированное и сохранённое на диске или загруженное
+в Telegram), чтобы обработчик только забирал готовый элемент и отправлял
+его. Когда элементов становится меньше нижней границы (low), в фоне
+запускается пополнение до верхней (high). Пополнение идёт с приоритетом
+прогрева и без дедлайна обновления, которое его вызвало.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Generic, Optional, Tuple, TypeVar
+
+from utils.deadline import deadline_scope
+from utils.monitoring import monitor
+from utils.ratelimit import Priority, request_priority
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+LOW_WATERMARK = 2  # Меньше этого — запускается пополнение
+HIGH_WATERMARK = 5  # Пополнение идёт до этого числа элементов
+MAX_ITEM_AGE = 3 * 3600  # Элементы старше (в секундах) выбрасываются
+MAX_FAILURES = 3  # Ошибок подряд, после которых пополнение прерывается
+
+
+class ReadyPool(Generic[T]):
+    """
+    Пул готовых элементов с фоновым пополнением.
+
+    Attributes:
+        name (str): Имя пула (в метриках и логах)
+        produce (Callable): Корутина-фабрика нового элемента; может вернуть
+            None, если подходящего элемента сейчас нет
+        low (int): Нижняя граница пополнения
+        high (int): Верхняя граница пополнения
+        items (Deque[Tuple[float, T]]): Готовые элементы с временем создания
+        stats (Dict[str, Any]): Попадания, промахи, пополнения и их длительность
+    """
+
+    def __init__(
+        self,
+        name: str,
+        produce: Callable[[], Awaitable[Optional[T]]],
+        low: int = LOW_WATERMARK,
+        high: int = HIGH_WATERMARK,
+        max_age: float = MAX_ITEM_AGE
+    ):
+        self.name = name
+        self.produce = produce
+        self.low = low
+        self.high = high
+        self.max_age = max_age
+        self.items: Deque[Tuple[float, T]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self.stats = {'hits': 0, 'misses': 0, 'produced': 0, 'failures': 0,
+                      'last_refill': 0.0, 'max_refill': 0.0, 'refill_time': 0.0}
+
+    def _publish_depth(self) -> None:
+        monitor.set_gauge(f"ready_pool_depth:{self.name}", len(self.items))
+
+    def _drop_expired(self) -> None:
+        now = time.monotonic()
+        while self.items and now - self.items[0][0] > self.max_age:
+            self.items.popleft()
+
+    def pop(self) -> Optional[T]:
+        """
+        Забирает готовый элемент и при необходимости запускает пополнение.
+
+        Returns:
+            Optional[T]: Элемент или None, если пул пуст
+        """
+        self._drop_expired()
+        item = self.items.popleft()[1] if self.items else None
+        if item is None:
+            self.stats['misses'] += 1
+            monitor.increment(f"ready_pool_misses:{self.name}")
+        else:
+            self.stats['hits'] += 1
+            monitor.increment(f"ready_pool_hits:{self.name}")
+        self._publish_depth()
+        if len(self.items) < self.low:
+            self.refill()
+        return item
+
+    def refill(self) -> None:
+        """Запускает фоновое пополнение, если оно ещё не идёт."""
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill(), name=f"ready_pool:{self.name}")
+
+    async def fill(self) -> None:
+        """Пополняет пул до верхней границы и ждёт завершения (для планировщика)."""
+        self._drop_expired()
+        self._publish_depth()
+        self.refill()
+        await self._refill_task
+
+    async def _refill(self) -> None:
+        # Пополнение не должно занимать квоту пользователей и наследовать их дедлайн
+        request_priority.set(Priority.PREFETCH)
+        with deadline_scope(None):
+            failures = 0
+            while len(self.items) < self.high and failures < MAX_FAILURES:
+                start = time.monotonic()
+                try:
+                    item = await self.produce()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    failures += 1
+                    self.stats['failures'] += 1
+                    logger.warning(f"Пул {self.name}: ошибка пополнения {e}")
+                    continue
+                if item is None:
+                    break
+                failures = 0
+                elapsed = time.monotonic() - start
+                self.items.append((time.monotonic(), item))
+                self.stats['produced'] += 1
+                self.stats['last_refill'] = elapsed
+                self.stats['max_refill'] = max(self.stats['max_refill'], elapsed)
+                self.stats['refill_time'] += elapsed
+                monitor.set_gauge(f"ready_pool_refill_seconds:{self.name}", round(elapsed, 3))
+                self._publish_depth()
+
+    async def stop(self) -> None:
+        """Останавливает пополнение."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику пула для /stats."""
+        produced = self.stats['produced']
+        return {
+            'depth': len(self.items),
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses'],
+            'failures': self.stats['failures'],
+            'refilling': self._refill_task is not None and not self._refill_task.done(),
+            'last_refill': f"{self.stats['last_refill']:.2f}s",
+            'avg_refill': f"{self.stats['refill_time'] / produced:.2f}s" if produced else "—",
+            'max_refill': f"{self.stats['max_refill']:.2f}s"
+        }
@@ -1,27 +1,26 @@
 """
 Модуль для кэширования с использованием Redis.
 
-Предоставляет интерфейс для кэширования данных в Redis
-с поддержкой сериализации/десериализации и TTL.
+Предоставляет интерфейс для кэширования данных в Redis (клиент
+redis.asyncio) с поддержкой сериализации через utils.codecs, TTL
+и пакетных операций get_many/set_many.
 """
 
-import json
 import logging
-import pickle
-from typing import Any, Optional, Union
-import aioredis
+from typing import Any, Dict, Iterable, Optional, Tuple
+import redis.asyncio as redis
 import asyncio
-import os
-from contextlib import asynccontextmanager
+import time
 
-from config import REDIS_URL
+from config import REDIS_URL, REDIS_PASSWORD
+from utils import codecs
 
 class RedisCache:
     """
     Класс для работы с Redis кэшем.
     
     Attributes:
-        redis (aioredis.Redis): Клиент Redis
+        redis (redis.asyncio.Redis): Клиент Redis
         default_ttl (int): Время жизни кэша по умолчанию в секундах
         logger (Logger): Логгер для записи ошибок
         _lock (asyncio.Lock): Блокировка для безопасной инициализации
@@ -46,7 +45,35 @@ class RedisCache:
         if not self.redis:
             async with self._lock:
                 if not self.redis:
-                    self.redis = await aioredis.from_url(self.url)
+                    self.redis = redis.from_url(self.url, password=REDIS_PASSWORD)
+
+    def _decode(self, key: str, data: Optional[bytes]) -> Tuple[Optional[Any], float]:
+        """Декодирует значение; данные в неизвестном формате считаются промахом."""
+        if data is None:
+            return None, 0.0
+        try:
+            value, stored_at = codecs.decode(data)
+        except Exception as e:
+            self.logger.warning(f"Redis decode error for {key}: {e}")
+            return None, 0.0
+        return value, max(0.0, time.time() - stored_at)
+
+    async def get_entry(self, key: str) -> Tuple[Optional[Any], float]:
+        """
+        Получение значения из кэша вместе с его возрастом.
+        
+        Args:
+            key (str): Ключ кэша
+            
+        Returns:
+            Tuple[Optional[Any], float]: Значение (или None) и возраст в секундах
+        """
+        try:
+            await self.init()
+            return self._decode(key, await self.redis.get(key))
+        except Exception as e:
+            self.logger.error(f"Redis get error: {e}")
+            return None, 0.0
 
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -58,15 +85,33 @@ class RedisCache:
         Returns:
             Any: Значение из кэша или None, если значение не найдено
         """
+        return (await self.get_entry(key))[0]
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Пакетное получение значений одним запросом MGET.
+        
+        Args:
+            keys (Iterable[str]): Ключи кэша
+            
+        Returns:
+            Dict[str, Any]: Найденные значения по ключам (отсутствующие пропускаются)
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
         try:
             await self.init()
-            data = await self.redis.get(key)
-            if data:
-                return pickle.loads(data)
-            return None
+            values = await self.redis.mget(keys)
         except Exception as e:
-            self.logger.error(f"Redis get error: {e}")
-            return None
+            self.logger.error(f"Redis get_many error: {e}")
+            return {}
+        result = {}
+        for key, data in zip(keys, values):
+            value, _ = self._decode(key, data)
+            if value is not None:
+                result[key] = value
+        return result
     
     async def set(
         self,
@@ -87,13 +132,38 @@ class RedisCache:
         """
         try:
             await self.init()
-            data = pickle.dumps(value)
+            data = codecs.encode(value)
             await self.redis.set(key, data, ex=ttl or self.default_ttl)
             return True
         except Exception as e:
             self.logger.error(f"Redis set error: {e}")
             return False
     
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Пакетное сохранение значений через pipeline.
+        
+        Args:
+            mapping (Dict[str, Any]): Значения по ключам
+            ttl (int, optional): Время жизни в секундах
+            
+        Returns:
+            bool: True если значения успешно сохранены
+        """
+        if not mapping:
+            return True
+        try:
+            await self.init()
+            stored_at = time.time()
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, codecs.encode(value, stored_at), ex=ttl or self.default_ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self.logger.error(f"Redis set_many error: {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         """Удаление значения из кэша."""
         try:
@@ -104,6 +174,26 @@ class RedisCache:
             self.logger.error(f"Redis delete error: {e}")
             return False
     
+    async def delete_prefix(self, prefix: str) -> int:
+        """
+        Удаление всех ключей с указанным префиксом.
+        
+        Args:
+            prefix (str): Префикс ключей
+            
+        Returns:
+            int: Количество удалённых ключей
+        """
+        try:
+            await self.init()
+            keys = [key async for key in self.redis.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await self.redis.delete(*keys)
+            return len(keys)
+        except Exception as e:
+            self.logger.error(f"Redis delete_prefix error: {e}")
+            return 0
+    
     async def clear(self) -> bool:
         """Очистка всего кэша."""
         try:
@@ -0,0 +1,248 @@
+"""
+Модуль дискового хранилища готовых (оптимизированных) изображений.
+
+Оптимизированный JPEG сохраняется в каталог RENDITION_CACHE_DIR под
+ключом — хэшем источника (URL или содержимого) и параметров пресета.
+Повторный запрос того же снимка не скачивает и не обрабатывает его
+заново, а перезапуск контейнера не теряет готовые изображения (каталог
+вынесен в volume).
+
+Запись атомарная (временный файл и os.replace), объём каталога ограничен
+RENDITION_CACHE_MAX_BYTES с вытеснением давно не использованных файлов
+(время использования хранится в mtime файла). При отправке файл
+отображается в память (mmap) и отдаётся в Telegram кусками без
+копирования в новый объект bytes.
+
+Все обращения к диску выполняются в потоках (asyncio.to_thread): учёт
+файлов защищён блокировкой, а сама запись и чтение идут без неё.
+Каталог просматривается один раз при запуске бота (scan).
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Optional, Union
+
+from aiogram.types import BufferedInputFile
+
+from config import RENDITION_CACHE_DIR, RENDITION_CACHE_MAX_BYTES
+from utils.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.jpg'
+
+
+class MappedInputFile(BufferedInputFile):
+    """
+    Файл для отправки в Telegram, отображённый в память.
+
+    Содержимое отдаётся срезами memoryview поверх mmap: байты файла не
+    копируются в отдельный объект. Отображение закрывается сборщиком
+    мусора, когда на него не остаётся ссылок (в том числе из буферов
+    отправки).
+    """
+
+    def __init__(self, mapped: mmap.mmap, filename: str, **kwargs: Any):
+        super().__init__(memoryview(mapped), filename=filename, **kwargs)
+
+    async def read(self, bot: Any) -> AsyncGenerator[memoryview, None]:
+        view = self.data
+        for offset in range(0, len(view), self.chunk_size):
+            yield view[offset:offset + self.chunk_size]
+
+
+class RenditionStore:
+    """
+    Каталог готовых изображений с вытеснением по объёму.
+
+    Attributes:
+        path (str): Каталог хранилища
+        max_bytes (int): Максимальный суммарный размер файлов
+        total_bytes (int): Текущий суммарный размер файлов
+        _entries (OrderedDict[str, int]): Размеры файлов по ключам, от давно
+            использованных к недавним
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(source: Union[str, bytes], variant: str) -> str:
+        """
+        Формирует ключ готового изображения.
+
+        Args:
+            source (Union[str, bytes]): URL источника или его содержимое
+            variant (str): Параметры обработки (размер, качество и т.п.)
+
+        Returns:
+            str: Шестнадцатеричный sha256
+        """
+        if isinstance(source, bytes):
+            source = f"sha256:{hashlib.sha256(source).hexdigest()}"
+        return hashlib.sha256(f"{source}|{variant}".encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + SUFFIX)
+
+    def _load(self) -> None:
+        """Восстанавливает список файлов с диска (один раз), от старых к новым."""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._scan()
+                self._loaded = True
+
+    async def scan(self) -> None:
+        """Восстанавливает список файлов с диска в потоке (при запуске бота)."""
+        await asyncio.to_thread(self._load)
+
+    def _scan(self) -> None:
+        found = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if name.endswith('.tmp'):
+                    # Недописанный файл после аварийной остановки
+                    os.unlink(os.path.join(root, name))
+                elif name.endswith(SUFFIX):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, name[:-len(SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        if found:
+            logger.info(f"Хранилище изображений: {len(found)} файлов, {self.total_bytes} байт")
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.unlink(self._file(key))
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, key: str) -> None:
+        self.total_bytes -= self._entries.pop(key, 0)
+
+    def open(self, key: str) -> Optional[mmap.mmap]:
+        """
+        Отображает готовое изображение в память.
+
+        Args:
+            key (str): Ключ изображения
+
+        Returns:
+            Optional[mmap.mmap]: Отображение файла или None, если его нет
+        """
+        self._load()
+        if key not in self._entries:
+            self.stats['misses'] += 1
+            monitor.increment('rendition_misses')
+            return None
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            # Файл удалён извне или пуст
+            logger.warning(f"Не удалось открыть готовое изображение {key}: {e}")
+            with self._lock:
+                self._forget(key)
+            self.stats['misses'] += 1
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        monitor.increment('rendition_hits')
+        return mapped
+
+    def contains(self, key: str) -> bool:
+        """Проверяет наличие изображения, не меняя порядок вытеснения."""
+        self._load()
+        return key in self._entries
+
+    def input_file(self, key: str, filename: str) -> Optional[MappedInputFile]:
+        """
+        Готовит изображение к отправке в Telegram без копирования.
+
+        Args:
+            key (str): Ключ изображения
+            filename (str): Имя файла для Telegram
+
+        Returns:
+            Optional[MappedInputFile]: Файл для отправки или None, если его нет
+        """
+        mapped = self.open(key)
+        return MappedInputFile(mapped, filename) if mapped is not None else None
+
+    def read(self, key: str) -> Optional[bytes]:
+        """Возвращает содержимое изображения (копией) или None."""
+        mapped = self.open(key)
+        if mapped is None:
+            return None
+        with mapped:
+            return mapped[:]
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Сохраняет изображение атомарно и вытесняет старые при переполнении.
+
+        Args:
+            key (str): Ключ изображения
+            data (bytes): Содержимое (JPEG)
+        """
+        self._load()
+        if len(data) > self.max_bytes:
+            return
+        path = self._file(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить готовое изображение {key}: {e}")
+            return
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            self.stats['writes'] += 1
+            self._evict()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику хранилища для /stats (без просмотра каталога)."""
+        return {
+            **self.stats,
+            'files': len(self._entries),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Глобальное хранилище готовых изображений
+renditions = RenditionStore(RENDITION_CACHE_DIR, RENDITION_CACHE_MAX_BYTES)
@@ -0,0 +1,167 @@
+"""
+Модуль подготовленных ответов бота.
+
+Обработчики формируют ответ (текст, клавиатуру, изображение) отдельно от
+его отправки. Такой ответ можно положить в кэш и затем отправить в любой
+чат без повторного обращения к API и повторной обработки изображений.
+Изображения, уже загруженные в Telegram, отправляются по file_id.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, Message
+
+from utils import codecs
+from utils.file_ids import content_key, file_ids
+from utils.renditions import renditions
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderedMessage:
+    """
+    Одно подготовленное сообщение.
+
+    Attributes:
+        text (str): Текст сообщения или подпись к фото
+        photo (Union[bytes, str, None]): Байты изображения, URL или file_id
+        filename (str): Имя файла для загрузки байтов изображения
+        reply_markup (Optional[InlineKeyboardMarkup]): Инлайн-клавиатура
+        parse_mode (Optional[str]): Режим разметки текста
+        media_key (Optional[str]): Ключ изображения в реестре file_id
+            (обычно URL источника); по умолчанию — URL или хэш байтов
+        rendition (Optional[str]): Ключ готового изображения в хранилище
+            utils.renditions; если файл есть, он отправляется вместо photo
+    """
+
+    text: str
+    photo: Optional[Union[bytes, str]] = None
+    filename: str = "image.jpg"
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    parse_mode: Optional[str] = None
+    media_key: Optional[str] = None
+    rendition: Optional[str] = None
+
+    def _media_key(self) -> Optional[str]:
+        """Возвращает ключ изображения для реестра file_id."""
+        if self.media_key:
+            return self.media_key
+        if isinstance(self.photo, bytes):
+            return content_key(self.photo)
+        if isinstance(self.photo, str) and self.photo.startswith(('http://', 'https://')):
+            return self.photo
+        if self.rendition:
+            return f"rendition:{self.rendition}"
+        return None
+
+    async def _answer_photo(self, message: Message, photo) -> Message:
+        """Отправляет фото с подписью и клавиатурой."""
+        return await message.answer_photo(
+            photo=photo,
+            caption=self.text,
+            reply_markup=self.reply_markup,
+            parse_mode=self.parse_mode
+        )
+
+    async def send(self, message: Message) -> Message:
+        """
+        Отправляет сообщение в чат исходного сообщения.
+
+        Args:
+            message (Message): Сообщение, в чат которого отправляется ответ
+
+        Returns:
+            Message: Отправленное сообщение
+        """
+        if self.photo is None and self.rendition is None:
+            return await message.answer(
+                self.text,
+                reply_markup=self.reply_markup,
+                parse_mode=self.parse_mode
+            )
+
+        key = self._media_key()
+        if key is not None:
+            file_id = await file_ids.get(key)
+            if file_id is not None:
+                try:
+                    return await self._answer_photo(message, file_id)
+                except TelegramBadRequest as e:
+                    logger.warning(f"file_id для {key} недействителен, загружаем заново: {e}")
+                    await file_ids.forget(key)
+
+        photo = self.photo
+        if self.rendition is not None:
+            # Готовый файл с диска отправляется без копирования в память
+            mapped = await asyncio.to_thread(renditions.input_file, self.rendition, self.filename)
+            if mapped is not None:
+                photo = mapped
+            elif photo is None:
+                raise FileNotFoundError(f"готовое изображение {self.rendition} вытеснено из хранилища")
+        if isinstance(photo, bytes):
+            photo = BufferedInputFile(photo, self.filename)
+        sent = await self._answer_photo(message, photo)
+
+        if key is not None and sent.photo:
+            await file_ids.set(key, sent.photo[-1].file_id)
+        return sent
+
+
+@dataclass
+class RenderedResponse:
+    """
+    Подготовленный ответ из одного или нескольких сообщений.
+
+    Attributes:
+        messages (List[RenderedMessage]): Сообщения в порядке отправки
+        delay (float): Пауза между сообщениями в секундах
+        cacheable (bool): Можно ли сохранять ответ в кэш
+    """
+
+    messages: List[RenderedMessage] = field(default_factory=list)
+    delay: float = 0.0
+    cacheable: bool = True
+
+    async def send(self, message: Message) -> None:
+        """
+        Последовательно отправляет все сообщения ответа.
+
+        Args:
+            message (Message): Сообщение, в чат которого отправляется ответ
+        """
+        for index, item in enumerate(self.messages):
+            if index and self.delay:
+                await asyncio.sleep(self.delay)
+            await item.send(message)
+
+
+def _message_to_dict(item: RenderedMessage) -> Dict[str, Any]:
+    # Поля копируются поверхностно: байты изображения не дублируются
+    data = {name: getattr(item, name) for name in item.__dataclass_fields__}
+    if item.reply_markup is not None:
+        data['reply_markup'] = item.reply_markup.model_dump(exclude_none=True)
+    return data
+
+
+def _message_from_dict(data: Dict[str, Any]) -> RenderedMessage:
+    if data.get('reply_markup') is not None:
+        data['reply_markup'] = InlineKeyboardMarkup.model_validate(data['reply_markup'])
+    return RenderedMessage(**data)
+
+
+def _response_to_dict(response: RenderedResponse) -> Dict[str, Any]:
+    return {
+        'messages': response.messages,
+        'delay': response.delay,
+        'cacheable': response.cacheable
+    }
+
+
+# Регистрируем типы для хранения готовых ответов в Redis
+codecs.register_type(RenderedMessage, 'rendered_message', _message_to_dict, _message_from_dict)
+codecs.register_type(RenderedResponse, 'rendered_response', _response_to_dict, lambda data: RenderedResponse(**data))
@@ -0,0 +1,171 @@
+"""
+Модуль фонового планировщика прогрева данных.
+
+Периодически обновляет «горячие» данные (ленту астероидов, последние фото
+марсоходов, изображения планет), чтобы обработчики пользователей
+не ждали холодного обращения к внешним API.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from utils.ratelimit import Priority, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchJob:
+    """
+    Задача прогрева.
+
+    Attributes:
+        name (str): Имя задачи (в статистике и логах)
+        units (Callable): Фабрика, возвращающая корутины одного запуска
+            (например, по одной на каждый марсоход)
+        interval (float): Интервал между запусками в секундах
+        jitter (float): Доля интервала для случайного сдвига (0.1 = ±10%)
+        concurrency (int): Сколько корутин запуска выполняются одновременно
+    """
+
+    name: str
+    units: Callable[[], Iterable[Awaitable[Any]]]
+    interval: float
+    jitter: float = 0.1
+    concurrency: int = 2
+
+
+@dataclass
+class JobStats:
+    """
+    Статистика задачи прогрева.
+
+    Attributes:
+        runs (int): Количество запусков
+        failures (int): Количество неудачных корутин за всё время
+        last_run (Optional[datetime]): Время начала последнего запуска
+        last_duration (float): Длительность последнего запуска в секундах
+        last_error (Optional[str]): Последняя ошибка
+    """
+
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[datetime] = None
+    last_duration: float = 0.0
+    last_error: Optional[str] = None
+
+
+class PrefetchScheduler:
+    """
+    Планировщик задач прогрева на событийном цикле.
+
+    Attributes:
+        jobs (Dict[str, PrefetchJob]): Зарегистрированные задачи
+        stats (Dict[str, JobStats]): Статистика задач
+        _tasks (List[asyncio.Task]): Запущенные циклы задач
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, PrefetchJob] = {}
+        self.stats: Dict[str, JobStats] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, job: PrefetchJob) -> None:
+        """
+        Регистрирует задачу прогрева.
+
+        Args:
+            job (PrefetchJob): Задача
+        """
+        self.jobs[job.name] = job
+        self.stats[job.name] = JobStats()
+
+    def _delay(self, job: PrefetchJob) -> float:
+        """Интервал до следующего запуска со случайным сдвигом."""
+        spread = job.interval * job.jitter
+        return max(0.0, job.interval + random.uniform(-spread, spread))
+
+    async def run_job(self, job: PrefetchJob) -> None:
+        """
+        Выполняет один запуск задачи с ограничением параллельности.
+
+        Args:
+            job (PrefetchJob): Задача
+        """
+        stats = self.stats[job.name]
+        semaphore = asyncio.Semaphore(job.concurrency)
+
+        async def run_unit(unit: Awaitable[Any]) -> None:
+            # Запросы прогрева уступают квоту NASA запросам пользователей
+            request_priority.set(Priority.PREFETCH)
+            async with semaphore:
+                try:
+                    await unit
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stats.failures += 1
+                    stats.last_error = f"{type(e).__name__}: {e}"
+                    logger.warning(f"Прогрев {job.name}: ошибка {e}")
+
+        stats.last_run = datetime.now()
+        start = time.monotonic()
+        await asyncio.gather(*(run_unit(unit) for unit in job.units()))
+        stats.last_duration = time.monotonic() - start
+        stats.runs += 1
+        logger.info(f"Прогрев {job.name} выполнен за {stats.last_duration:.2f}s")
+
+    async def _loop(self, job: PrefetchJob) -> None:
+        """Бесконечный цикл запусков одной задачи."""
+        # Небольшая случайная задержка, чтобы задачи не стартовали одновременно
+        await asyncio.sleep(random.uniform(0, min(5.0, job.interval * job.jitter)))
+        while True:
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Прогрев {job.name}: критическая ошибка {e}", exc_info=True)
+            await asyncio.sleep(self._delay(job))
+
+    def start(self) -> None:
+        """Запускает циклы всех зарегистрированных задач."""
+        if self._tasks:
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"prefetch:{job.name}"))
+        logger.info(f"Планировщик прогрева запущен, задач: {len(self._tasks)}")
+
+    async def stop(self) -> None:
+        """Останавливает все циклы задач."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику задач для /stats.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Статистика по именам задач
+        """
+        return {
+            name: {
+                'runs': stats.runs,
+                'failures': stats.failures,
+                'last_run': stats.last_run.strftime('%H:%M:%S') if stats.last_run else '—',
+                'last_duration': f"{stats.last_duration:.2f}s",
+                'last_error': stats.last_error
+            }
+            for name, stats in self.stats.items()
+        }
+
+
+# Глобальный планировщик прогрева
+scheduler = PrefetchScheduler()
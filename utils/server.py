@@ -0,0 +1,245 @@
+"""
+Модуль HTTP-сервера бота.
+
+Один aiohttp-сервер на METRICS_PORT обслуживает:
+- вебхук Telegram (в режиме BOT_MODE=webhook) с проверкой секретного
+  токена из заголовка X-Telegram-Bot-Api-Secret-Token
+- /metrics — счётчики и показатели monitor в формате Prometheus
+- /health (процесс жив) и /ready (бот принимает обновления) для
+  балансировщика и оркестратора
+
+В режиме вебхука обновление обрабатывается в фоне, а Telegram сразу
+получает ответ. Для нажатия inline-кнопки, обработчик которой отвечает
+пустым callback.answer() (список префиксов callback_data передаётся в
+add_webhook), ответом служит answerCallbackQuery: индикатор загрузки на
+кнопке гаснет без отдельного запроса к Bot API. Последующие вызовы
+callback.answer() для этого нажатия пропускает middleware сессии
+AnsweredCallbacks. Остальные нажатия обработчики отвечают сами, в том
+числе всплывающими уведомлениями.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import AnswerCallbackQuery, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from config import ENABLE_METRICS
+from utils.cache import TTLCache
+from utils.monitoring import PerformanceMonitor, monitor
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "nasa_bot"
+ANSWERED_CALLBACK_TTL = 60  # Сколько помнить нажатия, на которые ответили в вебхуке
+
+
+def _metric_name(name: str) -> str:
+    """Приводит имя счётчика monitor к допустимому имени метрики Prometheus."""
+    return f"{METRIC_PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+
+
+class MonitorCollector:
+    """
+    Коллектор Prometheus, читающий monitor при каждом опросе.
+
+    Счётчики и показатели с именами вида «ready_pool_depth:curiosity»
+    экспортируются как одна метрика с меткой key="curiosity".
+    """
+
+    def __init__(self, source: PerformanceMonitor = monitor):
+        self.source = source
+
+    @staticmethod
+    def _families(values: Dict[str, float], family_type: type) -> Iterator[Any]:
+        families: Dict[str, Any] = {}
+        for name, value in sorted(values.items()):
+            base, _, key = name.partition(':')
+            metric = _metric_name(base)
+            if metric not in families:
+                families[metric] = family_type(metric, f"monitor: {base}", labels=['key'])
+            families[metric].add_metric([key], value)
+        return iter(families.values())
+
+    def collect(self) -> Iterator[Any]:
+        yield from self._families(self.source.get_counters(), CounterMetricFamily)
+        yield from self._families(self.source.get_gauges(), GaugeMetricFamily)
+
+        cache = CounterMetricFamily(f"{METRIC_PREFIX}_cache_requests", "Обращения к кэшам",
+                                    labels=['cache', 'result'])
+        for cache_type, stats in self.source.get_cache_stats().items():
+            cache.add_metric([cache_type, 'hit'], stats['hits'])
+            cache.add_metric([cache_type, 'miss'], stats['misses'])
+        yield cache
+
+        calls = CounterMetricFamily(f"{METRIC_PREFIX}_api_calls", "Вызовы API по функциям",
+                                    labels=['endpoint'])
+        for endpoint, stats in self.source.get_api_stats().items():
+            calls.add_metric([endpoint], stats['calls'])
+        yield calls
+
+
+class AnsweredCallbacks(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: пропускает повторный answerCallbackQuery.
+
+    Если на нажатие уже ответили в ответе вебхука, второй ответ Bot API
+    отклонил бы с ошибкой. Пустой повторный ответ пропускается молча;
+    ответ с текстом тоже пропускается (показать его уже нельзя), но
+    попадает в лог и счётчик.
+    """
+
+    def __init__(self, ttl: int = ANSWERED_CALLBACK_TTL):
+        self.answered = TTLCache(ttl=ttl, maxsize=10_000)
+
+    def mark(self, callback_query_id: str) -> None:
+        """Отмечает, что на нажатие ответили в ответе вебхука."""
+        self.answered.set(callback_query_id, True)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        if isinstance(method, AnswerCallbackQuery) and self.answered.get(method.callback_query_id):
+            if method.text or method.url:
+                monitor.increment('callback_answer_dropped')
+                logger.warning(f"Ответ на нажатие уже отправлен в вебхуке, текст пропущен: {method.text}")
+            # Цепочка middleware сессии возвращает результат метода (для answerCallbackQuery — True)
+            return True
+        return await make_request(bot, method)
+
+
+class WebhookRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик вебхука Telegram.
+
+    Обновление передаётся диспетчеру в фоне; на нажатие inline-кнопки с
+    callback_data из inline_answers сразу отвечает answerCallbackQuery в
+    теле ответа вебхука.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str,
+        inline_answers: Sequence[str] = (),
+        **data: Any
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.inline_answers = tuple(inline_answers)
+        self.callbacks = AnsweredCallbacks()
+        bot.session.middleware(self.callbacks)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        monitor.increment('webhook_updates')
+        callback_query = update.get('callback_query') or {}
+        callback_query_id = None
+        # Отвечаем сразу только там, где обработчик ответил бы пустым answer()
+        if self.inline_answers and (callback_query.get('data') or '').startswith(self.inline_answers):
+            callback_query_id = callback_query.get('id')
+        # Отметка ставится до запуска обработки, чтобы callback.answer() в ней уже пропускался
+        if callback_query_id:
+            self.callbacks.mark(callback_query_id)
+
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+
+        if callback_query_id:
+            monitor.increment('webhook_callback_answers')
+            answer = AnswerCallbackQuery(callback_query_id=callback_query_id)
+            return web.Response(body=self._build_response_writer(bot=bot, result=answer))
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+
+class BotServer:
+    """
+    HTTP-сервер бота: вебхук, метрики и проверки состояния.
+
+    Attributes:
+        host (str): Адрес, на котором слушает сервер
+        port (int): Порт (METRICS_PORT)
+        mode (str): Режим получения обновлений (polling или webhook)
+        ready (bool): Бот запущен и принимает обновления
+        app (web.Application): Приложение aiohttp
+    """
+
+    def __init__(self, host: str, port: int, mode: str, metrics: bool = ENABLE_METRICS):
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.ready = False
+        self._started = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_get('/health', self.health)
+        self.app.router.add_get('/ready', self.readiness)
+        if metrics:
+            self._registry = CollectorRegistry()
+            self._registry.register(MonitorCollector())
+            self.app.router.add_get('/metrics', self.metrics)
+
+    def add_webhook(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        path: str,
+        secret_token: str,
+        inline_answers: Sequence[str] = ()
+    ) -> None:
+        """
+        Подключает вебхук Telegram.
+
+        Args:
+            dispatcher (Dispatcher): Диспетчер aiogram
+            bot (Bot): Экземпляр бота
+            path (str): Путь вебхука
+            secret_token (str): Секрет, который Telegram передаёт в заголовке
+            inline_answers (Sequence[str]): Префиксы callback_data, на нажатия
+                с которыми можно ответить в ответе вебхука
+        """
+        WebhookRequestHandler(
+            dispatcher, bot, secret_token=secret_token, inline_answers=inline_answers
+        ).register(self.app, path=path)
+        # События startup/shutdown диспетчера вызывает приложение (в polling — start_polling)
+        setup_application(self.app, dispatcher, bot=bot)
+
+    async def health(self, request: web.Request) -> web.Response:
+        """Процесс жив и цикл событий отвечает."""
+        return web.json_response({'status': 'ok', 'uptime': round(time.monotonic() - self._started)})
+
+    async def readiness(self, request: web.Request) -> web.Response:
+        """Бот принимает обновления; до запуска и при остановке — 503."""
+        return web.json_response({'ready': self.ready, 'mode': self.mode}, status=200 if self.ready else 503)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Метрики monitor в текстовом формате Prometheus."""
+        body = generate_latest(self._registry)
+        return web.Response(body=body, headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+    async def start(self) -> None:
+        """Запускает сервер."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"HTTP-сервер запущен на {self.host}:{self.port} (режим {self.mode})")
+
+    async def stop(self) -> None:
+        """Останавливает сервер; /ready сразу начинает отвечать 503."""
+        self.ready = False
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,93 @@
+"""
+Модуль для объединения одинаковых одновременных запросов (single-flight).
+
+Если несколько обработчиков одновременно запрашивают одни и те же данные,
+к API уходит только один запрос, а все вызывающие ожидают общий результат.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from utils.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(endpoint: str, params: Optional[Mapping[str, Any]] = None) -> Tuple:
+    """
+    Формирует ключ запроса из адреса и нормализованных параметров.
+
+    Параметры сортируются и приводятся к строкам, поэтому порядок
+    и тип значений (0.3 или "0.3") не влияют на ключ.
+
+    Args:
+        endpoint (str): Адрес запроса
+        params (Mapping, optional): Параметры запроса
+
+    Returns:
+        Tuple: Хешируемый ключ запроса
+    """
+    normalized = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return (endpoint, normalized)
+
+
+class SingleFlight:
+    """
+    Группа одновременных вызовов с общим результатом.
+
+    Первый вызывающий запускает корутину в отдельной задаче, остальные
+    ожидают её же. Ошибка передаётся всем ожидающим. Отмена одного
+    вызывающего не отменяет запрос для остальных; задача отменяется,
+    только когда её перестали ждать все.
+
+    Attributes:
+        name (str): Имя группы для метрик
+        _inflight (Dict): Выполняющиеся задачи по ключам
+        _waiters (Dict): Количество ожидающих по ключам
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """Удаляет завершённую задачу из списка выполняющихся."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+        # Забираем исключение, чтобы asyncio не ругался на необработанную ошибку
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет func или присоединяется к уже выполняющемуся вызову.
+
+        Args:
+            key (Hashable): Ключ запроса (см. make_key)
+            func (Callable): Фабрика корутины, выполняющей запрос
+
+        Returns:
+            Any: Результат общего вызова
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            monitor.increment(f"coalesced_requests:{self.name}")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] <= 0:
+                    logger.debug(f"Single-flight {self.name}: все ожидающие отменены, отменяем {key}")
+                    task.cancel()
+            raise